@@ -0,0 +1,11 @@
+'''
+Benchmarks for hypergcc.
+
+Run each benchmark as a module from the repository root, e.g.::
+
+   python -m benchmarks.bench_read
+
+benchmarks.suite times all hot paths on synthetic hypergraphs of increasing size
+and writes the scaling curves to benchmarks/results/<commit>.json;
+benchmarks.compare compares two such files.
+'''
@@ -0,0 +1,67 @@
+'''
+Compare read_hypergraph_from_file (line by line) with the vectorized reader
+used by HyperGraph.read_hypergraph.
+
+python -m benchmarks.bench_read --nodes 20000 --hyperedges 50000
+'''
+import tempfile
+import time
+
+from hypergcc.core import read_hypergraph_arrays
+from hypergcc.hypergraph import HyperGraph, read_hypergraph_from_file
+from benchmarks.synthetic import random_hyperedges, write_scholp
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(args):
+    E = random_hyperedges(args.nodes, args.hyperedges, args.max_size, args.seed)
+
+    with tempfile.TemporaryDirectory() as datadir:
+        write_scholp(datadir, 'bench', E)
+        f1_path = f'{datadir}/bench_nverts.txt'
+        f2_path = f'{datadir}/bench_hyperedges.txt'
+
+        def legacy():
+            with open(f1_path, 'r') as f1, open(f2_path, 'r') as f2:
+                read_hypergraph_from_file(f1, f2)
+
+        def arrays():
+            read_hypergraph_arrays(f1_path, f2_path)
+
+        def hypergraph(compact):
+            def read():
+                HyperGraph(datadir, compact=compact).read_hypergraph('bench')
+            return read
+
+        cases = [
+            ('read_hypergraph_from_file', legacy),
+            ('read_hypergraph_arrays', arrays),
+            ('HyperGraph.read_hypergraph', hypergraph(False)),
+            ('HyperGraph.read_hypergraph (compact)', hypergraph(True)),
+        ]
+        for name, func in cases:
+            print(name, f'{best_of(func, args.repeat):.4f}', sep='\t')
+
+
+def parse_args():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=20000)
+    parser.add_argument('--hyperedges', type=int, default=50000)
+    parser.add_argument('--max-size', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
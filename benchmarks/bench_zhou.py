@@ -0,0 +1,38 @@
+'''
+Compare the loops of HyperGraph.node_clustering_coefficient_zhou with the
+pair-shared kernel (engine='pairs') on an email-Enron-like synthetic
+hypergraph (few nodes, many small hyperedges).
+
+python -m benchmarks.bench_zhou --nodes 150 --hyperedges 5000
+'''
+import time
+
+from hypergcc.hypergraph import HyperGraph
+from benchmarks.synthetic import random_hyperedges
+
+
+def main(args):
+    E = random_hyperedges(args.nodes, args.hyperedges, args.max_size, args.seed)
+    G = HyperGraph('.')
+    G.construct_hypergraph(sorted({v for e in E for v in e}), E)
+
+    # 値が一致することは tests/test_clustering.py で確かめる
+    for engine in ['python', 'pairs']:
+        start = time.perf_counter()
+        G.node_clustering_coefficient_zhou(engine=engine)
+        print(engine, f'{time.perf_counter() - start:.4f}', sep='\t')
+
+
+def parse_args():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=150)
+    parser.add_argument('--hyperedges', type=int, default=5000)
+    parser.add_argument('--max-size', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,68 @@
+'''
+Compare two result files of benchmarks.suite (e.g. of two commits).
+
+For each case and number of nodes measured in both files, prints the times and peak
+memories and their ratios new / old. Rows whose time ratio exceeds --threshold are
+marked as slower; with --fail, the exit status is 1 if there is any.
+
+python -m benchmarks.compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+'''
+import sys
+import json
+
+
+def load(path):
+    with open(path, 'r') as f:
+        report = json.load(f)
+    rows = {(r['case'], r['nodes']): r for r in report['results']}
+    return report, rows
+
+
+def ratio(new, old):
+    if new is None or old is None or old == 0:
+        return float('nan')
+    return new / old
+
+
+def main(args):
+    old_report, old = load(args.old)
+    new_report, new = load(args.new)
+    if old_report['params'] != new_report['params']:
+        print('Warning: the benchmark parameters differ:', old_report['params'], new_report['params'], file=sys.stderr)
+
+    print('# old:', old_report['commit'], '(dirty)' if old_report['dirty'] else '')
+    print('# new:', new_report['commit'], '(dirty)' if new_report['dirty'] else '')
+    print('case', 'nodes', 'old_seconds', 'new_seconds', 'time_ratio', 'old_peak_bytes', 'new_peak_bytes', 'memory_ratio', 'flag', sep='\t')
+    slower = 0
+    for key in sorted(old.keys() & new.keys()):
+        o, n = old[key], new[key]
+        t = ratio(n['seconds'], o['seconds'])
+        m = ratio(n['peak_bytes'], o['peak_bytes'])
+        flag = ''
+        if t > args.threshold:
+            flag = 'slower'
+            slower += 1
+        elif t < 1 / args.threshold:
+            flag = 'faster'
+        print(*key, f'{o["seconds"]:.4g}', f'{n["seconds"]:.4g}', f'{t:.3f}', o['peak_bytes'], n['peak_bytes'], f'{m:.3f}', flag, sep='\t')
+
+    for key in sorted(old.keys() ^ new.keys()):
+        print('# only in', 'old' if key in old else 'new', *key, sep='\t')
+
+    if args.fail and slower > 0:
+        sys.exit(1)
+
+
+def parse_args():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=1.2, help='time ratio above which a case is reported as slower')
+    parser.add_argument('--fail', action='store_true', help='exit with status 1 if some case is slower')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
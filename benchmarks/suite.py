@@ -0,0 +1,266 @@
+'''
+Scaling benchmarks of the hot paths of hypergcc.
+
+For each number of nodes in --nodes, a synthetic hypergraph with --edges-per-node
+hyperedges per node is generated (see benchmarks.synthetic.synthetic_hyperedges) and
+every case is timed (best of --repeat runs, setup excluded) and run once more under
+tracemalloc for its peak memory. The results are printed as TSV and written as JSON
+with the commit they were measured on (benchmarks/results/<commit>.json by default),
+so that two commits can be compared with benchmarks.compare.
+
+python -m benchmarks.suite --nodes 250,500,1000,2000
+python -m benchmarks.suite --cases zhou,motifs --skew 1.0 --duplicates 0.1
+'''
+import os
+import sys
+import json
+import contextlib
+import time
+import pathlib
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+from hypergcc.hypergraph import HyperGraph
+from hypergcc.statistics import dataset_statistics
+from hypergcc.motifs import loaders
+from hypergcc.motifs.hypergraph import hypergraph
+from hypergcc.motifs.motifs import count_motifs
+from hypergcc.motifs.motifs2 import motifs_order_3, motifs_order_4
+from hypergcc.motifs.utils import generate_motifs
+from hypergcc.motifs.classify import build_motif_table
+from benchmarks.synthetic import SIZE_DISTRIBUTIONS, synthetic_hyperedges, write_scholp
+
+REPO_DIR = pathlib.Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_DIR / 'benchmarks' / 'results'
+
+
+class Workload():
+    '''A synthetic hypergraph written in the ScHoLP format, shared by the cases of one size.'''
+    name = 'bench'
+
+    def __init__(self, datadir, E):
+        self.datadir = datadir
+        self.E = E
+        self.V = sorted({v for e in E for v in e})
+        write_scholp(datadir, self.name, E)
+
+    def hypergraph(self, compact=False):
+        '''A fresh HyperGraph whose core is already built (outside the timing; the pair index is not).'''
+        G = HyperGraph(self.datadir, compact=compact, cache=False)
+        G.construct_hypergraph(self.V, self.E)
+        G.core
+        return G
+
+
+def _clustering_case(method, engine):
+    def make(w):
+        G = w.hypergraph()
+        return lambda: getattr(G, f'node_clustering_coefficient_{method}')(engine=engine)
+    return make
+
+
+@contextlib.contextmanager
+def _cache_dir(path):
+    '''Use path as the hypergcc cache directory within the block (the previous setting is restored).'''
+    previous = os.environ.get('HYPERGCC_CACHE_DIR')
+    os.environ['HYPERGCC_CACHE_DIR'] = str(path)
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ['HYPERGCC_CACHE_DIR']
+        else:
+            os.environ['HYPERGCC_CACHE_DIR'] = previous
+
+
+def _read_cached(w):
+    # the cache of each workload lives in its data directory and does not leak into the other cases
+    root = pathlib.Path(w.datadir) / 'cache'
+    with _cache_dir(root):
+        HyperGraph(w.datadir).read_hypergraph(w.name)
+
+    def read():
+        with _cache_dir(root):
+            HyperGraph(w.datadir, compact=True).read_hypergraph(w.name)
+    return read
+
+
+def _neighbors(w):
+    G = w.hypergraph()
+    return lambda: [G.neighbors(v) for v in G.V]
+
+
+def _joint_degrees(engine):
+    def make(w):
+        G = w.hypergraph(compact=True)
+        if engine is None:
+            return lambda: G.joint_degree_matrix(sparse=True)
+        return lambda: G.num_jnt_node_deg(engine=engine)
+    return make
+
+
+def _motifs(order):
+    def make(w):
+        edges = loaders.load_from_hyperedgelist(order, w.E)
+        count = motifs_order_3 if order == 3 else motifs_order_4
+        return lambda: count(edges, -1)
+    return make
+
+
+def _esu(order, workers):
+    def make(w):
+        edges = loaders.load_from_hyperedgelist(order, w.E)
+        return lambda: count_motifs(edges, order, -1, workers=workers)
+    return make
+
+
+def _mh(w):
+    def run():
+        h = hypergraph(w.E)
+        h.MH(n_steps=len(w.E), verbose=False, message=False)
+    return run
+
+
+# name -> (setup returning the function to time, largest number of nodes run by default)
+CASES = {
+    'read_hypergraph': (lambda w: lambda: HyperGraph(w.datadir, cache=False).read_hypergraph(w.name), None),
+    'read_hypergraph[cached]': (_read_cached, None),
+    'dataset_statistics': (lambda w: lambda: dataset_statistics(pathlib.Path(w.datadir) / f'{w.name}_nverts.txt',
+                                                                pathlib.Path(w.datadir) / f'{w.name}_hyperedges.txt'), None),
+    'node_clustering_coefficient_opsahl[python]': (_clustering_case('opsahl', 'python'), 4000),
+    'node_clustering_coefficient_opsahl[pairs]': (_clustering_case('opsahl', 'pairs'), None),
+    'node_clustering_coefficient_zhou[python]': (_clustering_case('zhou', 'python'), 4000),
+    'node_clustering_coefficient_zhou[pairs]': (_clustering_case('zhou', 'pairs'), None),
+    'node_clustering_coefficient_proposed[python]': (_clustering_case('proposed', 'python'), 4000),
+    'node_clustering_coefficient_proposed[sparse]': (_clustering_case('proposed', 'sparse'), None),
+    'node_clustering_coefficient_on_projected_graph': (lambda w: w.hypergraph().node_clustering_coefficient_on_projected_graph, None),
+    'num_jnt_node_deg[python]': (lambda w: w.hypergraph().num_jnt_node_deg, None),
+    'num_jnt_node_deg[sparse]': (_joint_degrees('sparse'), None),
+    'joint_degree_matrix': (_joint_degrees(None), None),
+    'neighbors': (_neighbors, None),
+    'neighbor_counts': (lambda w: w.hypergraph().neighbor_counts, None),
+    'node_features': (lambda w: (lambda G: lambda: G.node_features())(w.hypergraph(compact=True)), None),
+    'neighbors_many': (lambda w: (lambda G: lambda: G.neighbors_many(w.V))(w.hypergraph(compact=True)), None),
+    'motifs_order_3': (_motifs(3), None),
+    'motifs_order_4': (_motifs(4), None),
+    'count_motifs(3)': (_esu(3, 1), 1000),
+    'count_motifs(3)[workers=4]': (_esu(3, 4), 1000),
+    'generate_motifs(3)': (lambda w: lambda: generate_motifs(3), None),
+    'generate_motifs(4)': (lambda w: lambda: generate_motifs(4), None),
+    'build_motif_table(4)': (lambda w: lambda: build_motif_table(4), None),
+    'hypergraph.MH': (_mh, None),
+}
+
+
+def measure(make, workload, repeat, memory=True):
+    '''Best time of repeat runs and the peak traced memory of one more run (None if not memory).'''
+    times = []
+    for _ in range(repeat):
+        func = make(workload)
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        func = make(workload)
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return min(times), peak
+
+
+def git_commit():
+    '''Commit of the working tree (None outside a git repository) and whether it has uncommitted changes.'''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, status.strip() != ''
+
+
+def select_cases(patterns):
+    if patterns is None:
+        return list(CASES)
+    names = [name for name in CASES if any(p in name for p in patterns)]
+    if not names:
+        raise SystemExit(f'Error: no case matches {",".join(patterns)} (cases: {", ".join(CASES)}).')
+    return names
+
+
+def main(args):
+    commit, dirty = git_commit()
+    names = select_cases(args.cases)
+    params = {
+        'nodes': args.nodes, 'edges_per_node': args.edges_per_node, 'sizes': args.sizes,
+        'max_size': args.max_size, 'skew': args.skew, 'duplicates': args.duplicates,
+        'seed': args.seed, 'repeat': args.repeat,
+    }
+    results = []
+    print('case', 'nodes', 'hyperedges', 'pins', 'seconds', 'peak_bytes', sep='\t')
+    for n in args.nodes:
+        E = synthetic_hyperedges(n, int(n * args.edges_per_node), args.sizes, args.max_size, args.skew, args.duplicates, args.seed)
+        with tempfile.TemporaryDirectory() as datadir:
+            workload = Workload(datadir, E)
+            for name in names:
+                make, limit = CASES[name]
+                if limit is not None and n > limit and not args.no_limit:
+                    continue
+                seconds, peak = measure(make, workload, args.repeat, memory=not args.no_memory)
+                row = {'case': name, 'nodes': n, 'hyperedges': len(E), 'pins': sum(map(len, E)),
+                       'seconds': seconds, 'peak_bytes': peak}
+                results.append(row)
+                print(*row.values(), sep='\t', flush=True)
+
+    output = args.output
+    if output is None:
+        label = (commit[:12] if commit else 'unknown') + ('-dirty' if dirty else '')
+        output = RESULTS_DIR / f'{label}.json'
+    output = pathlib.Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'params': params,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f'Results were written to {output}', file=sys.stderr)
+
+
+def parse_args():
+    import argparse
+    int_list = lambda value: [int(x) for x in value.split(',')]
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int_list, default=[250, 500, 1000, 2000],
+                        help='comma separated numbers of nodes (the points of the scaling curves)')
+    parser.add_argument('--edges-per-node', type=float, default=2.0)
+    parser.add_argument('--sizes', choices=SIZE_DISTRIBUTIONS, default='uniform', help='hyperedge size distribution')
+    parser.add_argument('--max-size', type=int, default=5)
+    parser.add_argument('--skew', type=float, default=0.5, help='exponent of the node popularity rank^-skew (0: uniform)')
+    parser.add_argument('--duplicates', type=float, default=0.05, help='rate of hyperedges that repeat an earlier one')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', type=lambda value: value.split(','), help='run only the cases whose names contain one of these comma separated strings')
+    parser.add_argument('--no-limit', action='store_true', help='also run the slow cases above their default size limits')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run of each case')
+    parser.add_argument('--output', help='JSON file (default: benchmarks/results/<commit>.json)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
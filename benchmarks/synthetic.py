@@ -0,0 +1,72 @@
+'''
+Synthetic hypergraphs for the benchmarks
+'''
+import pathlib
+
+import numpy as np
+
+SIZE_DISTRIBUTIONS = ['uniform', 'geometric', 'powerlaw']
+
+
+def random_hyperedges(num_nodes: int, num_hyperedges: int, max_size: int = 5, seed: int = 0):
+    '''Generate hyperedges whose sizes are uniform on 2..max_size and whose members are chosen uniformly at random.'''
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(2, max_size + 1, size=num_hyperedges)
+    E = []
+    for s in sizes:
+        E.append((rng.choice(num_nodes, size=s, replace=False) + 1).tolist())
+    return E
+
+
+def hyperedge_sizes(num_hyperedges: int, distribution: str = 'uniform', max_size: int = 5, rng=None):
+    '''Sizes in 2..max_size drawn from a uniform, geometric (mean about 3) or power-law (exponent 2.5) distribution.'''
+    rng = np.random.default_rng(rng)
+    match distribution:
+        case 'uniform':
+            sizes = rng.integers(2, max_size + 1, size=num_hyperedges)
+        case 'geometric':
+            sizes = 1 + rng.geometric(0.5, size=num_hyperedges)
+        case 'powerlaw':
+            sizes = 1 + rng.zipf(2.5, size=num_hyperedges)
+        case _:
+            raise ValueError(f'Unknown size distribution {distribution} (choose from {", ".join(SIZE_DISTRIBUTIONS)}).')
+    return np.minimum(sizes, max_size)
+
+
+def synthetic_hyperedges(num_nodes: int, num_hyperedges: int, sizes: str = 'uniform', max_size: int = 5,
+                         skew: float = 0.0, duplicates: float = 0.0, seed: int = 0):
+    '''Generate hyperedges with a given size distribution, degree skew and rate of duplicated hyperedges.
+
+    Members are chosen with probability proportional to rank^-skew (skew=0 is uniform,
+    larger values give heavier hubs) without repetition within a hyperedge. With
+    probability duplicates, a hyperedge repeats an earlier one (as in the ScHoLP data).
+    Nodes are numbered 1..num_nodes; a node may belong to no hyperedge.
+    '''
+    rng = np.random.default_rng(seed)
+    s = hyperedge_sizes(num_hyperedges, sizes, min(max_size, num_nodes), rng)
+    cum = np.cumsum(np.arange(1, num_nodes + 1, dtype=np.float64) ** -skew)
+    cum /= cum[-1]
+    copy = rng.random(num_hyperedges) < duplicates
+
+    E = []
+    for i in range(num_hyperedges):
+        if copy[i] and E:
+            E.append(list(E[rng.integers(len(E))]))
+            continue
+        members = np.empty(0, dtype=np.int64)
+        while len(members) < s[i]:
+            draw = np.searchsorted(cum, rng.random(2 * s[i]), side='right')
+            new = np.setdiff1d(np.unique(draw), members, assume_unique=True)
+            rng.shuffle(new)
+            members = np.concatenate([members, new[:s[i] - len(members)]])
+        E.append((members + 1).tolist())
+    return E
+
+
+def write_scholp(datadir, name: str, E):
+    '''Write hyperedges E as {name}_nverts.txt and {name}_hyperedges.txt in datadir.'''
+    datadir = pathlib.Path(datadir)
+    with open(datadir / f'{name}_nverts.txt', 'w') as f:
+        f.writelines(f'{len(e)}\n' for e in E)
+    with open(datadir / f'{name}_hyperedges.txt', 'w') as f:
+        f.writelines(f'{v}\n' for e in E for v in e)
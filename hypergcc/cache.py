@@ -0,0 +1,144 @@
+'''
+Persistent binary cache of parsed hypergraphs.
+
+The arrays of a CSRCore are stored as raw .npy files in a directory per
+dataset and memory-mapped on later reads. A cache entry is valid while the
+size and the modification time of the source files are unchanged; when only
+the modification time differs, the SHA-256 digests of the contents decide.
+
+The cache directory is $HYPERGCC_CACHE_DIR, or hypergcc/ under
+$XDG_CACHE_HOME (~/.cache by default).
+'''
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import pathlib
+
+import numpy as np
+
+from hypergcc.core import CSRCore, read_hypergraph_arrays
+
+import logging
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+ARRAYS = ['node_ids', 'indptr', 'indices', 'node_indptr', 'node_indices']
+
+
+def cache_dir() -> pathlib.Path:
+    '''Root directory of the hypergcc cache.'''
+    if 'HYPERGCC_CACHE_DIR' in os.environ:
+        return pathlib.Path(os.environ['HYPERGCC_CACHE_DIR'])
+    xdg = os.environ.get('XDG_CACHE_HOME') or pathlib.Path.home() / '.cache'
+    return pathlib.Path(xdg) / 'hypergcc'
+
+
+def file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _source_info(path, digest=True):
+    st = os.stat(path)
+    info = {'path': str(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if digest:
+        info['sha256'] = file_digest(path)
+    return info
+
+
+def _entry_dir(root, paths) -> pathlib.Path:
+    key = '\n'.join(str(pathlib.Path(p).resolve()) for p in paths)
+    name = pathlib.Path(paths[0]).name.removesuffix('_nverts.txt')
+    return root / 'hypergraphs' / f'{name}-{hashlib.sha1(key.encode()).hexdigest()[:16]}'
+
+
+def _is_valid(entry, paths):
+    '''Check the manifest of a cache entry against the current source files.'''
+    try:
+        with open(entry / 'manifest.json', 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest.get('version') != CACHE_VERSION or len(manifest['sources']) != len(paths):
+        return False
+
+    touched = False
+    for cached, path in zip(manifest['sources'], paths):
+        current = _source_info(path, digest=False)
+        if current['size'] != cached['size']:
+            return False
+        if current['mtime_ns'] != cached['mtime_ns']:
+            if file_digest(path) != cached['sha256']:
+                return False
+            cached['mtime_ns'] = current['mtime_ns']
+            touched = True
+
+    if touched:
+        # Same contents with a new modification time: skip the digests next time
+        try:
+            _write_manifest(entry, manifest)
+        except OSError:
+            pass
+    return True
+
+
+def _write_manifest(entry, manifest):
+    tmp = entry / f'manifest.json.{uuid.uuid4().hex}'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, entry / 'manifest.json')
+
+
+def load_core(entry) -> CSRCore:
+    '''Memory-map the arrays of a cache entry.'''
+    arrays = {a: np.load(entry / f'{a}.npy', mmap_mode='r') for a in ARRAYS}
+    return CSRCore(**arrays)
+
+
+def save_core(entry, core: CSRCore, sources):
+    '''Write core into the cache entry atomically (a concurrent writer of the same entry may win).
+
+    sources is the list of the source file information taken before the files were parsed.
+    '''
+    entry = pathlib.Path(entry)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = entry.parent / f'.{entry.name}.{uuid.uuid4().hex}'
+    tmp.mkdir()
+    try:
+        for a in ARRAYS:
+            np.save(tmp / f'{a}.npy', getattr(core, a))
+        manifest = {'version': CACHE_VERSION, 'sources': sources}
+        _write_manifest(tmp, manifest)
+        if entry.exists():
+            shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def read_hypergraph_cached(f_nverts_path, f_hyperedges_path, root=None) -> CSRCore:
+    '''Read a hypergraph through the cache, parsing the text files only on a cache miss.'''
+    paths = [f_nverts_path, f_hyperedges_path]
+    entry = _entry_dir(pathlib.Path(root) if root is not None else cache_dir(), paths)
+
+    if _is_valid(entry, paths):
+        try:
+            core = load_core(entry)
+            logger.info('Hypergraph was loaded from cache %s', entry)
+            return core
+        except (OSError, ValueError) as e:
+            logger.warning('Broken cache entry %s: %s', entry, e)
+
+    sources = [_source_info(p) for p in paths]
+    core = read_hypergraph_arrays(f_nverts_path, f_hyperedges_path)
+    try:
+        save_core(entry, core, sources)
+        logger.info('Hypergraph was cached to %s', entry)
+    except OSError as e:
+        logger.warning('Could not write cache entry %s: %s', entry, e)
+    return core
@@ -0,0 +1,678 @@
+'''
+Vectorized kernels for the clustering coefficients of hypergcc.hypergraph.HyperGraph.
+
+The kernels work on a hypergcc.core.CSRCore and return per-node arrays indexed
+by the remapped node ids. Candidates are enumerated in chunks of at most
+`budget` elements so that the memory use stays bounded on hub nodes.
+'''
+import numpy as np
+import scipy.sparse as sp
+
+from hypergcc import profiling
+from hypergcc.core import CSRCore
+
+import logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = 1 << 21
+DENSE_LIMIT = 1 << 24  # key spaces up to this size are stored as dense arrays
+METHODS = ['opsahl', 'zhou', 'proposed', 'simple']
+
+
+def _expand(counts):
+    '''For counts [c_0, c_1, ...], return owner = [0]*c_0 + [1]*c_1 + ... and the offset of each element within its owner.'''
+    counts = np.asarray(counts, dtype=np.int64)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    offset = np.arange(len(owner), dtype=np.int64) - starts[owner]
+    return owner, offset
+
+
+def _chunks(cost, budget):
+    '''Split range(len(cost)) into consecutive slices whose total cost is at most budget (or a single item).'''
+    cum = np.cumsum(cost)
+    start = 0
+    base = 0
+    while start < len(cost):
+        stop = int(np.searchsorted(cum, base + budget, side='right'))
+        stop = max(stop, start + 1)
+        yield start, stop
+        base = cum[stop - 1]
+        start = stop
+
+
+def _any(a, axis):
+    '''a.any(axis) for a boolean array; OR-ing the slices is much faster on short axes.'''
+    if a.shape[axis] > 16:
+        return a.any(axis=axis)
+    slices = np.moveaxis(a, axis, 0)
+    acc = slices[0].copy()
+    for x in slices[1:]:
+        acc |= x
+    return acc
+
+
+def _count(a, axis):
+    '''Number of True values of a boolean array along axis (int64), fast on short axes.'''
+    if a.shape[axis] > 16:
+        return a.sum(axis=axis, dtype=np.int64)
+    slices = np.moveaxis(a, axis, 0)
+    acc = slices[0].astype(np.int64)
+    for x in slices[1:]:
+        acc += x
+    return acc
+
+
+class SortedKeys():
+    '''Lookup table from int64 keys to values, stored as a sorted array.'''
+    def __init__(self, keys, values=None):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.values = values
+
+    def find(self, keys):
+        '''Position of each key in the table (-1 if absent).'''
+        if len(self.keys) == 0:
+            return np.full(np.shape(keys), -1, dtype=np.int64)
+        keys = np.asarray(keys, dtype=np.int64)
+        if keys.size > 1024 and len(self.keys) > (1 << 22):
+            # searching sorted queries is more cache friendly on large tables
+            order = np.argsort(keys)
+            pos = np.empty(keys.shape, dtype=np.int64)
+            pos[order] = np.searchsorted(self.keys, keys[order])
+        else:
+            pos = np.searchsorted(self.keys, keys)
+        pos = np.minimum(pos, len(self.keys) - 1)
+        return np.where(self.keys[pos] == keys, pos, -1)
+
+    def contains(self, keys):
+        return self.find(keys) >= 0
+
+    def get(self, keys, default=0):
+        pos = self.find(keys)
+        return np.where(pos >= 0, self.values[pos], default)
+
+
+class DenseKeys():
+    '''Lookup table with the same interface as SortedKeys for small key spaces, stored as a dense array.'''
+    def __init__(self, keys, values, size):
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self.values = values
+        self.table = np.zeros(size, dtype=values.dtype)
+        self.table[self.keys] = values
+        self.present = np.zeros(size, dtype=bool)
+        self.present[self.keys] = True
+
+    def contains(self, keys):
+        return self.present[keys]
+
+    def get(self, keys, default=0):
+        if default == 0:
+            return self.table[keys]
+        return np.where(self.present[keys], self.table[keys], default)
+
+
+def _lookup_table(keys, values, size, dense_limit=DENSE_LIMIT):
+    if size <= dense_limit:
+        if values is None:
+            values = np.ones(len(keys), dtype=bool)
+        return DenseKeys(keys, values, size)
+    return SortedKeys(keys, values)
+
+
+class PairIndex():
+    '''Index of the adjacent node pairs, i.e. the pairs that share at least one hyperedge.
+
+    The pairs are stored in both orders as sorted packed keys v1 * n + v2, which is also a
+    CSR structure (indptr, indices) whose row v lists the neighbors of v in ascending order.
+    For each pair the index holds the number of shared hyperedges (count, from B^T B) and
+    the smallest size of a shared hyperedge (min_size, computed on first use with
+    min_size_projection). Queries take arrays of packed keys; get and contains answer the
+    co-membership counts from a dense table when the key space is small.
+
+    sizes overrides the hyperedge sizes used for min_size (see min_size_projection).
+    '''
+    def __init__(self, core: CSRCore, budget=DEFAULT_BUDGET, sizes=None, dense_limit=DENSE_LIMIT):
+        B = core.incidence_matrix()
+        C = (B.T @ B).tocsr()
+        C.setdiag(0)
+        C.eliminate_zeros()
+        C.sort_indices()
+        n = core.num_nodes
+        self.num_nodes = n
+        self.indptr = C.indptr.astype(np.int64)
+        self.indices = C.indices.astype(np.int32)
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(self.indptr))
+        self.keys = rows * n + self.indices
+        self.count = C.data.astype(np.int64)
+        self._dense_limit = dense_limit
+        self._lookup = None
+
+        self._core = core
+        self._budget = budget
+        self._sizes = sizes
+        self._min_size = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def min_size(self):
+        '''Smallest size of a hyperedge shared by each pair, aligned with keys.'''
+        if self._min_size is None:
+            with profiling.phase('index'):
+                P = min_size_projection(self._core, self._budget, self._sizes)
+                P.sort_indices()
+                rows = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(P.indptr))
+                self._min_size = SortedKeys(rows * self.num_nodes + P.indices, P.data).get(self.keys)
+            self._core = None
+        return self._min_size
+
+    @property
+    def _table(self):
+        # neighbors だけを使うときは作らない
+        if self._lookup is None:
+            self._lookup = _lookup_table(self.keys, self.count, self.num_nodes ** 2, self._dense_limit)
+        return self._lookup
+
+    def find(self, keys):
+        '''Position of each key in the index (-1 if the pair is not adjacent).'''
+        return SortedKeys(self.keys).find(keys)
+
+    def contains(self, keys):
+        return self._table.contains(keys)
+
+    def get(self, keys, default=0):
+        '''Number of hyperedges shared by each pair (default if not adjacent).'''
+        return self._table.get(keys, default)
+
+    def min_sizes(self, keys, default=0):
+        '''Smallest size of a hyperedge shared by each pair (default if not adjacent).'''
+        pos = self.find(keys)
+        return np.where(pos >= 0, self.min_size[pos], default)
+
+    def neighbors(self, v):
+        '''Nodes adjacent to v (remapped ids, ascending).'''
+        return self.indices[self.indptr[v]:self.indptr[v + 1]]
+
+    def projection(self):
+        '''Projected graph with entries min_size (symmetric int64 CSR matrix).'''
+        n = self.num_nodes
+        return sp.csr_matrix((self.min_size, self.indices, self.indptr), shape=(n, n))
+
+
+def pair_index(core: CSRCore) -> PairIndex:
+    '''PairIndex of core, built once and cached on the core.'''
+    if core._pair_index is None:
+        with profiling.phase('index'):
+            core._pair_index = PairIndex(core)
+    return core._pair_index
+
+
+def incidence_keys(core: CSRCore):
+    '''Membership table of the (hyperedge, node) pairs (keys e * n + v).'''
+    keys = core.pin_hyperedges().astype(np.int64) * core.num_nodes + core.indices
+    keys.sort()
+    return _lookup_table(keys, None, core.num_hyperedges * core.num_nodes)
+
+
+def incident_pairs(core: CSRCore, budget=DEFAULT_BUDGET):
+    '''Enumerate the pairs of hyperedges incident to each node in chunks.
+
+    Yields arrays (v, e1, e2) with e1 before e2 in the incidence list of v, i.e.
+    itertools.combinations(elist[v], 2) for all nodes v.
+    '''
+    deg = core.node_degrees()
+    owner, a = _expand(deg)
+    remaining = deg[owner] - 1 - a  # number of pairs (a, b) with b > a
+    for start, stop in _chunks(remaining, budget):
+        entry, k = _expand(remaining[start:stop])
+        v = owner[start:stop][entry]
+        base = core.node_indptr[v]
+        pos_a = a[start:stop][entry]
+        e1 = core.node_indices[base + pos_a]
+        e2 = core.node_indices[base + pos_a + 1 + k]
+        yield v, e1, e2
+
+
+def member_pairs(core: CSRCore, e1, e2, budget=DEFAULT_BUDGET, positions=False):
+    '''Enumerate the node pairs (v1, v2) with v1 in e1 and v2 in e2 for each hyperedge pair in chunks.
+
+    Yields arrays (p, v1, v2), where p is the index of the hyperedge pair, ordered by p and
+    then by the positions of v1 and v2. With positions=True, yields (p, a, b, v1, v2),
+    where a and b are the positions of v1 in e1 and v2 in e2.
+    '''
+    sizes = core.hyperedge_sizes()
+    s2 = sizes[e2]
+    cost = sizes[e1] * s2
+    for start, stop in _chunks(cost, budget):
+        p, t = _expand(cost[start:stop])
+        p += start
+        a = t // s2[p]
+        b = t - a * s2[p]
+        v1 = core.indices[core.indptr[e1[p]] + a]
+        v2 = core.indices[core.indptr[e2[p]] + b]
+        if positions:
+            yield p, a, b, v1, v2
+        else:
+            yield p, v1, v2
+
+
+def member_grids(core: CSRCore, e1, e2, budget=DEFAULT_BUDGET):
+    '''Enumerate the members of hyperedge pairs as dense grids, grouped by the sizes of the hyperedges.
+
+    Yields arrays (idx, V1, V2) for groups of pairs with |e1| = s1 and |e2| = s2, where idx
+    (shape (P,)) are the indices of the pairs, V1 (shape (P, s1)) the members of e1 and
+    V2 (shape (P, s2)) the members of e2. Broadcasting V1[:, :, None] against
+    V2[:, None, :] gives all node pairs (v1, v2). Each group has at most budget node pairs.
+    '''
+    sizes = core.hyperedge_sizes()
+    s1, s2 = sizes[e1], sizes[e2]
+    order = np.lexsort((s2, s1))
+    bounds = np.flatnonzero((np.diff(s1[order]) != 0) | (np.diff(s2[order]) != 0)) + 1
+    for group in np.split(order, bounds):
+        if len(group) == 0:
+            continue
+        a, b = int(s1[group[0]]), int(s2[group[0]])
+        step = max(budget // max(a * b, 1), 1)
+        for start in range(0, len(group), step):
+            idx = group[start:start + step]
+            V1 = core.indices[core.indptr[e1[idx]][:, None] + np.arange(a)]
+            V2 = core.indices[core.indptr[e2[idx]][:, None] + np.arange(b)]
+            yield idx, V1, V2
+
+
+def opsahl_sparse(core: CSRCore, budget=DEFAULT_BUDGET):
+    '''Numerators and denominators (int64 arrays) of Opsahl's clustering coefficients.
+
+    Same counts as HyperGraph.node_clustering_coefficient_opsahl_by_fraction: for each
+    node v, each pair of hyperedges e1, e2 of v and each v1 in e1, v2 in e2 (v1, v2, v
+    distinct), the pair (v1, v2) is closed if they share a hyperedge other than e1, e2.
+    '''
+    n = core.num_nodes
+    numer = np.zeros(n, dtype=np.int64)
+    denom = np.zeros(n, dtype=np.int64)
+
+    index = pair_index(core)
+    inc = incidence_keys(core)
+
+    for v, e1, e2 in incident_pairs(core, budget):
+        for p, v1, v2 in member_pairs(core, e1, e2, budget):
+            owner = v[p]
+            mask = (v1 != owner) & (v2 != owner) & (v1 != v2)
+            owner, v1, v2 = owner[mask], v1[mask], v2[mask]
+            pe1, pe2 = e1[p][mask].astype(np.int64), e2[p][mask].astype(np.int64)
+
+            # co-membership of v1 and v2 excluding e1 and e2
+            shared = index.get(v1.astype(np.int64) * n + v2)
+            sel = shared > 0
+            shared[sel] -= inc.contains(pe1[sel] * n + v2[sel])
+            shared[sel] -= inc.contains(pe2[sel] * n + v1[sel])
+
+            denom += np.bincount(owner, minlength=n)
+            numer += np.bincount(owner[shared > 0], minlength=n)
+
+    return numer, denom
+
+
+def intersecting_pairs(core: CSRCore, budget=DEFAULT_BUDGET, nodes=None):
+    '''Enumerate the pairs of hyperedges e1 < e2 that share at least one node in chunks.
+
+    Yields arrays (e1, e2) from the upper triangle of B B^T, computed for blocks of rows of B.
+    If nodes is given, only the pairs that share one of these nodes are enumerated.
+    '''
+    B = core.incidence_matrix()
+    deg = core.node_degrees()
+    if nodes is not None:
+        B = B[:, nodes]
+        deg = np.zeros_like(deg)
+        deg[nodes] = core.node_degrees()[nodes]
+    BT = B.T.tocsr()
+    # upper bound of the number of hyperedges intersecting each hyperedge
+    cost = np.bincount(core.pin_hyperedges(), weights=deg[core.indices], minlength=core.num_hyperedges)
+    for start, stop in _chunks(cost, budget):
+        C = (B[start:stop] @ BT).tocoo()
+        e1 = C.row.astype(np.int32) + start
+        e2 = C.col.astype(np.int32)
+        mask = e1 < e2
+        e1, e2 = e1[mask], e2[mask]
+        if len(e1) == 0:
+            continue
+        order = np.lexsort((e2, e1))
+        yield e1[order], e2[order]
+
+
+def opsahl_denominators(core: CSRCore, index=None):
+    '''Denominators of Opsahl's clustering coefficients in closed form.
+
+    For a node v and hyperedges e1, e2 of v there are (|e1| - 1)(|e2| - 1) - (|e1 & e2| - 1)
+    node pairs (v1, v2). Summed over the pairs of hyperedges of v, this is
+    (S1^2 - S2) / 2 - sum_{u != v} C(m(v, u), 2), where S1 and S2 are the sums of
+    |e| - 1 and (|e| - 1)^2 over the hyperedges of v and m(v, u) is the number of
+    hyperedges shared by v and u.
+    '''
+    n = core.num_nodes
+    if index is None:
+        index = pair_index(core)
+    s = (core.hyperedge_sizes() - 1)[core.node_indices]
+    v = np.repeat(np.arange(n), core.node_degrees())
+    S1 = np.zeros(n, dtype=np.int64)
+    S2 = np.zeros(n, dtype=np.int64)
+    np.add.at(S1, v, s)
+    np.add.at(S2, v, s * s)
+
+    overlap = np.zeros(n, dtype=np.int64)
+    np.add.at(overlap, index.keys // max(n, 1), index.count * (index.count - 1) // 2)
+    return (S1 * S1 - S2) // 2 - overlap
+
+
+def _grid_comembership(index, n, V1, V2):
+    '''Co-membership counts of the member grids V1 x V2.'''
+    return index.get(V1[:, :, None].astype(np.int64) * n + V2[:, None, :])
+
+
+def _opsahl_grid(numer, V1, V2, same, shared):
+    '''Add the Opsahl numerators of a group of hyperedge pairs with member grids V1 x V2.'''
+    n = len(numer)
+    v1_in_e2 = _any(same, 2)
+    v2_in_e1 = _any(same, 1)
+    shared = shared - v2_in_e1[:, None, :] - v1_in_e2[:, :, None]
+    closed = (shared > 0) & ~same
+
+    # F of each pair credited to the nodes in the intersection
+    F = _count(_count(closed, 2), 1)  # sums of booleans are small enough for int64
+    numer += np.bincount(V1.ravel(), weights=(v1_in_e2 * F[:, None]).ravel(), minlength=n).astype(np.int64)
+    # closed pairs that contain the credited node itself
+    numer -= np.bincount(V1.ravel(), weights=_count(closed & v1_in_e2[:, :, None], 2).ravel(), minlength=n).astype(np.int64)
+    numer -= np.bincount(V2.ravel(), weights=_count(closed & v2_in_e1[:, None, :], 1).ravel(), minlength=n).astype(np.int64)
+
+
+class _ZhouChunk():
+    '''Contributions of a chunk of hyperedge pairs to Zhou's numerators.'''
+    def __init__(self, num_pairs):
+        self.contrib = np.zeros(num_pairs)
+        self.shared_pair = []
+        self.shared_node = []
+
+    def add_grid(self, idx, V1, V2, same, shared):
+        in_e2 = _any(same, 2)
+        pos = np.nonzero(in_e2)
+        self.shared_pair.append(idx[pos[0]])
+        self.shared_node.append(V1[pos])
+
+        d12 = ~in_e2  # v1 in e1 - e2
+        d21 = ~_any(same, 1)  # v2 in e2 - e1
+
+        # adjacent nodes v1 in e1 - e2 and v2 in e2 - e1
+        ok = shared > 0
+        ok &= d12[:, :, None] & d21[:, None, :]
+        eo2 = _count(_any(ok, 2), 1)
+        eo1 = _count(_any(ok, 1), 1)
+
+        n12 = _count(d12, 1)
+        n21 = _count(d21, 1)
+        valid = (n12 > 0) & (n21 > 0)
+        self.contrib[idx[valid]] = (eo1[valid] + eo2[valid]) / (n12[valid] + n21[valid])
+
+    def add_to(self, numer):
+        '''Add the contributions to the nodes in the intersections in the order of the pairs.'''
+        shared_pair = np.concatenate(self.shared_pair)
+        shared_node = np.concatenate(self.shared_node)
+        order = np.argsort(shared_pair, kind='stable')
+        np.add.at(numer, shared_node[order], self.contrib[shared_pair[order]])
+
+
+def opsahl_pairs(core: CSRCore, budget=DEFAULT_BUDGET):
+    '''Numerators and denominators of Opsahl's clustering coefficients, enumerating each intersecting pair of hyperedges once.
+
+    For a pair (e1, e2), let F be the number of closed node pairs (v1, v2), v1 in e1, v2 in e2,
+    v1 != v2. Every node v in the intersection is credited F minus the closed pairs that
+    contain v itself; these are exactly the closed pairs with v1 in e2 (then v = v1) or
+    v2 in e1 (then v = v2), so the corrections come from the same enumeration.
+    Same counts as HyperGraph.node_clustering_coefficient_opsahl_by_fraction.
+    '''
+    n = core.num_nodes
+    numer = np.zeros(n, dtype=np.int64)
+
+    index = pair_index(core)
+
+    for e1, e2 in intersecting_pairs(core, budget):
+        for _, V1, V2 in member_grids(core, e1, e2, budget):
+            same = V1[:, :, None] == V2[:, None, :]
+            _opsahl_grid(numer, V1, V2, same, _grid_comembership(index, n, V1, V2))
+
+    return numer, opsahl_denominators(core, index)
+
+
+def zhou_pairs(core: CSRCore, budget=DEFAULT_BUDGET):
+    '''Numerators and denominators of Zhou's clustering coefficients, enumerating each intersecting pair of hyperedges once.
+
+    The contribution (eo1 + eo2) / (|e1 - e2| + |e2 - e1|) of a pair (e1, e2) is the same
+    for every node in e1 & e2, so it is computed once and added to those nodes. The
+    contributions are added in the order of the pairs (as in
+    HyperGraph.node_clustering_coefficient_zhou), so the sums are bit-identical.
+    Adjacency is looked up in the PairIndex.
+    '''
+    n = core.num_nodes
+    numer = np.zeros(n, dtype=np.float64)
+
+    index = pair_index(core)
+
+    for e1, e2 in intersecting_pairs(core, budget):
+        chunk = _ZhouChunk(len(e1))
+        for idx, V1, V2 in member_grids(core, e1, e2, budget):
+            same = V1[:, :, None] == V2[:, None, :]
+            chunk.add_grid(idx, V1, V2, same, _grid_comembership(index, n, V1, V2))
+        chunk.add_to(numer)
+
+    return numer, zhou_denominators(core)
+
+
+def zhou_contributions(core: CSRCore, e1, e2, index=None, budget=DEFAULT_BUDGET):
+    '''Contribution (eo1 + eo2) / (|e1 - e2| + |e2 - e1|) of each pair of hyperedges (e1[i], e2[i]) to Zhou's numerators.'''
+    n = core.num_nodes
+    if index is None:
+        index = pair_index(core)
+    chunk = _ZhouChunk(len(e1))
+    for idx, V1, V2 in member_grids(core, e1, e2, budget):
+        same = V1[:, :, None] == V2[:, None, :]
+        chunk.add_grid(idx, V1, V2, same, _grid_comembership(index, n, V1, V2))
+    return chunk.contrib
+
+
+def zhou_denominators(core: CSRCore):
+    '''Number of pairs of hyperedges of each node.'''
+    deg = core.node_degrees()
+    return deg * (deg - 1) // 2
+
+
+def _merge_first(keys, values, more_keys, more_values):
+    '''Sorted unique keys of keys and the arrays of more_keys, with the value of the first occurrence of each key.'''
+    merged, first = np.unique(np.concatenate([keys] + more_keys), return_index=True)
+    return merged, np.concatenate([values] + more_values)[first]
+
+
+def min_size_projection(core: CSRCore, budget=DEFAULT_BUDGET, sizes=None):
+    '''Projected graph whose entry (v1, v2) is the smallest size of a hyperedge shared by v1 and v2 (symmetric int64 CSR matrix).
+
+    The hyperedges are scanned in ascending order of size, so the first size seen for a
+    node pair is its minimum. The pairs of each chunk are kept as packed keys v1 * n + v2
+    (v1 < v2) and merged into the sorted keys of the earlier chunks only once the pending
+    keys are as many as the merged ones, so each key is re-sorted O(log) times and the
+    memory use stays proportional to the number of projected edges plus the budget.
+    sizes overrides the sizes of the hyperedges (e.g. the original
+    sizes of hyperedges whose members were restricted to a subset of the nodes).
+    '''
+    n = core.num_nodes
+    members = core.hyperedge_sizes()
+    if sizes is None:
+        sizes = members
+    order = np.argsort(sizes, kind='stable')
+    keys = np.empty(0, dtype=np.int64)
+    emin = np.empty(0, dtype=np.int64)
+    pending_keys, pending_size, pending = [], [], 0
+
+    for start, stop in _chunks(members[order] ** 2, budget):
+        es = order[start:stop]
+        s = members[es]
+        owner, k = _expand(s * s)
+        base = core.indptr[es][owner]
+        v1 = core.indices[base + k // s[owner]].astype(np.int64)
+        v2 = core.indices[base + k % s[owner]].astype(np.int64)
+        mask = v1 < v2
+        chunk_keys = v1[mask] * n + v2[mask]
+        chunk_size = sizes[es][owner][mask]
+
+        # the smallest size within the chunk, then only the pairs not seen in earlier chunks
+        chunk_keys, first = np.unique(chunk_keys, return_index=True)
+        chunk_size = chunk_size[first]
+        new = ~SortedKeys(keys).contains(chunk_keys)
+        if not np.any(new):
+            continue
+        pending_keys.append(chunk_keys[new])
+        pending_size.append(chunk_size[new])
+        pending += int(new.sum())
+        if pending >= max(len(keys), budget):
+            keys, emin = _merge_first(keys, emin, pending_keys, pending_size)
+            pending_keys, pending_size, pending = [], [], 0
+
+    if pending_keys:
+        keys, emin = _merge_first(keys, emin, pending_keys, pending_size)
+    rows, cols = np.divmod(keys, max(n, 1))
+    U = sp.csr_matrix((emin, (rows, cols)), shape=(n, n))
+    return (U + U.T).tocsr()
+
+
+def proposed_sparse(core: CSRCore, budget=DEFAULT_BUDGET, index=None):
+    '''Numerators and denominators of the proposed clustering coefficients from the weighted projection W.
+
+    W(v1, v2) = 1 / (emin - 1), where emin is the smallest size of a hyperedge shared by
+    v1 and v2. Over the pairs of neighbors v1, v2 of v, the numerator sums
+    W(v, v1) W(v, v2) W(v1, v2), i.e. diag(W^3) / 2, and the denominator sums
+    W(v, v1) W(v, v2), i.e. ((sum_u W(v, u))^2 - sum_u W(v, u)^2) / 2.
+    diag(W^3) is computed for blocks of rows so that W^2 is never stored as a whole.
+    emin is taken from the PairIndex of core unless index is given.
+    '''
+    n = core.num_nodes
+    if index is None:
+        index = pair_index(core)
+    W = index.projection().astype(np.float64)
+    W.data = 1.0 / (W.data - 1)
+
+    S1 = np.asarray(W.sum(axis=1)).ravel()
+    S2 = np.asarray(W.multiply(W).sum(axis=1)).ravel()
+    denom = (S1 * S1 - S2) / 2
+
+    numer = np.zeros(n, dtype=np.float64)
+    nnz = np.diff(W.indptr)
+    # number of products in the rows of W^2
+    cost = np.bincount(np.repeat(np.arange(n), nnz), weights=nnz[W.indices], minlength=n)
+    for start, stop in _chunks(cost, budget):
+        R = W[start:stop]
+        numer[start:stop] = np.asarray((R @ W).multiply(R).sum(axis=1)).ravel() / 2
+
+    return numer, denom
+
+
+def triangles(A, budget=DEFAULT_BUDGET):
+    '''Number of triangles through each node of the undirected graph with the symmetric CSR adjacency matrix A.
+
+    The edges are oriented from the lower to the higher (degree, id) rank, and each wedge
+    (v1, v2) of the out-neighbors of a node is checked for the edge v1 - v2 in the sorted
+    packed keys of the oriented edges. Each triangle is found once, at its lowest-ranked
+    node, and credited to its three nodes. The diagonal of A (self-loops) is ignored.
+    '''
+    n = A.shape[0]
+    A = A.tocoo()
+    mask = A.row != A.col
+    rows, cols = A.row[mask].astype(np.int64), A.col[mask].astype(np.int64)
+    deg = np.bincount(rows, minlength=n)
+
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), deg))] = np.arange(n)
+    fwd = rank[rows] < rank[cols]
+    rows, cols = rows[fwd], cols[fwd]
+    order = np.lexsort((rank[cols], rows))
+    rows, cols = rows[order], cols[order]
+    out_deg = np.bincount(rows, minlength=n)
+    out_ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(out_deg, out=out_ptr[1:])
+    edges = SortedKeys(np.sort(rows * n + cols))
+
+    tri = np.zeros(n, dtype=np.int64)
+    for start, stop in _chunks(out_deg * out_deg, budget):
+        d = out_deg[start:stop]
+        owner, k = _expand(d * d)
+        a, b = np.divmod(k, d[owner])
+        sel = a < b
+        owner, a, b = owner[sel], a[sel], b[sel]
+        base = out_ptr[start:stop][owner]
+        v1, v2 = cols[base + a], cols[base + b]
+        closed = edges.contains(v1 * n + v2)
+        u = owner[closed] + start
+        tri += np.bincount(u, minlength=n)
+        tri += np.bincount(v1[closed], minlength=n)
+        tri += np.bincount(v2[closed], minlength=n)
+
+    return tri, deg
+
+
+def simple_sparse(core: CSRCore, budget=DEFAULT_BUDGET, index=None):
+    '''Numerators 2T and denominators d(d - 1) (int64 arrays) of the clustering coefficients on the projected graph.
+
+    Same values as networkx.clustering on the projected simple graph: T is the number of
+    triangles and d the number of neighbors of each node. The adjacency is taken from the
+    PairIndex of core unless index is given.
+    '''
+    if index is None:
+        index = pair_index(core)
+    n = core.num_nodes
+    A = sp.csr_matrix((np.ones(len(index), dtype=np.int64), index.indices, index.indptr), shape=(n, n))
+    tri, deg = triangles(A, budget)
+    return 2 * tri, deg * (deg - 1)
+
+
+def coefficients(core: CSRCore, methods=METHODS, budget=DEFAULT_BUDGET, index=None, nodes=None):
+    '''Numerators and denominators of several clustering coefficients at once, as a dictionary method -> (numer, denom).
+
+    The intermediates are built once and shared: the PairIndex (co-membership counts and
+    smallest shared sizes) for all methods, and a single enumeration of the intersecting
+    pairs of hyperedges for opsahl and zhou. opsahl and zhou assume that no hyperedge
+    contains the same node twice (see CSRCore.is_simple).
+    index is the PairIndex of core by default. If nodes is given, the numerators of
+    opsahl and zhou are exact only for these nodes.
+    '''
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        msg = f"Error: Unknown methods {sorted(unknown)}."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    n = core.num_nodes
+    if index is None:
+        index = pair_index(core)
+    out = {}
+    if 'opsahl' in methods or 'zhou' in methods:
+        opsahl_numer = np.zeros(n, dtype=np.int64)
+        zhou_numer = np.zeros(n, dtype=np.float64)
+        for e1, e2 in intersecting_pairs(core, budget, nodes):
+            chunk = _ZhouChunk(len(e1))
+            for idx, V1, V2 in member_grids(core, e1, e2, budget):
+                same = V1[:, :, None] == V2[:, None, :]
+                shared = _grid_comembership(index, n, V1, V2)
+                if 'opsahl' in methods:
+                    _opsahl_grid(opsahl_numer, V1, V2, same, shared)
+                if 'zhou' in methods:
+                    chunk.add_grid(idx, V1, V2, same, shared)
+            if 'zhou' in methods:
+                chunk.add_to(zhou_numer)
+        if 'opsahl' in methods:
+            out['opsahl'] = (opsahl_numer, opsahl_denominators(core, index))
+        if 'zhou' in methods:
+            out['zhou'] = (zhou_numer, zhou_denominators(core))
+
+    if 'proposed' in methods:
+        out['proposed'] = proposed_sparse(core, budget, index)
+    if 'simple' in methods:
+        out['simple'] = simple_sparse(core, budget, index)
+
+    return {m: out[m] for m in methods}
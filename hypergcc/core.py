@@ -0,0 +1,258 @@
+'''
+Compact array (CSR) representation of a hypergraph.
+
+Node ids are remapped to contiguous int32 ids 0, 1, ..., n-1 in the order of
+``node_ids``. Hyperedge i consists of the nodes ``indices[indptr[i]:indptr[i+1]]``
+and the transposed incidence gives the hyperedges to which node j belongs,
+``node_indices[node_indptr[j]:node_indptr[j+1]]`` (in ascending order).
+
+The view classes expose the arrays with the same interface as the ``V``, ``E``
+and ``elist`` attributes of ``hypergcc.hypergraph.HyperGraph``.
+'''
+import warnings
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CSRCore():
+    def __init__(self, node_ids, indptr, indices, node_indptr=None, node_indices=None):
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)  # original id of each node
+        self.indptr = np.asarray(indptr, dtype=np.int64)  # offsets of the hyperedges in indices
+        self.indices = np.asarray(indices, dtype=np.int32)  # members of the hyperedges (remapped ids)
+
+        if node_indptr is None or node_indices is None:
+            node_indptr, node_indices = self._transpose()
+        self.node_indptr = np.asarray(node_indptr, dtype=np.int64)
+        self.node_indices = np.asarray(node_indices, dtype=np.int32)
+
+        self._pins = None
+        self._sorter = None
+        self._sorted_ids = None
+        self._simple = None
+        self._pair_index = None  # hypergcc.clustering.pair_index
+
+    @classmethod
+    def from_lists(cls, V, E):
+        '''Build the core from a list of nodes V and a list of hyperedges E.'''
+        local = {v: i for i, v in enumerate(V)}
+        sizes = np.fromiter((len(e) for e in E), dtype=np.int64, count=len(E))
+        indptr = np.zeros(len(E) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        indices = np.fromiter((local[v] for e in E for v in e), dtype=np.int32, count=int(indptr[-1]))
+        return cls(np.fromiter(V, dtype=np.int64, count=len(V)), indptr, indices)
+
+    def _transpose(self):
+        n = len(self.node_ids)
+        counts = np.bincount(self.indices, minlength=n)
+        node_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=node_indptr[1:])
+        # stable sort keeps the hyperedges of each node in ascending order
+        order = np.argsort(self.indices, kind='stable')
+        node_indices = self.pin_hyperedges()[order]
+        return node_indptr, node_indices
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_hyperedges(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def num_pins(self) -> int:
+        return len(self.indices)
+
+    def hyperedge_sizes(self):
+        '''Size of each hyperedge as an int64 array.'''
+        return np.diff(self.indptr)
+
+    def node_degrees(self):
+        '''Degree of each node (remapped ids) as an int64 array.'''
+        return np.diff(self.node_indptr)
+
+    def pin_hyperedges(self):
+        '''Hyperedge index of each entry of indices.'''
+        return np.repeat(np.arange(self.num_hyperedges, dtype=np.int32), self.hyperedge_sizes())
+
+    def hyperedge(self, e_i):
+        '''Members (remapped ids) of hyperedge e_i.'''
+        return self.indices[self.indptr[e_i]:self.indptr[e_i + 1]]
+
+    def incident_hyperedges(self, j):
+        '''Hyperedges to which the node with remapped id j belongs.'''
+        return self.node_indices[self.node_indptr[j]:self.node_indptr[j + 1]]
+
+    @property
+    def pins(self):
+        '''Members of all hyperedges by original node id, aligned with indices.'''
+        if self._pins is None:
+            self._pins = self.node_ids[self.indices]
+            self._pins.flags.writeable = False
+        return self._pins
+
+    def _sort_ids(self):
+        if self._sorter is None:
+            self._sorter = np.argsort(self.node_ids, kind='stable')
+            self._sorted_ids = self.node_ids[self._sorter]
+
+    def local_ids(self, v):
+        '''Remapped ids of the original node ids v (-1 for unknown nodes).'''
+        self._sort_ids()
+        v = np.asarray(v, dtype=np.int64)
+        if len(self.node_ids) == 0:
+            return np.full(v.shape, -1, dtype=np.int64)
+        sorted_ids = self._sorted_ids
+        pos = np.searchsorted(sorted_ids, v)
+        pos = np.minimum(pos, len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == v, self._sorter[pos], -1)
+
+    def local_id(self, v) -> int:
+        # 1ノードずつ引かれることが多いので配列を作らずに探す
+        self._sort_ids()
+        pos = int(self._sorted_ids.searchsorted(v))
+        if pos < len(self._sorted_ids) and self._sorted_ids[pos] == v:
+            return int(self._sorter[pos])
+        return -1
+
+    def is_simple(self) -> bool:
+        '''True if no hyperedge contains the same node more than once.'''
+        if self._simple is None:
+            n = max(self.num_nodes, 1)
+            keys = self.pin_hyperedges().astype(np.int64) * n + self.indices
+            keys.sort()
+            self._simple = not bool(np.any(keys[1:] == keys[:-1]))
+        return self._simple
+
+    def incidence_matrix(self):
+        '''Hyperedge-node incidence matrix B (|E| x |V|, scipy.sparse CSR).'''
+        import scipy.sparse as sp
+        data = np.ones(self.num_pins, dtype=np.int64)
+        B = sp.csr_matrix((data, self.indices, self.indptr), shape=(self.num_hyperedges, self.num_nodes), copy=True)
+        B.sum_duplicates()
+        return B
+
+    def to_lists(self):
+        '''Materialize V, E and elist of hypergcc.hypergraph.HyperGraph.'''
+        V = self.node_ids.tolist()
+        E = [e.tolist() for e in np.split(self.pins, self.indptr[1:-1])] if self.num_hyperedges > 0 else []
+        if self.num_nodes > 0:
+            incident = np.split(self.node_indices, self.node_indptr[1:-1])
+            elist = {v: el.tolist() for v, el in zip(V, incident)}
+        else:
+            elist = {}
+        return V, E, elist
+
+
+def _load_ints(path):
+    '''Read a text file with one integer per line into an int64 array.'''
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)  # empty file
+        return np.loadtxt(path, dtype=np.int64, ndmin=1)
+
+
+def read_hypergraph_arrays(f_nverts_path, f_hyperedges_path) -> CSRCore:
+    '''Read a hypergraph in the ScHoLP format ({name}_nverts.txt and {name}_hyperedges.txt) into a CSRCore.
+
+    Nodes are numbered in the order of their first appearance, as in read_hypergraph_from_file.
+    '''
+    sizes = _load_ints(f_nverts_path)
+    pins = _load_ints(f_hyperedges_path)
+
+    indptr = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=indptr[1:])
+    if len(pins) < indptr[-1]:
+        msg = "Error: The number of nodes in the hyperedges file is smaller than the sum of nverts."
+        logger.error(msg)
+        raise ValueError(msg)
+    pins = pins[:indptr[-1]]
+
+    # np.unique sorts the node ids; reorder them by their first appearance
+    uniq, first, inverse = np.unique(pins, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+
+    return CSRCore(uniq[order], indptr, rank[inverse.reshape(-1)])
+
+
+class NodeView(Sequence):
+    '''Read-only list of the original node ids.'''
+    def __init__(self, core: CSRCore):
+        self._core = core
+        self._list = None
+
+    def _as_list(self):
+        if self._list is None:
+            self._list = self._core.node_ids.tolist()
+        return self._list
+
+    def __len__(self):
+        return self._core.num_nodes
+
+    def __getitem__(self, i):
+        return self._as_list()[i]
+
+    def __iter__(self):
+        return iter(self._as_list())
+
+    def __contains__(self, v):
+        return self._core.local_id(v) >= 0
+
+    def __repr__(self):
+        return repr(self._as_list())
+
+
+class HyperedgeView(Sequence):
+    '''Read-only list of hyperedges. Each hyperedge is a NumPy view of original node ids.'''
+    def __init__(self, core: CSRCore):
+        self._core = core
+
+    def __len__(self):
+        return self._core.num_hyperedges
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < 0 or len(self) <= i:
+            raise IndexError('hyperedge index out of range')
+        indptr = self._core.indptr
+        return self._core.pins[indptr[i]:indptr[i + 1]]
+
+    def __iter__(self):
+        pins = self._core.pins
+        indptr = self._core.indptr
+        for i in range(len(self)):
+            yield pins[indptr[i]:indptr[i + 1]]
+
+
+class IncidenceView(Mapping):
+    '''Read-only dictionary mapping each node to the indices of its hyperedges.'''
+    def __init__(self, core: CSRCore):
+        self._core = core
+
+    def __getitem__(self, v):
+        j = self._core.local_id(v)
+        if j < 0:
+            raise KeyError(v)
+        return self._core.incident_hyperedges(j)
+
+    def __iter__(self):
+        return iter(self._core.node_ids.tolist())
+
+    def __len__(self):
+        return self._core.num_nodes
+
+    def __contains__(self, v):
+        return self._core.local_id(v) >= 0
+
+    def values(self):
+        indptr = self._core.node_indptr
+        indices = self._core.node_indices
+        return [indices[indptr[j]:indptr[j + 1]] for j in range(self._core.num_nodes)]
@@ -0,0 +1,361 @@
+'''
+Clustering coefficients maintained under changes of the hypergraph.
+
+DynamicClustering keeps the numerator and the denominator of each node for
+each method. When a node v is added to or removed from a hyperedge e, the
+contributions that can change are evaluated with and without v in e, and the
+differences are added to the nodes they belong to:
+
+- opsahl, zhou: the numerators are sums over the pairs of hyperedges (e1, e2)
+  of a node, and a pair contributes the same way to every node in e1 & e2
+  (see hypergcc.clustering.opsahl_pairs and zhou_pairs). Only the pairs that
+  contain e, or whose closure changes because the co-membership of v and a
+  member of e changes, are evaluated.
+- proposed, simple: the numerators are sums over the triangles of the
+  projected graph (of the product of the three weights, or 2 for simple).
+  Only the triangles on the projected edges whose weight changes, i.e. the
+  pairs in e (their smallest common hyperedge may be e) or the pairs (v, u)
+  that become adjacent or not, are evaluated. The denominators of the endpoints
+  of these edges are recounted from their weights.
+
+Adding or removing a whole hyperedge is done node by node. The cost of each
+change depends on the neighborhood of e, not on the size of the hypergraph.
+'''
+import itertools
+
+from hypergcc import clustering
+from hypergcc.core import CSRCore
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class _State():
+    '''The hypergraph of a DynamicClustering, or the same hypergraph without v in E[e_i] if without=(v, e_i).'''
+    def __init__(self, dc, without=None):
+        self.dc = dc
+        self.v, self.e_i = without if without is not None else (None, None)
+        self._weights = {}
+
+    def members(self, e_j):
+        e = self.dc.E[e_j]
+        return e - {self.v} if e_j == self.e_i else e
+
+    def m(self, u, w):
+        '''Number of hyperedges shared by u and w.'''
+        count = self.dc.shared.get((u, w) if u < w else (w, u), 0)
+        if self.v is not None and (u == self.v or w == self.v) and (u in self.dc.E[self.e_i] and w in self.dc.E[self.e_i]):
+            count -= 1
+        return count
+
+    def weight(self, u, w):
+        '''Weight 1 / (emin - 1) of the proposed coefficient (0 if u and w are not adjacent).'''
+        key = (u, w) if u < w else (w, u)
+        if key not in self._weights:
+            common = self.dc.elist[u] & self.dc.elist[w]
+            if self.v is not None and self.v in key:
+                common = common - {self.e_i}
+            if len(common) == 0:
+                self._weights[key] = 0.0
+            else:
+                emin = min(len(self.dc.E[e]) - (e == self.e_i) for e in common)
+                self._weights[key] = 1 / (emin - 1)
+        return self._weights[key]
+
+
+class DynamicClustering():
+    '''Per-node clustering coefficients of a hypergraph that is modified by hyperedge edits.
+
+    Hyperedges are sets of nodes (a hyperedge cannot contain the same node twice).
+    The values agree with the methods of hypergcc.hypergraph.HyperGraph on the modified
+    hypergraph (zhou and proposed up to floating-point rounding).
+    '''
+    def __init__(self, V, E, methods=clustering.METHODS):
+        self.methods = list(methods)
+        unknown = set(self.methods) - set(clustering.METHODS)
+        if unknown:
+            msg = f"Error: Unknown methods {sorted(unknown)}."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        self.V = list(V)
+        self.E = [set(e) for e in E]
+        if any(len(s) != len(e) for s, e in zip(self.E, E)):
+            msg = "Error: Some hyperedges contain the same node twice."
+            logger.error(msg)
+            raise ValueError(msg)
+        self.elist = {v: set() for v in self.V}
+        for e_i, e in enumerate(self.E):
+            for v in e:
+                self.elist[v].add(e_i)
+
+        # 2ノードが共有するハイパーエッジの数 (キーは (u, w), u < w)
+        self.shared = {}
+        for e in self.E:
+            for u, w in itertools.combinations(e, 2):
+                key = (u, w) if u < w else (w, u)
+                self.shared[key] = self.shared.get(key, 0) + 1
+
+        self.numer = {m: {} for m in self.methods}
+        self.denom = {m: {} for m in self.methods}
+        core = CSRCore.from_lists(self.V, [sorted(e) for e in self.E])
+        for m, (numer, denom) in clustering.coefficients(core, self.methods).items():
+            self.numer[m] = dict(zip(self.V, numer.tolist()))
+            self.denom[m] = dict(zip(self.V, denom.tolist()))
+
+    def neighbors(self, v):
+        '''Nodes that share at least one hyperedge with v.'''
+        neighbors = set()
+        for e_i in self.elist[v]:
+            neighbors |= self.E[e_i]
+        neighbors.discard(v)
+        return neighbors
+
+    def _check_hyperedge(self, e_i):
+        if e_i < 0 or len(self.E) <= e_i:
+            msg = "Error: Given hyperedge is not found."
+            logger.error(msg)
+            raise ValueError(msg)
+
+    def _check_node(self, v):
+        if v not in self.elist:
+            msg = "Error: Given node is not found."
+            logger.error(msg)
+            raise ValueError(msg)
+
+    def add_node_to_hyperedge(self, v, e_i):
+        '''Add node v to hyperedge E[e_i] and update the affected nodes.'''
+        self._check_node(v)
+        self._check_hyperedge(e_i)
+        if v in self.E[e_i]:
+            msg = "Error: Given node already belongs to the given hyperedge."
+            logger.error(msg)
+            raise ValueError(msg)
+        self._edit(v, e_i, add=True)
+
+    def remove_node_from_hyperedge(self, v, e_i):
+        '''Remove node v from hyperedge E[e_i] and update the affected nodes.'''
+        self._check_node(v)
+        self._check_hyperedge(e_i)
+        if v not in self.E[e_i]:
+            msg = "Error: Given node does not belong to the given hyperedge."
+            logger.error(msg)
+            raise ValueError(msg)
+        self._edit(v, e_i, add=False)
+
+    def add_hyperedge(self, nodes) -> int:
+        '''Add a hyperedge (new nodes are added to V) and return its index.'''
+        e = set(nodes)
+        for v in e:
+            if v not in self.elist:
+                self.V.append(v)
+                self.elist[v] = set()
+                for m in self.methods:
+                    self.numer[m][v] = 0
+                    self.denom[m][v] = 0
+        e_i = len(self.E)
+        self.E.append(set())
+        for v in e:
+            self._edit(v, e_i, add=True)
+        return e_i
+
+    def remove_hyperedge(self, e_i):
+        '''Remove hyperedge E[e_i]; the last hyperedge takes over the index e_i. Nodes are kept.'''
+        self._check_hyperedge(e_i)
+        for v in list(self.E[e_i]):
+            self._edit(v, e_i, add=False)
+
+        last = len(self.E) - 1
+        if e_i != last:
+            self.E[e_i] = self.E[last]
+            for v in self.E[e_i]:
+                self.elist[v].discard(last)
+                self.elist[v].add(e_i)
+        self.E.pop()
+
+    def _edit(self, v, e_i, add):
+        '''Add (remove) v to (from) E[e_i] and add the differences of the contributions.'''
+        if add:
+            self._set_membership(v, e_i, True)
+
+        # v が E[e_i] に含まれる状態で、含まれない状態との差分を求める
+        full = _State(self)
+        without = _State(self, (v, e_i))
+        sign = 1 if add else -1
+        paired = [m for m in ('opsahl', 'zhou') if m in self.methods]
+        if paired:
+            for pair in self._changed_pairs(v, e_i):
+                self._add_pair_values(self._pair_values(pair, paired, without), -sign)
+                self._add_pair_values(self._pair_values(pair, paired, full), sign)
+        if 'proposed' in self.methods:
+            self._update_triangles('proposed', v, e_i, full, without, sign)
+        if 'simple' in self.methods:
+            self._update_triangles('simple', v, e_i, full, without, sign)
+
+        if not add:
+            self._set_membership(v, e_i, False)
+
+        if 'zhou' in self.methods:
+            deg = len(self.elist[v])
+            self.denom['zhou'][v] = deg * (deg - 1) // 2
+
+    def _set_membership(self, v, e_i, add):
+        delta = 1 if add else -1
+        for u in self.E[e_i]:
+            if u != v:
+                key = (u, v) if u < v else (v, u)
+                count = self.shared.get(key, 0) + delta
+                if count == 0:
+                    del self.shared[key]
+                else:
+                    self.shared[key] = count
+        if add:
+            self.E[e_i].add(v)
+            self.elist[v].add(e_i)
+        else:
+            self.E[e_i].discard(v)
+            self.elist[v].discard(e_i)
+
+    # opsahl, zhou: ハイパーエッジ対ごとの寄与
+
+    def _changed_pairs(self, v, e_i):
+        '''Pairs of hyperedges whose contributions can change by the membership of v in E[e_i] (taken with v in E[e_i]).
+
+        Besides the pairs containing e_i, the closure of (v, u) for a member u of e_i changes
+        at a pair (e1, e2) only if the hyperedges shared by v and u other than e_i are
+        among e1, e2.
+        '''
+        pairs = set()
+        e = self.E[e_i]
+        for u in e:
+            for e_j in self.elist[u]:
+                if e_j != e_i:
+                    pairs.add((e_i, e_j) if e_i < e_j else (e_j, e_i))
+
+        ev = self.elist[v] - {e_i}
+        for u in e:
+            if u == v:
+                continue
+            eu = self.elist[u] - {e_i}
+            S = ev & eu
+            if len(S) == 0:
+                candidates = itertools.product(ev, eu)
+            elif len(S) == 1:
+                (s,) = S
+                candidates = ((s, e_j) for e_j in ev | eu)
+            elif len(S) == 2:
+                candidates = (tuple(S),)
+            else:
+                continue
+            for e1, e2 in candidates:
+                if e1 != e2 and not self.E[e1].isdisjoint(self.E[e2]):
+                    pairs.add((e1, e2) if e1 < e2 else (e2, e1))
+        return pairs
+
+    def _pair_values(self, pair, methods, state):
+        '''Contributions of a pair of hyperedges in state as a list of (method, node, numer, denom).'''
+        E1, E2 = state.members(pair[0]), state.members(pair[1])
+        m = state.m
+        common = E1 & E2
+        values = []
+        if len(common) == 0:
+            return values
+
+        if 'opsahl' in methods:
+            F = 0
+            closed_v1 = dict.fromkeys(common, 0)
+            closed_v2 = dict.fromkeys(common, 0)
+            for v1 in E1:
+                for v2 in E2:
+                    if v1 == v2:
+                        continue
+                    # e1, e2 以外に共有するハイパーエッジがあるか
+                    if m(v1, v2) - (v2 in E1) - (v1 in E2) > 0:
+                        F += 1
+                        if v1 in common:
+                            closed_v1[v1] += 1
+                        if v2 in common:
+                            closed_v2[v2] += 1
+            total = (len(E1) - 1) * (len(E2) - 1) - (len(common) - 1)
+            for x in common:
+                values.append(('opsahl', x, F - closed_v1[x] - closed_v2[x], total))
+
+        if 'zhou' in methods:
+            d12 = E1 - E2
+            d21 = E2 - E1
+            if len(d12) > 0 and len(d21) > 0:
+                eo_num1 = sum(1 for v21 in d21 if any(m(v12, v21) > 0 for v12 in d12))
+                eo_num2 = sum(1 for v12 in d12 if any(m(v12, v21) > 0 for v21 in d21))
+                contrib = (eo_num1 + eo_num2) / (len(d12) + len(d21))
+                for x in common:
+                    values.append(('zhou', x, contrib, 0))
+        return values
+
+    def _add_pair_values(self, values, sign):
+        for method, x, numer, denom in values:
+            self.numer[method][x] += sign * numer
+            if method == 'opsahl':
+                self.denom[method][x] += sign * denom
+
+    # proposed, simple: 射影グラフの三角形ごとの寄与
+
+    def _update_triangles(self, method, v, e_i, full, without, sign):
+        if method == 'proposed':
+            weight_full, weight_without = full.weight, without.weight
+        else:
+            weight_full = lambda a, b: float(full.m(a, b) > 0)
+            weight_without = lambda a, b: float(without.m(a, b) > 0)
+
+        # 重みが変わる射影グラフの辺
+        e = self.E[e_i]
+        candidates = itertools.combinations(e, 2) if method == 'proposed' else ((v, u) for u in e if u != v)
+        edges = []
+        for a, b in candidates:
+            w1, w0 = weight_full(a, b), weight_without(a, b)
+            if w1 != w0:
+                edges.append((a, b, w1, w0))
+        if len(edges) == 0:
+            return
+
+        neighbors = {}
+        triangles = set()
+        for a, b, _, _ in edges:
+            for x in (a, b):
+                if x not in neighbors:
+                    neighbors[x] = self.neighbors(x)
+            for c in neighbors[a] & neighbors[b]:
+                triangles.add(tuple(sorted((a, b, c))))
+
+        numer = self.numer[method]
+        scale = 1.0 if method == 'proposed' else 2
+        for a, b, c in triangles:
+            p1 = weight_full(a, b) * weight_full(a, c) * weight_full(b, c)
+            p0 = weight_without(a, b) * weight_without(a, c) * weight_without(b, c)
+            if p1 != p0:
+                diff = sign * scale * (p1 - p0)
+                if method == 'simple':
+                    diff = int(diff)
+                numer[a] += diff
+                numer[b] += diff
+                numer[c] += diff
+
+        # 端点の分母は変更後の状態で数え直す (差分の累積による桁落ちを避ける)
+        denom = self.denom[method]
+        final = full if sign > 0 else without
+        for x in {x for a, b, _, _ in edges for x in (a, b)}:
+            if method == 'proposed':
+                ws = [final.weight(x, u) for u in neighbors[x]]
+                s1 = sum(ws)
+                denom[x] = (s1 * s1 - sum(w * w for w in ws)) / 2
+            else:
+                d = sum(1 for u in neighbors[x] if final.m(x, u) > 0)
+                denom[x] = d * (d - 1)
+
+    def clustering_coefficients(self, method):
+        '''Current clustering coefficients of method as a dictionary {node: value}.'''
+        if method not in self.methods:
+            msg = f"Error: Method {method} is not maintained."
+            logger.error(msg)
+            raise ValueError(msg)
+        numer, denom = self.numer[method], self.denom[method]
+        return {v: numer[v] / denom[v] if denom[v] != 0 else 0.0 for v in self.V}
@@ -30,11 +30,23 @@ import math
 import pathlib
 import itertools
 
+import numpy as np
+
+from hypergcc import clustering, partition, profiling, sampling, statistics
+from hypergcc.core import CSRCore, NodeView, HyperedgeView, IncidenceView, read_hypergraph_arrays
+from hypergcc.cache import read_hypergraph_cached
+from hypergcc.dynamic import DynamicClustering
+from hypergcc.summary import RunningSummary
+
 import logging
 logger = logging.getLogger(__name__)
 
 
 def read_hypergraph_from_file(f_nverts, f_hyperedges):
+    '''Read a hypergraph line by line from the opened nverts and hyperedges files.
+
+    HyperGraph.read_hypergraph uses the vectorized hypergcc.core.read_hypergraph_arrays instead.
+    '''
     V = []
     E = []
     elist = {}
@@ -77,13 +89,20 @@ def read_hypergraph_from_file(f_nverts, f_hyperedges):
 
 
 class HyperGraph():
-    def __init__(self, datadir_path):
+    def __init__(self, datadir_path, compact: bool = False, cache: bool = True):
         # hypergraph datasetがあるディレクトリ
         self.datadir = pathlib.Path(datadir_path)
 
-        self.V: list[int] = []  # A list of nodes
-        self.E: list[list[int]] = []  # A list of hyperedges
-        self.elist: dict[int, list[int]] = {}  # A dictionary of lists of indices in the list E of hyperedges to which each node belongs
+        # cache=True ならば読み込んだ配列を hypergcc.cache に保存し，次回以降はそれを mmap する
+        self.cache = cache
+
+        # compact=True ならば V, E, elist をリストとして持たずに CSRCore の配列のビューとして提供する
+        self.compact = compact
+        self._core: CSRCore | None = None
+
+        self._V: list[int] | None = []  # A list of nodes
+        self._E: list[list[int]] | None = []  # A list of hyperedges
+        self._elist: dict[int, list[int]] | None = {}  # A dictionary of lists of indices in the list E of hyperedges to which each node belongs
 
         # Example
         # V = [1, 2, 3, 4, 5]
@@ -91,16 +110,94 @@ class HyperGraph():
         # elist = {1: [0, 2, 3, 4], 2: [0, 1, 2, 3, 4], 3: [1, 2, 3, 4], 4: [3, 4], 5: [4]}
         # In this example, elist[1] = [0, 2, 3, 4] implies that node 1 belongs to hyperedges E[0], E[2], E[3], and E[4].
 
+    @property
+    def core(self) -> CSRCore:
+        '''Compact array representation of the hypergraph (built lazily and cached until the next mutation).'''
+        if self._core is None:
+            self._core = CSRCore.from_lists(self._V, self._E)
+        return self._core
+
+    @property
+    def pair_index(self) -> clustering.PairIndex:
+        '''Index of the node pairs that share a hyperedge (co-membership counts and smallest shared sizes, see hypergcc.clustering.PairIndex).
+
+        It is built on first use and shared by the vectorized engines; a mutation of the hypergraph discards it with the core.'''
+        return clustering.pair_index(self.core)
+
+    @property
+    def adjacency(self):
+        '''Projected adjacency as a CSR structure (indptr, indices) over the remapped ids of core (neighbors ascending).
+
+        It is the structure of pair_index, so it is built once, shared with the vectorized engines and discarded by a mutation.'''
+        index = self.pair_index
+        return index.indptr, index.indices
+
+    @property
+    def V(self):
+        if self._V is None:
+            return NodeView(self._core)
+        return self._V
+
+    @V.setter
+    def V(self, V):
+        self._thaw()
+        self._V = V
+        self._core = None
+
+    @property
+    def E(self):
+        if self._E is None:
+            return HyperedgeView(self._core)
+        return self._E
+
+    @E.setter
+    def E(self, E):
+        self._thaw()
+        self._E = E
+        self._core = None
+
+    @property
+    def elist(self):
+        if self._elist is None:
+            return IncidenceView(self._core)
+        return self._elist
+
+    @elist.setter
+    def elist(self, elist):
+        self._thaw()
+        self._elist = elist
+        self._core = None
+
+    def _set_core(self, core: CSRCore):
+        '''Replace the hypergraph with the given core (materializing the lists unless compact).'''
+        self._core = core
+        if self.compact:
+            self._V, self._E, self._elist = None, None, None
+        else:
+            self._V, self._E, self._elist = core.to_lists()
+
+    def _thaw(self):
+        '''Materialize V, E and elist as lists so that they can be modified.'''
+        if self._V is None:
+            self._V, self._E, self._elist = self._core.to_lists()
+
     def construct_hypergraph(self, V: list[int], E: list[list[int]]):
         '''Construct a hypergraph from a set of nodes V and a set of hyperedges E.'''
-        self.V = list(V)
-        self.E = list(E)
-        self.elist = {v: [] for v in self.V}
+        V = list(V)
+        E = list(E)
+        if self.compact:
+            self._set_core(CSRCore.from_lists(V, E))
+            return
+
+        self._V = V
+        self._E = E
+        self._elist = {v: [] for v in self._V}
 
         for i in range(0, len(E)):
             for v in E[i]:
-                self.elist[v].append(i)
+                self._elist[v].append(i)
 
+        self._core = None
         return
 
     def read_hypergraph(self, hypergraph_name):
@@ -111,12 +208,11 @@ class HyperGraph():
         f1_path = self.datadir / f'{hypergraph_name}_nverts.txt'
         f2_path = self.datadir / f'{hypergraph_name}_hyperedges.txt'
 
-        with open(f1_path, 'r') as f1, open(f2_path, 'r') as f2:
-            V, E, elist = read_hypergraph_from_file(f1, f2)
-
-        self.V = V
-        self.E = E
-        self.elist = elist
+        with profiling.phase('parse'):
+            if self.cache:
+                self._set_core(read_hypergraph_cached(f1_path, f2_path))
+            else:
+                self._set_core(read_hypergraph_arrays(f1_path, f2_path))
 
         logger.info('Hypergraph named ' + str(hypergraph_name) + ' was read.')
         logger.info("Number of nodes: %d", len(self.V))
@@ -134,8 +230,10 @@ class HyperGraph():
             logger.error(msg)
             raise ValueError(msg)
 
-        self.E[e_i].append(v)
-        self.elist[v].append(e_i)
+        self._thaw()
+        self._E[e_i].append(v)
+        self._elist[v].append(e_i)
+        self._core = None
 
 
     def remove_node_from_hyperedge(self, v, e_i):
@@ -159,20 +257,36 @@ class HyperGraph():
             logger.error(msg)
             raise ValueError(msg)
 
-        self.elist[v].remove(e_i)
-        self.E[e_i].remove(v)
+        self._thaw()
+        self._elist[v].remove(e_i)
+        self._E[e_i].remove(v)
+        self._core = None
+
 
+    def dynamic_clustering(self, methods=clustering.METHODS) -> DynamicClustering:
+        '''Clustering coefficients of a copy of the hypergraph that are updated incrementally by its edit methods'''
+        return DynamicClustering(self.V, self.E, methods)
 
+    @profiling.timed('compute')
     def node_degree(self):
         '''Calculate the degree of each node (i.e., the number of hyperedges to which each node belongs).'''
-        nd = {}
-        for v in self.V:
-            nd[v] = int(len(self.elist[v]))
-
-        return nd
+        core = self.core
+        return dict(zip(core.node_ids.tolist(), core.node_degrees().tolist()))
+
+    @profiling.timed('compute')
+    def num_jnt_node_deg(self, engine='python'):
+        '''Calculate the number of hyperedges that nodes with degree k and nodes with degree k' share.
+
+        engine='sparse' computes the same dictionary from hypergcc.statistics.joint_degree_matrix.'''
+        if engine == 'sparse':
+            degrees, M = self.joint_degree_matrix()
+            degrees = degrees.tolist()
+            return {k1: dict(zip(degrees, row)) for k1, row in zip(degrees, M.tolist())}
+        elif engine != 'python':
+            msg = f"Error: Unknown engine {engine}."
+            logger.error(msg)
+            raise ValueError(msg)
 
-    def num_jnt_node_deg(self):
-        '''Calculate the number of hyperedges that nodes with degree k and nodes with degree k' share.'''
         node_degrees = set()
         for v in self.V:
             k = int(len(self.elist[v]))
@@ -193,25 +307,187 @@ class HyperGraph():
 
         return jnd
 
+    def joint_degree_matrix(self, sparse=False):
+        '''Joint degree matrix as (degrees, M), M[a, b] being jnd[degrees[a]][degrees[b]] of num_jnt_node_deg (see hypergcc.statistics).'''
+        return statistics.joint_degree_matrix(self.core, sparse=sparse)
+
+    def node_features(self, features=statistics.NODE_FEATURES, size_buckets=5):
+        '''Per-node features as a dictionary column -> array, starting with the column node (see hypergcc.statistics.node_features).'''
+        core = self.core
+        return {'node': core.node_ids, **statistics.node_features(core, features, size_buckets)}
+
     def neighbors(self, v: int):
-        neighbors: set[int] = set()
-        for i in self.elist[v]:
-            neighbors |= set(self.E[i])
-        neighbors -= set((v,))
-        return neighbors
+        '''Set of the nodes that share at least one hyperedge with v (read from the cached adjacency).'''
+        core = self.core
+        j = core.local_id(v)
+        if j < 0:
+            raise KeyError(v)
+        return set(core.node_ids[self.pair_index.neighbors(j)].tolist())
+
+    def neighbor_counts(self):
+        '''Calculate the number of neighbors of each node (i.e., the degree in the projected graph).'''
+        indptr, _ = self.adjacency
+        return dict(zip(self.core.node_ids.tolist(), np.diff(indptr).tolist()))
+
+    def neighbors_many(self, nodes):
+        '''Neighbors of several nodes at once as (offsets, neighbors): the neighbors of nodes[i] are neighbors[offsets[i]:offsets[i+1]].'''
+        core = self.core
+        rows = core.local_ids(nodes).reshape(-1)
+        if np.any(rows < 0):
+            msg = "Error: Given node is not found."
+            logger.error(msg)
+            raise ValueError(msg)
+        indptr, indices = self.adjacency
+        members, counts = partition._gather(indptr, indices, rows)
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets, core.node_ids[members]
+
+    def _neighbor_sets(self):
+        '''Neighbors of every node as a dictionary node -> set (the nlist_set of the python engines), from the cached adjacency.'''
+        indptr, indices = self.adjacency
+        ptr = indptr.tolist()
+        members = self.core.node_ids[indices].tolist()
+        return {v: set(members[ptr[j]:ptr[j + 1]]) for j, v in enumerate(self.core.node_ids.tolist())}
 
 
     # 3種のクラスタ係数の計算を追加
 
-    def node_clustering_coefficient_opsahl(self):
-        '''Calculate Opsahl's clustering coefficients'''
+    def _node_dict(self, values):
+        '''Convert an array indexed by the remapped node ids into a dictionary keyed by node.'''
+        return dict(zip(self.core.node_ids.tolist(), values.tolist()))
+
+    def _opsahl_arrays(self, engine):
+        core = self.core
+        if engine == 'sparse':
+            numer, denom = clustering.opsahl_sparse(core)
+        elif engine == 'pairs':
+            numer, denom = clustering.opsahl_pairs(core)
+        else:
+            msg = f"Error: Unknown engine {engine}."
+            logger.error(msg)
+            raise ValueError(msg)
 
-        # 各ノード v と少なくとも1本のハイパーエッジを共有するノードの集合を作成
-        nlist_set = {k: set() for k in self.V}
-        for v in self.V:
-            for e in self.elist[v]:
-                nlist_set[v] = nlist_set[v] | set(self.E[e])
-                nlist_set[v].discard(v)
+        numer = numer.astype(float)
+        denom = denom.astype(float)
+        cc = np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0)
+        return cc, numer, denom
+
+    def _vectorizable(self, engine):
+        '''Whether the vectorized engine can be used (it assumes that no hyperedge repeats a node).'''
+        if engine == 'python':
+            return False
+        if not self.core.is_simple():
+            logger.warning('Some hyperedges contain the same node twice; falling back to the python engine.')
+            return False
+        return True
+
+    def _coefficient_arrays(self, methods, engine):
+        '''Clustering coefficients of several methods as arrays indexed by the remapped node ids, method -> (cc, numer, denom)
+
+        numer and denom are None for the methods computed by the python loops (except opsahl).'''
+        methods = list(methods)
+        unknown = [m for m in methods if m not in clustering.METHODS]
+        if unknown:
+            msg = f"Error: Unknown methods {unknown}."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        if engine == 'python':
+            # simple は常に疎行列で計算する (networkx の値と同じ)
+            vectorized = [m for m in methods if m == 'simple']
+        else:
+            # opsahl, zhou は同じノードを複数回含むハイパーエッジがあると python エンジンに切り替える
+            pairs_ok = any(m in ('opsahl', 'zhou') for m in methods) and self._vectorizable(engine)
+            vectorized = [m for m in methods if m in ('proposed', 'simple') or pairs_ok]
+        arrays = clustering.coefficients(self.core, vectorized)
+
+        nodes = self.core.node_ids.tolist()
+        as_array = lambda d: np.fromiter((d[v] for v in nodes), dtype=np.float64, count=len(nodes))
+        out = {}
+        for m in methods:
+            if m in arrays:
+                numer, denom = arrays[m]
+                numer = numer.astype(float)
+                denom = denom.astype(float)
+                out[m] = (np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0), numer, denom)
+            elif m == 'opsahl':
+                out[m] = tuple(as_array(d) for d in self.node_clustering_coefficient_opsahl_by_fraction())
+            else:
+                single = {
+                    'zhou': self.node_clustering_coefficient_zhou,
+                    'proposed': self.node_clustering_coefficient_proposed,
+                }
+                out[m] = (as_array(single[m]()), None, None)
+        return out
+
+    @profiling.timed('compute')
+    def node_clustering_coefficients(self, methods=clustering.METHODS, engine='pairs'):
+        '''Calculate several clustering coefficients in one pass, as a dictionary method -> {node: value}
+
+        The vectorized engines share the intermediates between the methods
+        (see hypergcc.clustering.coefficients); engine='python' calls the method of each definition.'''
+        arrays = self._coefficient_arrays(methods, engine)
+        return {m: self._node_dict(cc) for m, (cc, _, _) in arrays.items()}
+
+    @profiling.timed('compute')
+    def clustering_summaries(self, methods=clustering.METHODS, engine='pairs', bins=10, chunk=1 << 16, on_chunk=None, memory_budget=None):
+        '''Summaries of the clustering coefficients of several methods, as a dictionary method -> hypergcc.summary.RunningSummary
+
+        The per-node values are streamed into the summaries in chunks of nodes; the weighted
+        mean is weighted by node degree and the ratio is sum(numer) / sum(denom).
+        on_chunk(nodes, {method: values}) is called for each chunk, e.g. to write the per-node values.
+        With memory_budget (bytes), the coefficients are computed out of core on ranges of nodes
+        (see hypergcc.partition) and the chunks are these ranges.'''
+        if memory_budget is not None:
+            return self._partitioned_summaries(methods, engine, bins, on_chunk, memory_budget)
+
+        arrays = self._coefficient_arrays(methods, engine)
+        node_ids = self.core.node_ids
+        deg = self.core.node_degrees()
+        out = {m: RunningSummary(bins) for m in arrays}
+        for start in range(0, len(node_ids), chunk):
+            stop = start + chunk
+            for m, (cc, numer, denom) in arrays.items():
+                out[m].update(cc[start:stop],
+                              numer[start:stop] if numer is not None else None,
+                              denom[start:stop] if denom is not None else None,
+                              weights=deg[start:stop])
+            if on_chunk is not None:
+                on_chunk(node_ids[start:stop], {m: cc[start:stop] for m, (cc, _, _) in arrays.items()})
+        return out
+
+    def _partitioned_summaries(self, methods, engine, bins, on_chunk, memory_budget):
+        if engine == 'python':
+            msg = "Error: The python engine cannot be used with a memory budget."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        core = self.core
+        deg = core.node_degrees()
+        out = {m: RunningSummary(bins) for m in methods}
+        for lo, hi, arrays in partition.partitioned_coefficients(core, methods, memory_budget):
+            values = {}
+            for m, (numer, denom) in arrays.items():
+                numer = numer.astype(float)
+                denom = denom.astype(float)
+                values[m] = np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0)
+                out[m].update(values[m], numer, denom, weights=deg[lo:hi])
+            if on_chunk is not None:
+                on_chunk(core.node_ids[lo:hi], values)
+        return out
+
+    @profiling.timed('compute')
+    def node_clustering_coefficient_opsahl(self, engine='python'):
+        '''Calculate Opsahl's clustering coefficients
+
+        engine='sparse' or 'pairs' computes the same values with hypergcc.clustering.opsahl_sparse or opsahl_pairs.'''
+        if self._vectorizable(engine):
+            cc, _, _ = self._opsahl_arrays(engine)
+            return self._node_dict(cc)
+
+        # 各ノード v と少なくとも1本のハイパーエッジを共有するノードの集合
+        nlist_set = self._neighbor_sets()
 
         # 各ノードv1, v2の共有するハイパーエッジを保存
         common_elist_set = {k: {k1: set() for k1 in nlist_set[k]} for k in self.V}
@@ -246,9 +522,15 @@ class HyperGraph():
 
         return c_opsahl
 
-    def node_clustering_coefficient_opsahl_by_fraction(self):
+    @profiling.timed('compute')
+    def node_clustering_coefficient_opsahl_by_fraction(self, engine='python'):
         '''Calculate Opsahl's clustering coefficients with denominators and numerators
-        各ノードのクラスタ係数を求め，分子，分母と共に出力．'''
+        各ノードのクラスタ係数を求め，分子，分母と共に出力．
+
+        engine='sparse' or 'pairs' computes the same values with hypergcc.clustering.opsahl_sparse or opsahl_pairs.'''
+        if self._vectorizable(engine):
+            cc, numer, denom = self._opsahl_arrays(engine)
+            return self._node_dict(cc), self._node_dict(numer), self._node_dict(denom)
 
         # クラスタ係数と，その分子，分母を辞書として定義
         cc = {v: 0.0 for v in self.V}
@@ -276,18 +558,25 @@ class HyperGraph():
 
         return cc, cc_numer, cc_denom
 
-    def node_clustering_coefficient_zhou(self):
-        '''Calculate Zhou's clustering coefficients'''
+    @profiling.timed('compute')
+    def node_clustering_coefficient_zhou(self, engine='python'):
+        '''Calculate Zhou's clustering coefficients
+
+        engine='pairs' computes the same values with hypergcc.clustering.zhou_pairs.'''
+        if self._vectorizable(engine):
+            if engine != 'pairs':
+                msg = f"Error: Unknown engine {engine}."
+                logger.error(msg)
+                raise ValueError(msg)
+            numer, denom = clustering.zhou_pairs(self.core)
+            cc = np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0)
+            return self._node_dict(cc)
 
         c_zhou = {v: 0.0 for v in self.V} 
         numer = {v: 0.0 for v in self.V}
         denom = {v: 0.0 for v in self.V}
 
-        nlist_set = {k: set() for k in self.V} # vの隣接ノードの集合
-        for v in self.V:
-            for e in self.elist[v]:
-                nlist_set[v] = nlist_set[v] | set(self.E[e])
-            nlist_set[v].discard(v)
+        nlist_set = self._neighbor_sets() # vの隣接ノードの集合
 
         for v in self.V:
 
@@ -325,18 +614,26 @@ class HyperGraph():
 
         return c_zhou
 
-    def node_clustering_coefficient_proposed(self):
-        '''Calculate the proposed clustering coefficients'''
+    @profiling.timed('compute')
+    def node_clustering_coefficient_proposed(self, engine='python'):
+        '''Calculate the proposed clustering coefficients
+
+        engine='sparse' computes the same values (up to rounding) with hypergcc.clustering.proposed_sparse.'''
+        if engine != 'python':
+            if engine != 'sparse':
+                msg = f"Error: Unknown engine {engine}."
+                logger.error(msg)
+                raise ValueError(msg)
+            # 同じノードを複数回含むハイパーエッジもそのまま扱える
+            numer, denom = clustering.proposed_sparse(self.core)
+            cc = np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0)
+            return self._node_dict(cc)
 
         c_proposed = {v: 0.0 for v in self.V} 
         numer = {v: 0.0 for v in self.V}
         denom = {v: 0.0 for v in self.V}
 
-        nlist_set = {k: set() for k in self.V} # vの隣接ノードの集合
-        for v in self.V:
-            for e in self.elist[v]:
-                nlist_set[v] = nlist_set[v] | set(self.E[e])
-            nlist_set[v].discard(v)
+        nlist_set = self._neighbor_sets() # vの隣接ノードの集合
 
         weight = {k: {k1: 0.0 for k1 in nlist_set[k]} for k in self.V} # ノードv1, v2間の重み
         for v1 in self.V:
@@ -360,26 +657,42 @@ class HyperGraph():
 
         return c_proposed
 
+    @profiling.timed('compute')
     def node_clustering_coefficient_on_projected_graph(self):
-        '''Calculate clustering coefficients on projected undirected simple graph'''
-
-        logger.info('Converting hypergraph into simple graph...')
-        import networkx as nx
-        simple_graph = nx.Graph()
-        simple_graph.add_nodes_from(self.V)
-        for he in self.E:
-            simple_graph.add_edges_from(itertools.combinations(he, 2))
-
-        logger.info('Computing clustering coefficients...')
-        out = nx.clustering(simple_graph)
-        return out
-
+        '''Calculate clustering coefficients on projected undirected simple graph
+
+        The triangles and degrees of the projected graph are counted with hypergcc.clustering.simple_sparse;
+        the values are those of networkx.clustering (tests/test_simple_clustering.py).'''
+        numer, denom = clustering.simple_sparse(self.core)
+        cc = np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0)
+        return self._node_dict(cc)
+
+    @profiling.timed('compute')
+    def approximate_clustering_coefficient(self, method, eps=0.01, delta=0.05, seed=None, nodes=None):
+        '''Estimate the mean clustering coefficient of method ('opsahl', 'zhou', 'proposed' or 'simple') by sampling
+
+        Returns a hypergcc.sampling.Estimate whose mean is within eps of the exact mean over
+        nodes (all nodes if None) with probability at least 1 - delta.'''
+        core = self.core
+        local = None
+        if nodes is not None:
+            local = core.local_ids(list(nodes))
+            if np.any(local < 0):
+                msg = "Error: Some nodes are not in the hypergraph."
+                logger.error(msg)
+                raise ValueError(msg)
+
+        if method in ('opsahl', 'zhou') and not core.is_simple():
+            # 標本化は同じノードを複数回含むハイパーエッジを想定しないため厳密に計算する
+            logger.warning('Some hyperedges contain the same node twice; computing the exact mean instead.')
+            cc = self.node_clustering_coefficients([method], engine='python')[method]
+            values = list(cc.values()) if nodes is None else [cc[v] for v in nodes]
+            mean = float(np.mean(values)) if len(values) > 0 else 0.0
+            return sampling.Estimate(mean, mean, mean, 0)
+
+        return sampling.estimate_mean(core, method, eps=eps, delta=delta, seed=seed, nodes=local)
+
+    @profiling.timed('compute')
     def hyperedge_size(self):
         '''Calculate the size of each hyperedge (i.e., the number of nodes that belong to each hyperedge).'''
-
-        hs = {}
-
-        for e_i in range(0, len(self.E)):
-            hs[e_i] = len(self.E[e_i])
-
-        return hs
+        return dict(enumerate(self.core.hyperedge_sizes().tolist()))
@@ -2,22 +2,45 @@
 平均クラスタ係数を求める
 
 calc_averageって名前でもいいくらい
+
+--column を指定すると calc_ncc --methods のヘッダ付きの表からその列の平均を求める
+
+tsv の他に calc_ncc --output-format npy/npz で書き出した表も読める (メモリマップして読む)
 '''
 import numpy as np
+from hypergcc import profiling, results
 
 
 def main(args):
-    cc = [float(line.rstrip().split('\t')[1]) for line in args.cc]
-    mean_cc = np.mean(cc)
-    print(mean_cc)
+    with profiling.phase('parse'):
+        if results.detect_format(args.cc) == 'tsv':
+            # ヘッダがないときは2列目、tsv は使う列だけを変換する
+            column = args.column if args.column is not None else '1'
+            try:
+                cc = results.read_table(args.cc, header=args.column is not None, columns=[column])[column]
+            except KeyError:
+                raise SystemExit(f'Error: column {args.column} is not in the header.')
+        else:
+            # npy, npz は列名が必ずあるので --column がなければ node の次の列
+            table = results.read_table(args.cc)
+            column = args.column if args.column is not None else list(table)[1]
+            if column not in table:
+                raise SystemExit(f'Error: column {args.column} is not in the header {list(table)}.')
+            cc = table[column]
+    with profiling.phase('compute'):
+        mean_cc = np.mean(cc)
+    with profiling.phase('output'):
+        print(mean_cc)
 
 
 def parse_args():
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument('cc', type=argparse.FileType('r'))
+    parser.add_argument('cc', help='table of clustering coefficients (tsv, npy or npz; - for stdin)')
+    parser.add_argument('--column', help='name of the column in a table with a header (output of calc_ncc --methods)')
+    profiling.add_arguments(parser)
     return parser.parse_args()
 
 if __name__ == '__main__':
     args = parse_args()
-    main(args)
+    profiling.run(main, args, 'calc_cc')
@@ -4,24 +4,35 @@ Calculate features for each node
 - number of neighbors (number of unique nodes that belongs to the same hyperedge with)
   { v | e \\in E, u \\in e, v \\in e, u \\ne v }
 - average size (cardinality) of hyperedges that the node belongs to
+
+--features adds the optional columns of hypergcc.statistics.node_features
+(min_size, max_size, neighbors_by_size) and prints a header.
+
+Without --features, the tsv has no header (--output-format npy/npz names the columns
+node, degree, neighbors, avg_size, ...; see hypergcc.results)
 '''
-import numpy as np
+from hypergcc import profiling, results, statistics
 from hypergcc.hypergraph import HyperGraph
 
 
 def main(args):
-    # ハイパーグラフのデータを読み込む
-    G = HyperGraph(args.dataset_dir)
+    # ハイパーグラフのデータを読み込む (ノードごとの値は配列から求めるのでリストは作らない)
+    G = HyperGraph(args.dataset_dir, compact=True)
     G.read_hypergraph(args.dataset)
 
-    degrees = G.node_degree()
+    table = G.node_features(statistics.NODE_FEATURES + (args.features or []), size_buckets=args.size_buckets)
 
-    neighbors = {u: len(G.neighbors(u)) for u in G.V}
+    with profiling.phase('output'):
+        results.write_table(args.output, table, fmt=args.output_format, header=args.features is not None)
 
-    avg_hyperedges = {u: np.mean([len(G.E[i]) for i in G.elist[u]]) for u in G.V}
 
-    for u in G.V:
-        print(u, degrees[u], neighbors[u], avg_hyperedges[u], sep='\t')
+def parse_features(value):
+    import argparse
+    features = value.split(',')
+    for f in features:
+        if f not in statistics.OPTIONAL_NODE_FEATURES:
+            raise argparse.ArgumentTypeError(f'invalid feature: {f} (choose from {", ".join(statistics.OPTIONAL_NODE_FEATURES)})')
+    return features
 
 
 def parse_args():
@@ -29,9 +40,20 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('dataset_dir')
     parser.add_argument('dataset')
-    return parser.parse_args()
+    parser.add_argument('--features', type=parse_features,
+                        help='comma separated optional columns (min_size, max_size, neighbors_by_size), printed with a header')
+    parser.add_argument('--size-buckets', type=int, default=5,
+                        help='neighbors_by_size counts the neighbors by the smallest shared hyperedge size 2, ..., N-1 and N or more')
+    results.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if args.output_format != 'tsv' and args.output is None:
+        parser.error(f'--output-format {args.output_format} needs --output')
+    if args.size_buckets < 2:
+        parser.error('--size-buckets must be at least 2')
+    return args
 
 
 if __name__ == '__main__':
     args = parse_args()
-    main(args)
+    profiling.run(main, args, 'calc_degrees')
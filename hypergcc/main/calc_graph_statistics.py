@@ -5,33 +5,49 @@ Calculate dataset statistics
 - number of edges in the corresponding bipartite graph
 - average degree of the nodes
 - average size of the hyperedges
+
+The files are read in chunks without building the hypergraph (hypergcc.statistics.dataset_statistics).
+--duplicates adds the rate of hyperedges that repeat an earlier one, and --size-histogram /
+--degree-histogram write the full histograms (size or degree, count) to files.
 '''
 import numpy as np
-from hypergcc.hypergraph import HyperGraph
+from hypergcc import profiling, results, statistics
 
 
 def main(args):
-    # ハイパーグラフのデータを読み込む
-    G = HyperGraph(args.dataset_dir)
-    G.read_hypergraph(args.dataset)
+    stats = statistics.dataset_statistics(args.dataset_dir / f'{args.dataset}_nverts.txt',
+                                          args.dataset_dir / f'{args.dataset}_hyperedges.txt',
+                                          duplicates=args.duplicates)
 
-    num_nodes = len(G.V)
-    num_hyperedges = len(G.E)
-    num_edges_bi = sum([len(el) for el in G.elist.values()])
-    avg_degree = np.mean(list(G.node_degree().values()))
-    avg_hyperedges = np.mean([len(e) for e in G.E])
+    with profiling.phase('output'):
+        row = [args.dataset, stats.num_nodes, stats.num_hyperedges, stats.num_pins, stats.avg_degree, stats.avg_size]
+        if args.duplicates:
+            row.append(stats.duplicate_rate)
+        print(*row, sep='\t')
 
-    print(args.dataset, num_nodes, num_hyperedges, num_edges_bi, avg_degree, avg_hyperedges, sep='\t')
+        for path, name, histogram in [(args.size_histogram, 'size', stats.size_histogram),
+                                      (args.degree_histogram, 'degree', stats.degree_histogram)]:
+            if path is None:
+                continue
+            values = np.flatnonzero(histogram)
+            results.write_table(path, {name: values, 'count': histogram[values]}, fmt=args.output_format)
 
 
 def parse_args():
     import argparse
+    import pathlib
     parser = argparse.ArgumentParser()
-    parser.add_argument('dataset_dir')
+    parser.add_argument('dataset_dir', type=pathlib.Path)
     parser.add_argument('dataset')
+    parser.add_argument('--duplicates', action='store_true',
+                        help='append the rate of hyperedges whose members are the same as those of an earlier hyperedge')
+    parser.add_argument('--size-histogram', help='write the number of hyperedges of each size to this file')
+    parser.add_argument('--degree-histogram', help='write the number of nodes of each degree to this file')
+    results.add_arguments(parser, output=False)
+    profiling.add_arguments(parser)
     return parser.parse_args()
 
 
 if __name__ == '__main__':
     args = parse_args()
-    main(args)
+    profiling.run(main, args, 'calc_graph_statistics')
@@ -0,0 +1,47 @@
+'''
+Calculate the joint degree matrix of the nodes sharing hyperedges
+(hypergcc.statistics.joint_degree_matrix, the same counts as HyperGraph.num_jnt_node_deg)
+
+次数の組 (degree1, degree2) ごとに同じハイパーエッジに含まれるノードの組の数 (count) を出力する。
+count が 0 の組は出力しない (--dense なら全ての組を出力する)
+'''
+import numpy as np
+from hypergcc import profiling, results
+from hypergcc.hypergraph import HyperGraph
+
+
+def main(args):
+    # ハイパーグラフのデータを読み込む
+    G = HyperGraph(args.dataset_dir, compact=True)
+    G.read_hypergraph(args.dataset)
+
+    degrees, M = G.joint_degree_matrix(sparse=True)
+
+    with profiling.phase('output'):
+        if args.dense:
+            a, b = np.divmod(np.arange(len(degrees) ** 2), len(degrees))
+            counts = M.toarray().reshape(-1)
+        else:
+            M = M.tocoo()
+            a, b, counts = M.row, M.col, M.data
+        table = {'degree1': degrees[a], 'degree2': degrees[b], 'count': counts}
+        results.write_table(args.output, table, fmt=args.output_format)
+
+
+def parse_args():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('dataset_dir')
+    parser.add_argument('dataset')
+    parser.add_argument('--dense', action='store_true', help='also print the pairs of degrees with count 0')
+    results.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if args.output_format != 'tsv' and args.output is None:
+        parser.error(f'--output-format {args.output_format} needs --output')
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    profiling.run(main, args, 'calc_joint_degrees')
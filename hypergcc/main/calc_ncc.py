@@ -1,40 +1,169 @@
 '''
 ローカルクラスタリング係数を計算する
+
+--methods を指定すると複数の定義を1回の読み込みでまとめて計算し、
+ヘッダ付きの表 (node と各定義の値) を出力する
+
+--approx を指定するとノードごとの値の代わりに、標本化による平均クラスタ係数の
+推定値と信頼区間 (method, mean, low, high, samples) を出力する
+
+--summary を指定するとノードごとの値の代わりに、定義ごとの要約 (平均、次数で重み付けた平均、
+分子の和 / 分母の和、分位点、ヒストグラム) を出力する。ノードごとの値は --nodes-output で
+別のファイルに書き出せる
+
+--memory-budget を指定するとノードの範囲ごとに必要な部分だけを読み込んで計算し (hypergcc.partition)、
+範囲ごとに結果を書き出す
+
+ノードごとの値は --output-format で tsv の代わりに npy, npz (hypergcc.results) で書き出せる。
+書き出す先は --output (--summary のときは --nodes-output)
 '''
 
 import sys
+from hypergcc import profiling, results
 from hypergcc.hypergraph import HyperGraph
+from hypergcc.partition import MIN_MEMORY_BUDGET, parse_memory
 
 import logging
 logging.basicConfig(level=logging.DEBUG, format='{asctime} [{levelname:.4}] {name}: {message}', style='{')
 logger = logging.getLogger(__name__)
 
 IMPLEMENTED_METHODS = ['opsahl', 'zhou', 'proposed', 'simple']
+ENGINES = ['python', 'sparse', 'pairs']
 
 
 def main(args):
-    # ハイパーグラフのデータを読み込む
-    G = HyperGraph(args.dataset_dir)
+    # ハイパーグラフのデータを読み込む (メモリ上限があるときはリストを作らない)
+    G = HyperGraph(args.dataset_dir, compact=args.memory_budget is not None)
     G.read_hypergraph(args.dataset)
 
+    if args.approx:
+        write_estimates(G, args.methods or [args.method], args.eps, args.delta, args.seed)
+        return
+
+    if args.summary:
+        write_summaries(G, args.dataset, args.methods or [args.method], args.engine, args.nodes_output,
+                        header=args.methods is not None, memory_budget=args.memory_budget, fmt=args.output_format)
+        return
+
+    if args.memory_budget is not None:
+        write_partitioned(G, args.methods or [args.method], args.engine, args.memory_budget, header=args.methods is not None,
+                          output=args.output, fmt=args.output_format)
+        return
+
+    if args.methods is not None:
+        write_table(G, args.methods, args.engine, output=args.output, fmt=args.output_format)
+        return
+
     # 各定義によるクラスタ係数を計算
     logger.info('Calculating clustering coefficient using %s method ...', args.method)
     match args.method:
         case 'opsahl':
-            cc, A, B = G.node_clustering_coefficient_opsahl_by_fraction()
+            cc, A, B = G.node_clustering_coefficient_opsahl_by_fraction(engine=args.engine)
         case 'zhou':
-            cc = G.node_clustering_coefficient_zhou()
+            # zhou には sparse エンジンがないため pairs で代用する
+            cc = G.node_clustering_coefficient_zhou(engine='python' if args.engine == 'python' else 'pairs')
         case 'proposed':
-            cc = G.node_clustering_coefficient_proposed()
+            # proposed には pairs エンジンがないため sparse で代用する
+            cc = G.node_clustering_coefficient_proposed(engine='python' if args.engine == 'python' else 'sparse')
         case 'simple':
+            # simple はエンジンによらず疎行列で計算する
             cc = G.node_clustering_coefficient_on_projected_graph()
         case _:
             sys.exit(1)
     logger.info('done')
 
     # クラスタ係数を出力
-    for node, value in cc.items():
-        print(node, value, sep='\t')
+    with profiling.phase('output'):
+        results.write_table(args.output, {'node': list(cc.keys()), args.method: list(cc.values())},
+                            fmt=args.output_format, header=False)
+
+
+def write_table(G, methods, engine, output=None, fmt='tsv'):
+    '''Write the clustering coefficients of several methods as a table with a header (one column per method).'''
+    logger.info('Calculating clustering coefficients using %s methods ...', ', '.join(methods))
+    ccs = G.node_clustering_coefficients(methods, engine=engine)
+    logger.info('done')
+
+    with profiling.phase('output'):
+        table = {'node': list(ccs[methods[0]].keys())}
+        table.update((m, list(ccs[m].values())) for m in methods)
+        results.write_table(output, table, fmt=fmt)
+
+
+def write_partitioned(G, methods, engine, memory_budget, header=True, output=None, fmt='tsv'):
+    '''Write the clustering coefficients computed out of core, range by range (with a header if header).'''
+    logger.info('Calculating clustering coefficients using %s methods within %d bytes ...', ', '.join(methods), memory_budget)
+    with results.TableWriter(output, ['node', *methods], fmt=fmt, header=header) as writer:
+        def on_chunk(nodes, values):
+            with profiling.phase('output'):
+                writer.write(nodes, *(values[m] for m in methods))
+
+        G.clustering_summaries(methods, engine=engine, on_chunk=on_chunk, memory_budget=memory_budget)
+    logger.info('done')
+
+
+def write_summaries(G, dataset, methods, engine, nodes_output=None, header=True, memory_budget=None, fmt='tsv'):
+    '''Print the summaries of the clustering coefficients (one row per method), optionally writing the per-node values to nodes_output.'''
+    logger.info('Calculating clustering coefficients using %s methods ...', ', '.join(methods))
+    on_chunk = None
+    writer = None
+    if nodes_output is not None:
+        writer = results.TableWriter(nodes_output, ['node', *methods], fmt=fmt, header=header)
+
+        def on_chunk(nodes, values):
+            with profiling.phase('output'):
+                writer.write(nodes, *(values[m] for m in methods))
+
+    try:
+        summaries = G.clustering_summaries(methods, engine=engine, on_chunk=on_chunk, memory_budget=memory_budget)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        with profiling.phase('output'):
+            writer.close()
+    logger.info('done')
+
+    with profiling.phase('output'):
+        rows = [summaries[m].row() for m in methods]
+        print('dataset', 'method', *rows[0].keys(), sep='\t')
+        for method, row in zip(methods, rows):
+            print(dataset, method, *row.values(), sep='\t')
+
+
+def write_estimates(G, methods, eps, delta, seed):
+    '''Print the sampling estimates of the mean clustering coefficients with their confidence intervals.'''
+    print('method', 'mean', 'low', 'high', 'samples', sep='\t')
+    for method in methods:
+        logger.info('Estimating mean clustering coefficient using %s method (eps=%g, delta=%g) ...', method, eps, delta)
+        est = G.approximate_clustering_coefficient(method, eps=eps, delta=delta, seed=seed)
+        with profiling.phase('output'):
+            print(method, est.mean, est.low, est.high, est.samples, sep='\t')
+    logger.info('done')
+
+
+def parse_methods(value):
+    import argparse
+    if value == 'all':
+        return list(IMPLEMENTED_METHODS)
+    methods = value.split(',')
+    for m in methods:
+        if m not in IMPLEMENTED_METHODS:
+            raise argparse.ArgumentTypeError(f'invalid method: {m} (choose from all, {", ".join(IMPLEMENTED_METHODS)})')
+    return methods
+
+
+def parse_memory_budget(value):
+    import argparse
+    try:
+        size = parse_memory(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid memory size: {value} (e.g. 512M, 4G)')
+    # hypergcc.partition.partitioned_coefficients の下限
+    if size < MIN_MEMORY_BUDGET:
+        raise argparse.ArgumentTypeError(f'memory size too small: {value} (at least {MIN_MEMORY_BUDGET >> 20}M)')
+    return size
 
 
 def parse_args():
@@ -42,9 +171,40 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('dataset_dir')
     parser.add_argument('dataset')
-    parser.add_argument('method', choices=IMPLEMENTED_METHODS)
-    return parser.parse_args()
+    parser.add_argument('method', nargs='?', choices=IMPLEMENTED_METHODS)
+    parser.add_argument('--methods', type=parse_methods,
+                        help='"all" or a comma separated list of methods, computed together and printed as one table')
+    parser.add_argument('--engine', choices=ENGINES, default='pairs',
+                        help='python: the original loops, sparse/pairs: vectorized kernels (same results; zhou always uses pairs, proposed sparse, simple is always sparse)')
+    parser.add_argument('--approx', action='store_true',
+                        help='estimate the mean clustering coefficients by sampling instead of computing every node')
+    parser.add_argument('--eps', type=float, default=0.01, help='absolute error of the estimates (with --approx)')
+    parser.add_argument('--delta', type=float, default=0.05, help='probability that the error exceeds eps (with --approx)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed (with --approx)')
+    parser.add_argument('--summary', action='store_true',
+                        help='print a summary row per method instead of the values of every node')
+    parser.add_argument('--nodes-output', help='with --summary, also write the values of every node to this file')
+    parser.add_argument('--memory-budget', type=parse_memory_budget,
+                        help='compute out of core on ranges of nodes so that the working set stays within this size (e.g. 4G)')
+    results.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if (args.method is None) == (args.methods is None):
+        parser.error('specify either method or --methods')
+    if args.approx and not (0 < args.eps < 1 and 0 < args.delta < 1):
+        parser.error('--eps and --delta must be in (0, 1)')
+    if args.nodes_output is not None and not args.summary:
+        parser.error('--nodes-output requires --summary')
+    if args.memory_budget is not None and (args.approx or args.engine == 'python'):
+        parser.error('--memory-budget cannot be used with --approx or --engine python')
+    if args.approx and (args.output is not None or args.output_format != 'tsv'):
+        parser.error('--output and --output-format cannot be used with --approx')
+    if args.summary and args.output is not None:
+        parser.error('with --summary, the values of every node are written to --nodes-output')
+    if args.output_format != 'tsv' and (args.nodes_output if args.summary else args.output) is None:
+        parser.error(f'--output-format {args.output_format} needs a file (--output, or --nodes-output with --summary)')
+    return args
 
 if __name__ == '__main__':
     args = parse_args()
-    main(args)
+    profiling.run(main, args, 'calc_ncc')
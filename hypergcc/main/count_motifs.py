@@ -1,9 +1,10 @@
 # Code is from https://github.com/FraLotito/higher-order-motifs/
 # Under MIT License
 
+from hypergcc import profiling, results
 from hypergcc.motifs import loaders
 from hypergcc.hypergraph import HyperGraph
-from hypergcc.motifs.motifs2 import motifs_order_3
+from hypergcc.motifs.motifs2 import motifs_order_3, motifs_order_4
 from hypergcc.motifs.motifs import count_motifs
 
 
@@ -17,14 +18,31 @@ def count_motifs_order3(G):
     return result
 
 
+def count_motifs_order4(G):
+    hedges = loaders.load_from_hyperedgelist(4, G.E)
+    return motifs_order_4(hedges, -1)
+
+
+def count_motifs_esu(G, order, workers=1):
+    # 射影グラフの連結なノードの組を全て列挙して数える (esu.count_connected, workers 個のプロセス)
+    hedges = loaders.load_from_hyperedgelist(order, G.E)
+    return count_motifs(hedges, order, -1, workers=workers)
+
+
 def main(args):
     # ハイパーグラフのデータを読み込む
     G = HyperGraph(args.dataset_dir)
     G.read_hypergraph(args.dataset)
-    motifs = count_motifs_order3(G)
+    if args.algorithm == 'esu':
+        motifs = count_motifs_esu(G, args.order, workers=args.workers)
+    else:
+        count = count_motifs_order3 if args.order == 3 else count_motifs_order4
+        motifs = count(G)
 
-    for k, v in motifs:
-        print(k, v, sep='\t')
+    with profiling.phase('output'):
+        # tsv はヘッダなし、npy/npz の列は motif (文字列), count
+        table = {'motif': [str(k) for k, _ in motifs], 'count': [v for _, v in motifs]}
+        results.write_table(args.output, table, fmt=args.output_format, header=False)
 
 
 def parse_args():
@@ -32,9 +50,24 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('dataset_dir')
     parser.add_argument('dataset')
-    return parser.parse_args()
+    parser.add_argument('--order', type=int, choices=[3, 4], default=3, help='number of nodes of the motifs')
+    parser.add_argument('--algorithm', choices=['engine', 'esu'], default='engine',
+                        help='engine: motifs_order_3/4 (hypergcc.motifs.engine), '
+                             'esu: count_motifs, every connected node set of the projected graph (hypergcc.motifs.esu)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes enumerating the connected node sets (with --algorithm esu)')
+    results.add_arguments(parser)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if args.output_format != 'tsv' and args.output is None:
+        parser.error(f'--output-format {args.output_format} needs --output')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.workers > 1 and args.algorithm != 'esu':
+        parser.error('--workers needs --algorithm esu')
+    return args
 
 
 if __name__ == '__main__':
     args = parse_args()
-    main(args)
+    profiling.run(main, args, 'count_motifs')
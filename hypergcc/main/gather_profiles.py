@@ -0,0 +1,30 @@
+'''
+--profile で書き出した JSON をまとめて1つの表 (TSV) にする
+
+列は command, dataset, phase, calls, wall, cpu, peak_rss (bytes)。各ファイルの最後に
+実行全体の行 (phase = total) を出力する
+'''
+import json
+
+
+def main(args):
+    print('command', 'dataset', 'phase', 'calls', 'wall', 'cpu', 'peak_rss', sep='\t')
+    for path in args.profiles:
+        with open(path, 'r') as f:
+            record = json.load(f)
+        for p in record['phases']:
+            print(record['command'], record['dataset'], p['name'], p['calls'], p['wall'], p['cpu'], p['peak_rss'], sep='\t')
+        total = record['total']
+        print(record['command'], record['dataset'], 'total', 1, total['wall'], total['cpu'], total['peak_rss'], sep='\t')
+
+
+def parse_args():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('profiles', nargs='+', help='JSON files written by --profile')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,278 @@
+'''
+Bitmask classification of the motifs of N nodes.
+
+The hyperedges among N nodes v_1 < ... < v_N are encoded as a bitmask over the
+2^N - N - 1 subsets of at least 2 of their positions. motif_table(N) gives the
+array mask -> class (the index of the motif in sorted order, -1 if the mask is not
+a connected motif on the N nodes); it is built once with bitmask canonical forms,
+memoized and stored in the cache directory (hypergcc.cache). HyperedgeTable tells
+with sorted-key lookups which sub-tuples of a batch of node sets are hyperedges.
+MotifCounter classifies the node sets found by the motif algorithms in batches,
+replacing the power_set / relabel / labeling lookups of count_motif; the counts are
+the same.
+
+The tables are built for N <= MAX_ORDER: for N = 5 the array would have 2^26 entries
+and each of them 120 permutations.
+'''
+import os
+import uuid
+import zipfile
+import functools
+import itertools
+
+import numpy as np
+
+from hypergcc.cache import cache_dir
+
+import logging
+logger = logging.getLogger(__name__)
+
+BATCH = 1 << 16
+MAX_ORDER = 4
+TABLE_VERSION = 1
+
+
+def subsets(N):
+    '''Positions (0..N-1) of the possible hyperedges among N nodes, in the order of their bits.'''
+    return [s for r in range(2, N + 1) for s in itertools.combinations(range(N), r)]
+
+
+def mask_edges(S, mask):
+    '''Hyperedges of mask (S = subsets(N)) labeled 1..N, in the form of the labeled motifs of generate_motifs.'''
+    return tuple(sorted(tuple(v + 1 for v in s) for b, s in enumerate(S) if int(mask) >> b & 1))
+
+
+def _permute_bits(masks, targets):
+    '''Move bit b of each mask to bit targets[b].'''
+    out = np.zeros_like(masks)
+    for b, t in enumerate(targets):
+        out |= (masks >> b & 1) << t
+    return out
+
+
+def _connected(N, S, masks):
+    '''Whether the hyperedges of each mask cover the N nodes and are connected (utils.is_connected).'''
+    members = [sum(1 << v for v in s) for s in S]
+    reach = np.ones_like(masks)
+    for _ in range(N - 1):
+        for b, m in enumerate(members):
+            touch = ((masks >> b & 1) == 1) & ((reach & m) != 0)
+            reach = np.where(touch, reach | m, reach)
+    return reach == (1 << N) - 1
+
+
+def build_motif_table(N):
+    '''Representatives (masks, one per motif in sorted order) and the class of every mask for N nodes.
+
+    The canonical form of a mask is its smallest key over the N! relabelings, where the key
+    numbers the hyperedges as generate_motifs did (sizes N..2, then lexicographically), so that
+    the representatives, and thus the motifs, are those of the original enumeration.
+    '''
+    S = subsets(N)
+    bit = {s: b for b, s in enumerate(S)}
+    masks = np.arange(1 << len(S), dtype=np.int64)
+
+    order = [s for r in range(N, 1, -1) for s in itertools.combinations(range(N), r)]
+    keys = _permute_bits(masks, [order.index(s) for s in S])
+    canon = keys.copy()
+    for p in itertools.permutations(range(N)):
+        relabeled = _permute_bits(masks, [bit[tuple(sorted(p[v] for v in s))] for s in S])
+        canon = np.minimum(canon, keys[relabeled])
+
+    connected = _connected(N, S, masks)
+    reps = np.unique(canon[connected])
+    inverse = np.empty_like(masks)
+    inverse[keys] = masks
+    motifs = [mask_edges(S, m) for m in inverse[reps]]
+    ranks = np.empty(len(reps), dtype=np.int32)
+    ranks[sorted(range(len(reps)), key=lambda i: motifs[i])] = np.arange(len(reps), dtype=np.int32)
+
+    classes = np.full(len(masks), -1, dtype=np.int32)
+    classes[connected] = ranks[np.searchsorted(reps, canon[connected])]
+    representatives = np.empty(len(reps), dtype=np.int64)
+    representatives[ranks] = inverse[reps]
+    return representatives, classes
+
+
+def _save_table(path, representatives, classes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.parent / f'.{path.name}.{uuid.uuid4().hex}.npz'
+    try:
+        np.savez(tmp, representatives=representatives, classes=classes)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+@functools.lru_cache(maxsize=None)
+def motif_table(N):
+    '''(motifs, classes) for N nodes: the sorted motifs (as the keys of generate_motifs) and the class of every mask.
+
+    The table is memoized and read from the cache directory when it was built before.
+    '''
+    if not 2 <= N <= MAX_ORDER:
+        msg = f'Error: motif tables are built for 2 <= N <= {MAX_ORDER} (N = {N})'
+        logger.error(msg)
+        raise ValueError(msg)
+
+    S = subsets(N)
+    path = cache_dir() / 'motifs' / f'motifs{N}-v{TABLE_VERSION}.npz'
+    try:
+        with np.load(path) as f:
+            representatives, classes = f['representatives'], f['classes']
+        if len(classes) != 1 << len(S) or np.any(classes >= len(representatives)):
+            raise ValueError(f'table of {len(classes)} masks')
+        logger.info('Motif table was loaded from %s', path)
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning('Broken motif table %s: %s', path, e)
+        representatives, classes = build_motif_table(N)
+        try:
+            _save_table(path, representatives, classes)
+            logger.info('Motif table was cached to %s', path)
+        except OSError as e:
+            logger.warning('Could not write motif table %s: %s', path, e)
+
+    classes.setflags(write=False)
+    return tuple(mask_edges(S, m) for m in representatives), classes
+
+
+class HyperedgeTable():
+    '''Set of hyperedges of the given sizes, queried with batches of sorted node tuples.
+
+    The nodes are numbered by rank among the nodes of the table (n of them). The hyperedges
+    of size k are stored as a trie with one sorted array per level: the key of a prefix of
+    length j + 1 is (index of its prefix of length j in the previous level) * n + (rank of
+    its last node), so the keys stay below |E| * n for any k.
+    '''
+    def __init__(self, edges, sizes):
+        rows = {k: [] for k in sizes}
+        for e in edges:
+            if len(e) in rows:
+                rows[len(e)].append(e)
+        self._build({k: np.asarray(r) for k, r in rows.items() if r})
+
+    @classmethod
+    def from_arrays(cls, rows):
+        '''Table of the rows of 2-D arrays of node ids (dict size -> array, any order within the rows).'''
+        table = cls.__new__(cls)
+        table._build(rows)
+        return table
+
+    def _build(self, rows):
+        rows = {k: np.sort(r, axis=1) for k, r in rows.items() if len(r)}
+        self.ids = np.unique(np.concatenate([r.reshape(-1) for r in rows.values()])) if rows else np.empty(0, dtype=np.int64)
+        self.n = max(len(self.ids), 1)
+
+        self.levels = {}
+        for k, r in rows.items():
+            R = self.ranks(r)
+            pid = R[:, 0]
+            levels = []
+            for j in range(1, k):
+                key = pid * self.n + R[:, j]
+                keys = np.unique(key)
+                levels.append(keys)
+                pid = np.searchsorted(keys, key)
+            self.levels[k] = levels
+
+    def restrict(self, sizes):
+        '''The same table with only the hyperedges of the given sizes (the arrays are shared).'''
+        table = HyperedgeTable.__new__(HyperedgeTable)
+        table.ids, table.n = self.ids, self.n
+        table.levels = {k: v for k, v in self.levels.items() if k in sizes}
+        return table
+
+    def ranks(self, nodes):
+        '''Rank of each node id (-1 if the node is in no hyperedge of the table).'''
+        nodes = np.asarray(nodes)
+        if len(self.ids) == 0:
+            return np.full(nodes.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.ids, nodes), len(self.ids) - 1)
+        return np.where(self.ids[pos] == nodes, pos, -1).astype(np.int64)
+
+    def contains(self, R):
+        '''Whether each row of R (ranks, sorted within the rows) is a hyperedge.'''
+        levels = self.levels.get(R.shape[1])
+        found = np.all(R >= 0, axis=1)
+        if levels is None:
+            return np.zeros(len(R), dtype=bool)
+        pid = np.where(found, R[:, 0], 0)
+        for j, keys in enumerate(levels, 1):
+            key = pid * self.n + R[:, j]
+            pos = np.searchsorted(keys, key)
+            hit = pos < len(keys)
+            hit[hit] = keys[pos[hit]] == key[hit]
+            found &= hit
+            pid = np.where(found, pos, 0)
+        return found
+
+
+class MotifClassifier():
+    '''Class of the motif formed by the hyperedges among N nodes (motif_table).'''
+    def __init__(self, N):
+        self.N = N
+        self.motifs, self.classes = motif_table(N)
+        self.subsets = subsets(N)
+
+    def masks(self, table: HyperedgeTable, nodes):
+        '''Bitmask of the hyperedges of table among each row of nodes (node ids, sorted within the rows).'''
+        R = table.ranks(nodes)
+        mask = np.zeros(len(nodes), dtype=np.int64)
+        for b, s in enumerate(self.subsets):
+            mask |= table.contains(R[:, s]).astype(np.int64) << b
+        return mask
+
+    def classify(self, table: HyperedgeTable, nodes):
+        '''Class of each row of nodes (N node ids in any order; -1 if not a motif, e.g. a node repeated).'''
+        nodes = np.sort(np.asarray(nodes).reshape(-1, self.N), axis=1)
+        classes = self.classes[self.masks(table, nodes)]
+        distinct = np.all(nodes[:, 1:] != nodes[:, :-1], axis=1)
+        return np.where(distinct, classes, -1)
+
+
+class MotifCounter():
+    '''Counts of the motifs of the node sets added one by one, classified in batches.
+
+    edges are the hyperedges seen by the algorithm (only those of the given sizes, 2..N by default, matter)
+    and the node sets in exclude are not counted; both may be given as a HyperedgeTable.
+    '''
+    def __init__(self, N, edges, sizes=None, exclude=None, batch=BATCH):
+        self.classifier = MotifClassifier(N)
+        sizes = range(2, N + 1) if sizes is None else sizes
+        self.table = edges.restrict(sizes) if isinstance(edges, HyperedgeTable) else HyperedgeTable(edges, sizes)
+        if exclude is not None and not isinstance(exclude, HyperedgeTable):
+            exclude = HyperedgeTable(exclude, [N])
+        self.exclude = exclude
+        self.batch = batch
+        self.counts = np.zeros(len(self.classifier.motifs), dtype=np.int64)
+        self._pending = []
+
+    def add(self, nodes):
+        self._pending.append(tuple(nodes))
+        if len(self._pending) >= self.batch:
+            self.flush()
+
+    def add_many(self, rows):
+        '''Count the rows of a 2-D array of node ids at once.'''
+        self.flush()
+        self._count(rows)
+
+    def flush(self):
+        if not self._pending:
+            return
+        self._count(self._pending)
+        self._pending = []
+
+    def _count(self, rows):
+        rows = np.sort(np.asarray(rows).reshape(-1, self.classifier.N), axis=1)
+        classes = self.classifier.classify(self.table, rows)
+        if self.exclude is not None:
+            classes[self.exclude.contains(self.exclude.ranks(rows))] = -1
+        self.counts += np.bincount(classes[classes >= 0], minlength=len(self.counts))
+
+    def result(self):
+        '''List of (motif, count) sorted by motif, as the out of the motif algorithms.'''
+        self.flush()
+        return [(motif, int(c)) for motif, c in zip(self.classifier.motifs, self.counts)]
@@ -0,0 +1,215 @@
+'''
+Phases of motifs_order_3 / motifs_order_4 on one shared hyperedge index.
+
+The phases count the same node sets as motifs_ho_full, motifs_ho_not_full and
+motifs_standard (utils):
+- ho_full: each hyperedge of N nodes, on its own nodes,
+- ho_not_full: the sets of N nodes formed by a hyperedge of N - 1 nodes and a smaller
+  hyperedge sharing a node with it, each once,
+- standard: the connected sets of N nodes of the graph of the hyperedges of 2 nodes,
+where a set already visited by an earlier phase is skipped by the later ones.
+
+MotifEngine groups the hyperedges by size once into a HyperedgeTable that every phase
+queries, keeps visited as an array of packed keys of the sorted node ranks, and builds the
+candidates of ho_not_full from a node -> hyperedge incidence array, PAIRS_CHUNK pairs of
+hyperedges at a time, instead of joining the Python lists of each pair.
+
+The motif of a set in standard only depends on the subgraph of the graph induced by the
+set, so standard is not enumerated (esu): the connected induced subgraphs of 3 and 4 nodes
+are counted by type (graphlet_counts) from the degrees, the common neighbors (A^2), the
+triangles of each edge and the edges among them, and the visited sets are subtracted.
+'''
+import numpy as np
+import scipy.sparse as sp
+
+from hypergcc.motifs.classify import HyperedgeTable, MotifCounter
+
+import logging
+logger = logging.getLogger(__name__)
+
+PAIRS_CHUNK = 1 << 20
+
+# 連結な誘導部分グラフの型 (graphlet_counts の順) とその辺
+GRAPHLETS = {
+    3: {'path': [(0, 1), (1, 2)],
+        'triangle': [(0, 1), (0, 2), (1, 2)]},
+    4: {'path': [(0, 1), (1, 2), (2, 3)],
+        'star': [(0, 1), (0, 2), (0, 3)],
+        'cycle': [(0, 1), (1, 2), (2, 3), (0, 3)],
+        'tailed_triangle': [(0, 1), (0, 2), (1, 2), (2, 3)],
+        'diamond': [(0, 1), (0, 2), (1, 2), (1, 3), (2, 3)],
+        'clique': [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)]},
+}
+
+
+def pack_rows(R, n):
+    '''Keys of the rows of R (ranks < n): int64 in base n when n^k fits in 63 bits, otherwise the bytes of the rows.'''
+    if n ** R.shape[1] < 1 << 63:
+        key = np.zeros(len(R), dtype=np.int64)
+        for j in range(R.shape[1]):
+            key = key * n + R[:, j]
+        return key
+    return np.ascontiguousarray(R, dtype=np.int64).view(np.dtype((np.void, 8 * R.shape[1]))).reshape(-1)
+
+
+def _choose2(x):
+    return x * (x - 1) // 2
+
+
+def graphlet_counts(pairs, N):
+    '''Numbers of the connected induced subgraphs of N = 3 or 4 nodes of the graph of pairs ((m, 2) node ids), by GRAPHLETS[N].
+
+    Self-loops and repeated edges are ignored. The counts of the (not necessarily induced)
+    subgraphs of each type are computed first and then corrected by the number of copies of
+    each type contained in the denser types.
+    '''
+    if N not in GRAPHLETS:
+        msg = f'Error: graphlets are counted for N = 3, 4 (N = {N})'
+        logger.error(msg)
+        raise ValueError(msg)
+
+    ids, inverse = np.unique(np.asarray(pairs).reshape(-1, 2), return_inverse=True)
+    inverse = inverse.reshape(-1, 2).astype(np.int64)
+    n = max(len(ids), 1)
+    u, v = inverse.min(axis=1), inverse.max(axis=1)
+    u, v = np.divmod(np.unique(u[u != v] * n + v[u != v]), n)
+    A = sp.csr_matrix((np.ones(2 * len(u), dtype=np.int64), (np.concatenate([u, v]), np.concatenate([v, u]))), shape=(n, n))
+    d = np.diff(A.indptr).astype(np.int64)
+
+    A2 = (A @ A).tocsr()
+    # 辺がないとき A2[u, v] は疎行列になる
+    t = np.asarray(A2[u, v]).reshape(-1).astype(np.int64) if len(u) else np.zeros(0, dtype=np.int64)
+    triangles = t.sum() // 3
+    if N == 3:
+        return np.array([_choose2(d).sum() - 3 * triangles, triangles], dtype=np.int64)
+
+    # 各型の (誘導とは限らない) 部分グラフの数
+    t_node = (np.bincount(u, t, minlength=n) + np.bincount(v, t, minlength=n)).astype(np.int64) // 2
+    common = sp.triu(A2, k=1).data.astype(np.int64)
+    clique = 0
+    dmax = max(int(d.max(initial=0)), 1)
+    dense = np.flatnonzero(t >= 2)
+    cum = np.concatenate([[0], np.cumsum(t[dense])])
+    lo = 0
+    while lo < len(dense):
+        hi = max(int(np.searchsorted(cum, cum[lo] + PAIRS_CHUNK // dmax, side='right')) - 1, lo + 1)
+        e = dense[lo:hi]
+        R = A[u[e]].multiply(A[v[e]]).tocsr()
+        clique += int((R @ A).multiply(R).sum()) // 2
+        lo = hi
+    sub = {'path': int(((d[u] - 1) * (d[v] - 1)).sum()) - 3 * int(triangles),
+           'star': int((d * (d - 1) * (d - 2) // 6).sum()),
+           'cycle': int(_choose2(common).sum()) // 2,
+           'tailed_triangle': int((t_node * (d - 2)).sum()),
+           'diamond': int(_choose2(t).sum()),
+           'clique': clique // 6}
+
+    # 誘導部分グラフの数: 密な型に含まれる部分グラフを引く
+    g = {'clique': sub['clique']}
+    g['diamond'] = sub['diamond'] - 6 * g['clique']
+    g['cycle'] = sub['cycle'] - g['diamond'] - 3 * g['clique']
+    g['tailed_triangle'] = sub['tailed_triangle'] - 4 * g['diamond'] - 12 * g['clique']
+    g['star'] = sub['star'] - g['tailed_triangle'] - 2 * g['diamond'] - 4 * g['clique']
+    g['path'] = sub['path'] - 4 * g['cycle'] - 2 * g['tailed_triangle'] - 6 * g['diamond'] - 12 * g['clique']
+    return np.array([g[name] for name in GRAPHLETS[4]], dtype=np.int64)
+
+
+def _unique_rows(keys, R):
+    keys, idx = np.unique(keys, return_index=True)
+    return keys, R[idx]
+
+
+class MotifEngine():
+    '''Hyperedges of 2..N nodes of edges, indexed once for the phases of the motifs of N nodes.'''
+    def __init__(self, edges, N):
+        self.N = N
+        by_size = {k: [] for k in range(2, N + 1)}
+        for e in edges:
+            if len(e) in by_size:
+                by_size[len(e)].append(e)
+        # ハイパーエッジの行は入力の順のまま (visited はソート済みの行だけを含むため)
+        self.rows = {k: np.asarray(r, dtype=np.int64).reshape(-1, k) for k, r in by_size.items()}
+        self.table = HyperedgeTable.from_arrays(self.rows)
+
+        self.visited_keys = pack_rows(np.empty((0, N), dtype=np.int64), self.table.n)
+        self.visited_rows = np.empty((0, N), dtype=np.int64)
+
+    def _visit(self, R):
+        '''Add the rows of R (sorted ranks) to visited.'''
+        keys = np.concatenate([self.visited_keys, pack_rows(R, self.table.n)])
+        self.visited_keys, self.visited_rows = _unique_rows(keys, np.concatenate([self.visited_rows, R]))
+
+    def ho_full(self):
+        N = self.N
+        R = self.rows[N]
+        counter = MotifCounter(N, self.table)
+        counter.add_many(R)
+
+        # 後の段階はソートしたノードの組で visited を引くので, ノードが昇順に並んだハイパーエッジだけが一致する
+        increasing = np.all(R[:, 1:] > R[:, :-1], axis=1)
+        self._visit(self.table.ranks(R[increasing]))
+        return counter.result()
+
+    def _distinct_ranks(self, k):
+        '''Sorted ranks of the hyperedges of size k, with repeated nodes replaced by -1 (N - 1 columns).'''
+        R = np.sort(self.table.ranks(self.rows[k]), axis=1)
+        R[:, 1:][R[:, 1:] == R[:, :-1]] = -1
+        return np.concatenate([R, np.full((len(R), self.N - 1 - k), -1, dtype=np.int64)], axis=1)
+
+    def ho_not_full(self):
+        N, n = self.N, self.table.n
+        S = np.concatenate([self._distinct_ranks(k) for k in range(2, N)])
+        first = len(S) - len(self.rows[N - 1])
+
+        # ノード -> そのノードを含む小さいハイパーエッジ
+        edge, node = np.nonzero(S >= 0)
+        node = S[edge, node]
+        order = np.argsort(node, kind='stable')
+        incident = edge[order]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(node, minlength=n))])
+        degree = np.diff(indptr)
+
+        # N - 1 ノードのハイパーエッジごとの組の数で区切る
+        B = S[first:]
+        pairs = np.where(B >= 0, degree[np.maximum(B, 0)], 0).sum(axis=1)
+        cum = np.concatenate([[0], np.cumsum(pairs)])
+        keys, rows = [], []
+        lo = 0
+        while lo < len(B):
+            hi = max(int(np.searchsorted(cum, cum[lo] + PAIRS_CHUNK, side='right')) - 1, lo + 1)
+            e, j = np.nonzero(B[lo:hi] >= 0)
+            v = B[lo:hi][e, j]
+            counts = degree[v]
+            offsets = np.repeat(indptr[v] - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+            other = incident[offsets + np.arange(counts.sum())]
+            U = np.sort(np.concatenate([B[lo:hi][np.repeat(e, counts)], S[other]], axis=1), axis=1)
+
+            distinct = U >= 0
+            distinct[:, 1:] &= U[:, 1:] != U[:, :-1]
+            keep = distinct.sum(axis=1) == N
+            C = U[keep][distinct[keep]].reshape(-1, N)
+            k, C = _unique_rows(pack_rows(C, n), C)
+            keys.append(k)
+            rows.append(C)
+            lo = hi
+
+        keys, C = _unique_rows(np.concatenate(keys), np.concatenate(rows)) if keys else (self.visited_keys[:0], self.visited_rows[:0])
+        C = C[~np.isin(keys, self.visited_keys)]
+        counter = MotifCounter(N, self.table, sizes=range(2, N))
+        counter.add_many(self.table.ids[C])
+        self._visit(C)
+        return counter.result()
+
+    def standard(self):
+        N = self.N
+        counter = MotifCounter(N, self.table, sizes=[2])
+        classifier = counter.classifier
+        bit = {p: b for b, p in enumerate(classifier.subsets)}
+        for edges, count in zip(GRAPHLETS[N].values(), graphlet_counts(self.rows[2], N)):
+            counter.counts[classifier.classes[sum(1 << bit[p] for p in edges)]] += count
+
+        # visited の組のうち 2 ノードのハイパーエッジで連結なものは数えない
+        visited = MotifCounter(N, self.table, sizes=[2])
+        visited.add_many(self.table.ids[self.visited_rows])
+        counter.counts -= visited.counts
+        return counter.result()
@@ -0,0 +1,151 @@
+'''
+ESU enumeration of the connected sets of N nodes of a graph, optionally on a process pool.
+
+Each connected set is enumerated once, from its smallest node (the root), as by the
+graph_extend recursion of motifs_standard / count_motifs. The nodes are numbered in
+sorted order and the recursion keeps the current set as a tuple and the extension as a
+list; the exclusive neighborhood is tested against per-node neighbor sets instead of
+copying the sets of the subgraph at every level, and the last level emits its sets at once.
+
+With workers > 1 the roots are dealt to WORKER_CHUNKS bins per worker, heaviest first
+(degree^2 as the estimated cost of a root), and each worker counts its bins with its own
+copy of the MotifCounter; the counts are summed.
+'''
+import heapq
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from hypergcc.motifs.classify import MotifCounter
+
+import logging
+logger = logging.getLogger(__name__)
+
+WORKER_CHUNKS = 8
+
+# 子プロセスの状態 (_init_worker で設定する)
+_worker = {}
+
+
+class LocalGraph():
+    '''Neighbors of a graph (dict node -> iterable of neighbors) by local ids in the order of the nodes.'''
+    def __init__(self, graph):
+        nodes = sorted(graph)
+        index = {v: i for i, v in enumerate(nodes)}
+        self.ids = np.asarray(nodes)
+        self.adj = []
+        for i, v in enumerate(nodes):
+            nbrs = {index[u] for u in graph[v]}
+            nbrs.discard(i)
+            self.adj.append(tuple(sorted(nbrs)))
+        self.sets = [frozenset(a) for a in self.adj]
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        '''Graph of the edges in a (m, 2) array of node ids (self-loops and repeated edges are dropped).'''
+        pairs = np.asarray(pairs).reshape(-1, 2)
+        ids, inverse = np.unique(pairs, return_inverse=True)
+        inverse = inverse.reshape(-1, 2)
+        n = max(len(ids), 1)
+        a = np.concatenate([inverse[:, 0], inverse[:, 1]]).astype(np.int64)
+        b = np.concatenate([inverse[:, 1], inverse[:, 0]]).astype(np.int64)
+        a, b = np.divmod(np.unique(a[a != b] * n + b[a != b]), n)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(a, minlength=len(ids)))]).tolist()
+        b = b.tolist()
+
+        g = cls.__new__(cls)
+        g.ids = ids
+        g.adj = [tuple(b[indptr[i]:indptr[i + 1]]) for i in range(len(ids))]
+        g.sets = [frozenset(x) for x in g.adj]
+        return g
+
+    def __len__(self):
+        return len(self.adj)
+
+
+class _Leaves():
+    '''Sets of the last level kept as (sub, ext) groups and added to counter every counter.batch sets.'''
+    def __init__(self, g: LocalGraph, counter: MotifCounter):
+        self.g, self.counter = g, counter
+        self.subs, self.exts, self.size = [], [], 0
+
+    def add(self, sub, ext):
+        self.subs.append(sub)
+        self.exts.append(ext)
+        self.size += len(ext)
+        if self.size >= self.counter.batch:
+            self.flush()
+
+    def flush(self):
+        if self.size:
+            subs = np.repeat(np.array(self.subs, dtype=np.int64), [len(e) for e in self.exts], axis=0)
+            last = np.fromiter(itertools.chain.from_iterable(self.exts), dtype=np.int64, count=self.size)
+            self.counter.add_many(self.g.ids[np.column_stack([subs, last])])
+        self.subs, self.exts, self.size = [], [], 0
+
+
+def _extend(g: LocalGraph, N, v, sub, ext, leaves: _Leaves):
+    if len(sub) == N - 1:
+        leaves.add(sub, ext)
+        return
+
+    adj, sets = g.adj, g.sets
+    for i, w in enumerate(ext):
+        # w の排他的近傍: v より大きく, sub にも sub の近傍にも含まれないノード
+        new_ext = ext[i + 1:]
+        new_ext.extend(u for u in adj[w] if u > v and u not in sub and not any(u in sets[s] for s in sub))
+        if new_ext or len(sub) + 2 < N:
+            _extend(g, N, v, sub + (w,), new_ext, leaves)
+
+
+def count_roots(g: LocalGraph, N, roots, counter: MotifCounter):
+    '''Add the connected sets of N nodes whose smallest node is in roots (local ids) to counter.'''
+    leaves = _Leaves(g, counter)
+    for v in roots:
+        ext = [u for u in g.adj[v] if u > v]
+        if ext:
+            _extend(g, N, v, (v,), ext, leaves)
+    leaves.flush()
+
+
+def partition_roots(g: LocalGraph, n_bins):
+    '''Roots dealt to n_bins bins of about equal estimated cost (degree^2), heaviest first.'''
+    cost = np.array([len(a) for a in g.adj], dtype=np.int64) ** 2
+    bins = [[] for _ in range(n_bins)]
+    heap = [(0, b) for b in range(n_bins)]
+    for v in np.argsort(-cost, kind='stable'):
+        load, b = heapq.heappop(heap)
+        bins[b].append(int(v))
+        heapq.heappush(heap, (load + int(cost[v]), b))
+    return [sorted(b) for b in bins if b]
+
+
+def _init_worker(g, N, counter):
+    counter.counts = np.zeros_like(counter.counts)
+    counter._pending = []
+    _worker.update(g=g, N=N, counter=counter)
+
+
+def _count_bin(roots):
+    counter = _worker['counter']
+    counter.counts[:] = 0
+    count_roots(_worker['g'], _worker['N'], roots, counter)
+    counter.flush()
+    return counter.counts.copy()
+
+
+def count_connected(graph, N, counter: MotifCounter, workers=1):
+    '''Add the connected sets of N nodes of graph (dict node -> neighbors, or a LocalGraph) to counter.'''
+    g = graph if isinstance(graph, LocalGraph) else LocalGraph(graph)
+    if workers <= 1 or len(g) == 0:
+        count_roots(g, N, range(len(g)), counter)
+        return counter
+
+    counter.flush()
+    bins = partition_roots(g, min(len(g), workers * WORKER_CHUNKS))
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(g, N, counter)) as pool:
+        for k, counts in enumerate(pool.imap_unordered(_count_bin, bins), 1):
+            counter.counts += counts
+            logger.info('ESU: %d/%d bins', k, len(bins))
+    return counter
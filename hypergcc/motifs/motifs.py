@@ -27,21 +27,20 @@ SOFTWARE.
 # from hypergcc.motifs.hypergraph import hypergraph
 from .utils import *
 from .loaders import *
+from .classify import MotifCounter
+from .esu import count_connected
+
+from hypergcc import profiling
 
 import logging
 logger = logging.getLogger(__name__)
 
 
-def count_motifs(edges, N, TOT):
+@profiling.timed('compute')
+def count_motifs(edges, N, TOT, workers=1):
     H_O = True
     # L_O = []
     logger.info(len(edges))
-    mapping, labeling = generate_motifs(N)
-
-    z = set()
-    for e in edges:
-        for n in e:
-            z.add(n)
 
     graph = {}
     T = {}
@@ -71,84 +70,12 @@ def count_motifs(edges, N, TOT):
     # global L_O
     # L_O = list(T.keys())
 
-    def count_motif(nodes):
-        nodes = tuple(sorted(tuple(nodes)))
-        p_nodes = power_set(nodes)
-        
-        motif = []
-        for edge in p_nodes:
-            if len(edge) >= 2:
-                edge = tuple(sorted(list(edge)))
-                if edge in T:
-                    motif.append(edge)
-        
-        conn = is_connected(motif, N)
-        
-        if not conn:
-            return
-
-        m = {}
-        idx = 1
-        for i in nodes:
-            m[i] = idx
-            idx += 1
-
-        labeled_motif = []
-        for e in motif:
-            new_e = []
-            for node in e:
-                new_e.append(m[node])
-            new_e = tuple(sorted(new_e))
-            labeled_motif.append(new_e)
-        labeled_motif = tuple(sorted(labeled_motif))
-
-        if labeled_motif in labeling:
-            labeling[labeled_motif] += 1
-
-    def graph_extend(sub, ext, v, n_sub):
-
-        if len(sub) == N:
-            count_motif(sub)
-            return
-
-        while len(ext) > 0:
-            w = ext.pop()
-            tmp = set(ext)
-
-            for u in graph[w]:
-                if u not in sub and u not in n_sub and u > v:
-                    tmp.add(u)
-
-            new_sub = set(sub)
-            new_sub.add(w)
-            new_n_sub = set(n_sub).union(set(graph[w]))
-            graph_extend(new_sub, tmp, v, new_n_sub)
-
-    c = 0
-    
-    k = 0
-    for v in graph.keys():
-        v_ext = set()
-        for u in graph[v]:
-            if u > v:
-                v_ext.add(u)
-        k += 1
-        if k % 5 == 0:
-            logger.info(k, len(z), TOT)
-
-        graph_extend(set([v]), v_ext, v, set(graph[v]))
-        c += 1
-
-    out = []
-
-    for motif in mapping.keys():
-        count = 0
-        for label in mapping[motif]:
-            count += labeling[label]
-            
-        out.append((motif, count))
-
-    out = list(sorted(out))
+    # is_connected も含めて, ノードの組はまとめてビットマスクで分類する (labeling のモチーフは全て連結)
+    counter = MotifCounter(N, T)
+
+    count_connected(graph, N, counter, workers=workers)
+
+    out = counter.result()
 
     D = {}
     for i in range(len(out)):
@@ -27,11 +27,17 @@ SOFTWARE.
 # from .hypergraph import hypergraph
 from .utils import *
 from .loaders import *
+from .engine import MotifEngine
 
+from hypergcc import profiling
+
+@profiling.timed('compute')
 def motifs_order_3(edges, TOT):
     N = 3
-    full, visited = motifs_ho_full(edges, N, TOT)
-    standard = motifs_standard(edges, N, TOT, visited)
+    # 各段階は一つのハイパーエッジの索引と visited を共有する (engine.MotifEngine)
+    engine = MotifEngine(edges, N)
+    full = engine.ho_full()
+    standard = engine.standard()
 
     res = []
     for i in range(len(full)):
@@ -39,11 +45,13 @@ def motifs_order_3(edges, TOT):
 
     return res
 
+@profiling.timed('compute')
 def motifs_order_4(edges, TOT):
     N = 4
-    full, visited = motifs_ho_full(edges, N, TOT)
-    not_full, visited = motifs_ho_not_full(edges, N, TOT, visited)
-    standard = motifs_standard(edges, N, TOT, visited)
+    engine = MotifEngine(edges, N)
+    full = engine.ho_full()
+    not_full = engine.ho_not_full()
+    standard = engine.standard()
 
     res = []
     for i in range(len(full)):
@@ -22,26 +22,26 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 import random, math
-import itertools
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 import numpy as np
 
+from hypergcc import profiling
+from hypergcc.motifs.classify import MotifCounter, mask_edges, motif_table, subsets
+from hypergcc.motifs.esu import count_connected
+
 import logging
 logger = logging.getLogger(__name__)
 
 
 def motifs_ho_not_full(edges, N, TOT, visited):
-    mapping, labeling = generate_motifs(N)
+    counter = MotifCounter(N, edges, sizes=range(2, N))
 
-    T = {}
     graph = {}
     for e in edges:
         if len(e) >= N:
             continue
 
-        T[tuple(sorted(e))] = 1
-
         for e_i in e:
             if e_i in graph:
                 graph[e_i].append(e)
@@ -49,33 +49,8 @@ def motifs_ho_not_full(edges, N, TOT, visited):
                 graph[e_i] = [e]
 
     def count_motif(nodes):
-        nodes = tuple(sorted(tuple(nodes)))
-        p_nodes = power_set(nodes)
-        
-        motif = []
-        for edge in p_nodes:
-            if len(edge) >= 2:
-                edge = tuple(sorted(list(edge)))
-                if edge in T:
-                    motif.append(edge)
-
-        m = {}
-        idx = 1
-        for i in nodes:
-            m[i] = idx
-            idx += 1
-
-        labeled_motif = []
-        for e in motif:
-            new_e = []
-            for node in e:
-                new_e.append(m[node])
-            new_e = tuple(sorted(new_e))
-            labeled_motif.append(new_e)
-        labeled_motif = tuple(sorted(labeled_motif))
-
-        if labeled_motif in labeling:
-            labeling[labeled_motif] += 1
+        # ノードの組の中のハイパーエッジはまとめてビットマスクで分類する (classify.MotifCounter)
+        counter.add(nodes)
 
     for e in edges:
         if len(e) == N - 1:
@@ -90,16 +65,7 @@ def motifs_ho_not_full(edges, N, TOT, visited):
                         visited[tuple(sorted(tmp))] = 1
                         count_motif(tmp)
 
-    out = []
-
-    for motif in mapping.keys():
-        count = 0
-        for label in mapping[motif]:
-            count += labeling[label]
-            
-        out.append((motif, count))
-
-    out = list(sorted(out))
+    out = counter.result()
 
     D = {}
     for i in range(len(out)):
@@ -111,20 +77,14 @@ def motifs_ho_not_full(edges, N, TOT, visited):
     return out, visited
 
 
-def motifs_standard(edges, N, TOT, visited):
-    mapping, labeling = generate_motifs(N)
+def motifs_standard(edges, N, TOT, visited, workers=1):
+    # visited のキーと比べるのはソート済みのノードの組なので, ソート済みのキーだけが除外される
+    exclude = [nodes for nodes in visited if len(nodes) == N and list(nodes) == sorted(nodes)]
+    counter = MotifCounter(N, edges, sizes=[2], exclude=exclude)
 
     graph = {}
-    T = {}
-
-    z = set()
-    for e in edges:
-        for n in e:
-            z.add(n)
-
     for e in edges:
         if len(e) == 2:
-            T[tuple(sorted(e))] = 1
             a, b = e
             if a in graph:
                 graph[a].append(b)
@@ -136,82 +96,10 @@ def motifs_standard(edges, N, TOT, visited):
             else:
                 graph[b] = [a]
 
-    def count_motif(nodes):
-        nodes = tuple(sorted(tuple(nodes)))
-
-        if nodes in visited:
-            return
-
-        p_nodes = power_set(nodes)
-        
-        motif = []
-        for edge in p_nodes:
-            edge = tuple(sorted(list(edge)))
-            if edge in T:
-                motif.append(edge)
-
-        m = {}
-        idx = 1
-        for i in nodes:
-            m[i] = idx
-            idx += 1
-
-        labeled_motif = []
-        for e in motif:
-            new_e = []
-            for node in e:
-                new_e.append(m[node])
-            new_e = tuple(sorted(new_e))
-            labeled_motif.append(new_e)
-        labeled_motif = tuple(sorted(labeled_motif))
-
-        if labeled_motif in labeling:
-            labeling[labeled_motif] += 1
-
-    def graph_extend(sub, ext, v, n_sub):
-
-        if len(sub) == N:
-            count_motif(sub)
-            return
-
-        while len(ext) > 0:
-            w = ext.pop()
-            tmp = set(ext)
-
-            for u in graph[w]:
-                if u not in sub and u not in n_sub and u > v:
-                    tmp.add(u)
-
-            new_sub = set(sub)
-            new_sub.add(w)
-            new_n_sub = set(n_sub).union(set(graph[w]))
-            graph_extend(new_sub, tmp, v, new_n_sub)
-
-    c = 0
-    
-    k = 0
-    for v in graph.keys():
-        v_ext = set()
-        for u in graph[v]:
-            if u > v:
-                v_ext.add(u)
-        k += 1
-        if k % 5 == 0:
-            logger.info(k, len(z), TOT)
-
-        graph_extend(set([v]), v_ext, v, set(graph[v]))
-        c += 1
-
-    out = []
-
-    for motif in mapping.keys():
-        count = 0
-        for label in mapping[motif]:
-            count += labeling[label]
-            
-        out.append((motif, count))
+    # 連結なノードの組の列挙 (ESU) は esu.count_connected で行う
+    count_connected(graph, N, counter, workers=workers)
 
-    out = list(sorted(out))
+    out = counter.result()
 
     D = {}
     for i in range(len(out)):
@@ -223,42 +111,13 @@ def motifs_standard(edges, N, TOT, visited):
     return out
 
 def motifs_ho_full(edges, N, TOT):
-    mapping, labeling = generate_motifs(N)
-
-    T = {}
-    for e in edges:
-        T[tuple(sorted(e))] = 1
+    counter = MotifCounter(N, edges)
 
     visited = {}
 
     def count_motif(nodes):
-        nodes = tuple(sorted(tuple(nodes)))
-        p_nodes = power_set(nodes)
-        
-        motif = []
-        for edge in p_nodes:
-            if len(edge) >= 2:
-                edge = tuple(sorted(list(edge)))
-                if edge in T:
-                    motif.append(edge)
-
-        m = {}
-        idx = 1
-        for i in nodes:
-            m[i] = idx
-            idx += 1
-
-        labeled_motif = []
-        for e in motif:
-            new_e = []
-            for node in e:
-                new_e.append(m[node])
-            new_e = tuple(sorted(new_e))
-            labeled_motif.append(new_e)
-        labeled_motif = tuple(sorted(labeled_motif))
-
-        if labeled_motif in labeling:
-            labeling[labeled_motif] += 1
+        # ノードの組の中のハイパーエッジはまとめてビットマスクで分類する (classify.MotifCounter)
+        counter.add(nodes)
 
     for e in edges:
         if len(e) == N:
@@ -267,16 +126,7 @@ def motifs_ho_full(edges, N, TOT):
             nodes = list(e)
             count_motif(nodes)
 
-    out = []
-
-    for motif in mapping.keys():
-        count = 0
-        for label in mapping[motif]:
-            count += labeling[label]
-            
-        out.append((motif, count))
-
-    out = list(sorted(out))
+    out = counter.result()
 
     D = {}
     for i in range(len(out)):
@@ -442,49 +292,19 @@ def relabel(edges, relabeling):
         res.append(tuple(sorted(new_edge)))
     return sorted(res)
 
+@profiling.timed('index')
 def generate_motifs(N):
-    n = N
-    assert n >= 2
-
-    h = [i for i in range(1, n + 1)]
-    A = []
-
-    for r in range(n, 1, -1):
-        A.extend(list(itertools.combinations(h, r)))
-
-    B = power_set(A)
-
-    C = []
-    for i in range(len(B)):
-        if is_connected(B[i], N):
-            C.append(B[i])
-
-    isom_classes = {}
-
-    for i in C:
-        edges = sorted(i)
-        relabeling_list = list(itertools.permutations([j for j in range(1, n + 1)]))
-        found = False
-        for relabeling in relabeling_list:
-            relabeling_i = relabel(edges, relabeling)
-            #logger.info(relabeling_i)
-            if tuple(relabeling_i) in isom_classes:
-                found = True
-                break
-        if not found:
-            isom_classes[tuple(edges)] = 1
-
-    mapping = {}
+    # 同型類の列挙は classify.motif_table (ビットマスクの正規形, メモ化とディスクキャッシュ) で行う
+    motifs, classes = motif_table(N)
+    S = subsets(N)
+
+    mapping = {motif: set() for motif in motifs}
     labeling = {}
+    for mask in np.flatnonzero(classes >= 0):
+        labeled = mask_edges(S, mask)
+        mapping[motifs[classes[mask]]].add(labeled)
+        labeling[labeled] = 0
 
-    for k in isom_classes.keys():
-        mapping[k] = set()
-        relabeling_list = list(itertools.permutations([j for j in range(1, n + 1)]))
-        for relabeling in relabeling_list:
-            relabeling_i = relabel(k, relabeling)
-            labeling[tuple(sorted(relabeling_i))] = 0
-            mapping[k].add(tuple(sorted(relabeling_i)))
-    
     return mapping, labeling
 
 #out = len(isom_classes.keys())
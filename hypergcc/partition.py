@@ -0,0 +1,155 @@
+'''
+Out-of-core computation of the clustering coefficients on contiguous ranges of nodes.
+
+The coefficients of a node v depend only on its 2-hop neighborhood: the hyperedges
+of v, their members N(v), and the hyperedges shared by pairs of nodes in N(v).
+For a range of nodes [lo, hi), only this part of the hypergraph is gathered from
+the (typically memory-mapped, see hypergcc.cache) arrays of the CSRCore:
+
+- inner: the hyperedges incident to the range, with the local ids of their members,
+  on which the pairs of hyperedges are enumerated (opsahl, zhou),
+- outer: the hyperedges incident to any node of inner, with their members restricted
+  to the nodes of inner, from which the hypergcc.clustering.PairIndex of the nodes of
+  inner is built.
+
+The values of the nodes of the range are then exact (the same as
+hypergcc.clustering.coefficients) and the local structures are dropped before
+the next range. The ranges are chosen so that an upper bound of the size of these
+structures fits in the memory budget.
+'''
+import numpy as np
+
+from hypergcc import clustering
+from hypergcc.core import CSRCore
+
+import logging
+logger = logging.getLogger(__name__)
+
+BYTES_PER_PAIR = 64  # enumerated candidates (grids, keys and masks)
+BYTES_PER_ENTRY = 48  # entries of the local structures (members, co-membership, projection)
+MIN_MEMORY_BUDGET = 1 << 24
+
+
+def parse_memory(value) -> int:
+    '''Number of bytes of a size such as 512M, 4G or 1000000 (suffixes K, M, G, T in powers of 1024).'''
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    text = str(value).strip().upper().removesuffix('B')
+    scale = units.get(text[-1:], 1)
+    if text[-1:] in units:
+        text = text[:-1]
+    try:
+        size = int(float(text) * scale)
+    except ValueError:
+        size = 0
+    if size <= 0:
+        msg = f"Error: Invalid memory size {value}."
+        logger.error(msg)
+        raise ValueError(msg)
+    return size
+
+
+def _row_sums(ptr, idx, weights, budget):
+    '''For each row i of a CSR structure, the sum of weights[idx[ptr[i]:ptr[i+1]]] (float64), in blocks of rows.'''
+    rows = len(ptr) - 1
+    out = np.zeros(rows)
+    for start, stop in clustering._chunks(np.diff(ptr), budget):
+        lo, hi = int(ptr[start]), int(ptr[stop])
+        cum = np.zeros(hi - lo + 1)
+        np.cumsum(weights[idx[lo:hi]], out=cum[1:])
+        out[start:stop] = cum[ptr[start + 1:stop + 1] - lo] - cum[ptr[start:stop] - lo]
+    return out
+
+
+def node_costs(core: CSRCore, budget=clustering.DEFAULT_BUDGET):
+    '''Upper bound of the number of entries of the local structures of each node.
+
+    Through the hyperedges e of v and their members u, the hyperedges f of u contribute
+    at most |f| entries to the members of outer, the co-membership table and the
+    projection. The bound counts the structures shared by the nodes of a range once
+    per node, so it is conservative.
+    '''
+    sizes = core.hyperedge_sizes().astype(np.float64)
+    a = _row_sums(core.node_indptr, core.node_indices, sizes, budget)  # sum of |f| over the hyperedges of u
+    b = _row_sums(core.indptr, core.indices, a, budget)  # sum over the members of e
+    return _row_sums(core.node_indptr, core.node_indices, b, budget) + 1
+
+
+def node_ranges(core: CSRCore, memory_budget, budget=clustering.DEFAULT_BUDGET):
+    '''Split the nodes into contiguous ranges [lo, hi) whose bound of the local structures fits in memory_budget bytes.'''
+    cost = node_costs(core, budget)
+    for lo, hi in clustering._chunks(cost, max(memory_budget // BYTES_PER_ENTRY, 1)):
+        yield lo, hi
+
+
+def _gather(ptr, idx, rows):
+    '''Concatenation of idx[ptr[r]:ptr[r+1]] for the rows r, and the lengths of the rows.'''
+    counts = ptr[rows + 1] - ptr[rows]
+    owner, offset = clustering._expand(counts)
+    return idx[ptr[rows][owner] + offset], counts
+
+
+def _subcore(core: CSRCore, hyperedges, nodes):
+    '''CSRCore of the given hyperedges with their members restricted to nodes (sorted remapped ids), renumbered to positions in nodes.'''
+    members, counts = _gather(core.indptr, core.indices, hyperedges)
+    pos = np.minimum(np.searchsorted(nodes, members), len(nodes) - 1)
+    keep = nodes[pos] == members
+    owner = np.repeat(np.arange(len(hyperedges)), counts)
+    indptr = np.zeros(len(hyperedges) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner[keep], minlength=len(hyperedges)), out=indptr[1:])
+    return CSRCore(nodes, indptr, pos[keep])
+
+
+def range_coefficients(core: CSRCore, lo, hi, methods=clustering.METHODS, budget=clustering.DEFAULT_BUDGET, dense_limit=clustering.DENSE_LIMIT):
+    '''Numerators and denominators of the nodes lo, ..., hi - 1 (remapped ids), as a dictionary method -> (numer, denom).
+
+    Only the 2-hop neighborhood of the range is materialized. opsahl and zhou require
+    that no hyperedge of the range contains the same node twice (see CSRCore.is_simple).
+    '''
+    targets = np.arange(lo, hi, dtype=np.int64)
+    edges = np.unique(core.node_indices[core.node_indptr[lo]:core.node_indptr[hi]]).astype(np.int64)
+    members, _ = _gather(core.indptr, core.indices, edges)
+    nodes = np.union1d(members, targets)
+    inner = _subcore(core, edges, nodes)
+    local = np.searchsorted(nodes, targets)
+    # 全体の is_simple は全ピンの配列を作るので、範囲ごとに確かめる
+    if ('opsahl' in methods or 'zhou' in methods) and not inner.is_simple():
+        msg = "Error: opsahl and zhou cannot be computed out of core when a hyperedge contains the same node twice."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    around, _ = _gather(core.node_indptr, core.node_indices, nodes)
+    around = np.unique(around).astype(np.int64)
+    outer = _subcore(core, around, nodes)
+    index = clustering.PairIndex(outer, budget, sizes=core.hyperedge_sizes()[around], dense_limit=dense_limit)
+
+    arrays = clustering.coefficients(inner, methods, budget, index=index, nodes=local)
+    return {m: (numer[local], denom[local]) for m, (numer, denom) in arrays.items()}
+
+
+def partitioned_coefficients(core: CSRCore, methods=clustering.METHODS, memory_budget=1 << 30):
+    '''Numerators and denominators of the clustering coefficients, computed range by range.
+
+    Yields (lo, hi, {method: (numer, denom)}) for contiguous ranges of nodes so that the
+    local structures of each range stay within about memory_budget bytes (besides a few
+    arrays over all nodes). The results of a range should be consumed before the next
+    range is requested.
+    '''
+    methods = list(methods)
+    unknown = [m for m in methods if m not in clustering.METHODS]
+    if unknown:
+        msg = f"Error: Unknown methods {unknown}."
+        logger.error(msg)
+        raise ValueError(msg)
+    if memory_budget < MIN_MEMORY_BUDGET:
+        msg = f"Error: The memory budget must be at least {MIN_MEMORY_BUDGET} bytes."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    # 半分を候補の列挙に、残りを局所的な構造に使う
+    budget = int(min(clustering.DEFAULT_BUDGET, memory_budget // 2 // BYTES_PER_PAIR))
+    dense_limit = int(min(clustering.DENSE_LIMIT, memory_budget // 2 // 16))
+    ranges = list(node_ranges(core, memory_budget // 2, budget))
+    logger.info('Computing clustering coefficients in %d node ranges ...', len(ranges))
+    for i, (lo, hi) in enumerate(ranges):
+        logger.debug('Node range %d/%d: [%d, %d)', i + 1, len(ranges), lo, hi)
+        yield lo, hi, range_coefficients(core, lo, hi, methods, budget, dense_limit)
@@ -0,0 +1,189 @@
+'''
+Phase-level profiling of the command line tools.
+
+The library marks its phases with ``with phase('parse'):`` blocks or the ``@timed('compute')``
+decorator. While no Profile is active (the default) they only check a context variable.
+Inside ``Profile.activate()``, each phase records its wall time, CPU time and peak RSS;
+phases nested in a phase of a different name are recorded as ``outer/inner``, phases
+nested in one of the same name are merged into it, and repeated phases of the same name
+are summed (with the number of calls).
+
+The peak RSS of a phase is measured by resetting the high water mark of the process
+(/proc/self/clear_refs, Linux). Where this is not possible, it is the peak of the
+process so far.
+
+The main modules accept ``--profile FILE`` (the JSON record) and ``--profile-dump FILE``
+(a cProfile dump for pstats or snakeviz) through add_arguments and run.
+'''
+import sys
+import json
+import time
+import resource
+import functools
+import contextlib
+import contextvars
+
+import logging
+logger = logging.getLogger(__name__)
+
+PHASES = ['parse', 'index', 'compute', 'output']
+
+_active = contextvars.ContextVar('hypergcc_profile', default=None)
+
+
+def _read_hwm():
+    '''Peak RSS of the process in bytes.'''
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _reset_hwm():
+    '''Reset the peak RSS to the current RSS (returns False if not supported).'''
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class _Frame():
+    def __init__(self, name):
+        self.name = name
+        self.depth = 1
+        self.peak = 0
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+
+class Profile():
+    '''Records of the phases run while the profile is active.'''
+    def __init__(self, **info):
+        self.info = info
+        self.phases = {}
+        self.exact_peaks = True
+        self.total = None
+        self._stack = []
+
+    @contextlib.contextmanager
+    def activate(self):
+        '''Context manager that makes this profile the active one.'''
+        token = _active.set(self)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+            self.total = {
+                'wall': time.perf_counter() - wall,
+                'cpu': time.process_time() - cpu,
+                'peak_rss': max([p['peak_rss'] for p in self.phases.values()] + [_read_hwm()]),
+            }
+
+    def enter(self, name):
+        top = self._stack[-1] if self._stack else None
+        if top is not None and top.name.rsplit('/', 1)[-1] == name:
+            top.depth += 1
+            return
+        if top is not None:
+            top.peak = max(top.peak, _read_hwm())
+            name = f'{top.name}/{name}'
+        if not _reset_hwm():
+            self.exact_peaks = False
+        self._stack.append(_Frame(name))
+
+    def exit(self):
+        frame = self._stack[-1]
+        frame.depth -= 1
+        if frame.depth > 0:
+            return
+        self._stack.pop()
+        frame.peak = max(frame.peak, _read_hwm())
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, frame.peak)
+        record = self.phases.setdefault(frame.name, {'name': frame.name, 'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_rss': 0})
+        record['calls'] += 1
+        record['wall'] += time.perf_counter() - frame.wall
+        record['cpu'] += time.process_time() - frame.cpu
+        record['peak_rss'] = max(record['peak_rss'], frame.peak)
+
+    def record(self) -> dict:
+        '''The JSON record: the info given to the constructor, the phases in the order they ended and the totals.'''
+        return {**self.info, 'phases': list(self.phases.values()), 'total': self.total, 'exact_peaks': self.exact_peaks}
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.record(), f, indent=1)
+
+
+class phase():
+    '''Context manager that records the enclosed block as a phase of the active profile (no-op without one).'''
+    __slots__ = ('name', 'profile')
+
+    def __init__(self, name):
+        self.name = name
+        self.profile = _active.get()
+
+    def __enter__(self):
+        if self.profile is not None:
+            self.profile.enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.exit()
+        return False
+
+
+def timed(name):
+    '''Decorator that records each call of the function as a phase (calls the function directly without a profile).'''
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active.get() is None:
+                return func(*args, **kwargs)
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_arguments(parser):
+    '''Add --profile and --profile-dump to an argparse parser.'''
+    parser.add_argument('--profile', metavar='FILE',
+                        help='write the wall time, CPU time and peak RSS of each phase (parse, index, compute, output) as JSON')
+    parser.add_argument('--profile-dump', metavar='FILE', help='write a cProfile dump of the whole run')
+
+
+def run(main, args, command):
+    '''Call main(args), profiled if args.profile or args.profile_dump is set.'''
+    if args.profile is None and args.profile_dump is None:
+        return main(args)
+
+    profile = Profile(command=command, dataset=getattr(args, 'dataset', None), argv=sys.argv[1:])
+    profiler = None
+    if args.profile_dump is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+    with profile.activate():
+        if profiler is not None:
+            profiler.enable()
+        try:
+            result = main(args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(args.profile_dump)
+    if args.profile is not None:
+        profile.write(args.profile)
+    if not profile.exact_peaks:
+        logger.warning('The peak RSS of the phases is the peak of the process so far (cannot reset it on this system).')
+    return result
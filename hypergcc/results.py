@@ -0,0 +1,334 @@
+'''
+Writers and readers of the per-node result tables of the command line tools.
+
+A table is a list of named columns of the same length (the first one is usually the
+node id), written chunk by chunk with TableWriter in one of the FORMATS:
+
+- tsv: one line per row (optionally with a header). Each chunk is formatted at once
+  and written with a single call, with the same text as print(..., sep='\\t').
+- npy: one structured array whose fields are the columns.
+- npz: one array per column (``<column>.npy``), stored uncompressed.
+
+The binary columns are spooled to temporary files next to the output and the file
+is assembled when the writer is closed, so the writer never holds the whole table.
+
+read_table detects the format from the contents of the file. The columns of the
+npy and npz files are memory-mapped; the numeric tsv files are parsed by np.loadtxt
+(only the selected columns are converted).
+'''
+import io
+import os
+import sys
+import uuid
+import shutil
+import struct
+import zipfile
+import pathlib
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+FORMATS = ['tsv', 'npy', 'npz']
+BLOCK_ROWS = 1 << 20
+
+_NPY_MAGIC = b'\x93NUMPY'
+_ZIP_MAGIC = b'PK\x03\x04'
+
+
+def _write_npy_header(f, dtype, rows):
+    header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)}
+    np.lib.format.write_array_header_2_0(f, header)
+
+
+class TableWriter():
+    '''Write a table chunk by chunk to path (stdout if path is None or "-", tsv only).
+
+    The dtype of a binary column is that of its first chunk. With header=False, the
+    tsv output has no header line (the binary formats always keep the names).
+    '''
+    def __init__(self, path, columns, fmt='tsv', header=True):
+        if fmt not in FORMATS:
+            msg = f"Error: Unknown output format {fmt} (choose from {', '.join(FORMATS)})."
+            logger.error(msg)
+            raise ValueError(msg)
+        to_stdout = path is None or str(path) == '-'
+        if to_stdout and fmt != 'tsv':
+            msg = f"Error: The {fmt} format cannot be written to stdout."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        self.columns = list(columns)
+        self.fmt = fmt
+        self.rows = 0
+        self.path = None if to_stdout else pathlib.Path(path)
+        self._dtypes = [None] * len(self.columns)
+        self._spools = []
+
+        if fmt == 'tsv':
+            self._f = sys.stdout if to_stdout else open(self.path, 'w')
+            if header:
+                self._f.write('\t'.join(self.columns) + '\n')
+        else:
+            prefix = self.path.parent / f'.{self.path.name}.{uuid.uuid4().hex}'
+            self._spools = [pathlib.Path(f'{prefix}.{i}') for i in range(len(self.columns))]
+            self._f = [open(p, 'wb') for p in self._spools]
+
+    def write(self, *columns):
+        '''Append a chunk: one sequence (list or array) per column, all of the same length.'''
+        if len(columns) != len(self.columns):
+            msg = f"Error: {len(columns)} columns were given to a table of {len(self.columns)} columns."
+            logger.error(msg)
+            raise ValueError(msg)
+        if self.fmt == 'tsv':
+            self._write_tsv(columns)
+        else:
+            self._write_binary(columns)
+
+    def _write_tsv(self, columns):
+        columns = [c.tolist() if isinstance(c, np.ndarray) else c for c in columns]
+        lines = map('\t'.join, zip(*(map(str, c) for c in columns)))
+        text = '\n'.join(lines)
+        if text:
+            self._f.write(text + '\n')
+            self.rows += text.count('\n') + 1
+
+    def _write_binary(self, columns):
+        arrays = [np.asarray(c) for c in columns]
+        rows = len(arrays[0])
+        for i, (a, f) in enumerate(zip(arrays, self._f)):
+            if len(a) != rows:
+                msg = "Error: The columns of a chunk have different lengths."
+                logger.error(msg)
+                raise ValueError(msg)
+            if self._dtypes[i] is None:
+                self._dtypes[i] = a.dtype
+            np.ascontiguousarray(a, dtype=self._dtypes[i]).tofile(f)
+        self.rows += rows
+
+    def close(self):
+        if self.fmt == 'tsv':
+            if self._f is sys.stdout:
+                self._f.flush()
+            else:
+                self._f.close()
+            return
+        for f in self._f:
+            f.close()
+        try:
+            dtypes = [d if d is not None else np.dtype(np.float64) for d in self._dtypes]
+            tmp = self.path.parent / f'.{self.path.name}.{uuid.uuid4().hex}'
+            try:
+                if self.fmt == 'npy':
+                    self._assemble_npy(tmp, dtypes)
+                else:
+                    self._assemble_npz(tmp, dtypes)
+                os.replace(tmp, self.path)
+            finally:
+                tmp.unlink(missing_ok=True)
+        finally:
+            self._remove_spools()
+
+    def _spooled(self, i, dtype):
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._spools[i], dtype=dtype, mode='r', shape=(self.rows,))
+
+    def _assemble_npy(self, tmp, dtypes):
+        dtype = np.dtype(list(zip(self.columns, dtypes)))
+        columns = [self._spooled(i, d) for i, d in enumerate(dtypes)]
+        with open(tmp, 'wb') as f:
+            _write_npy_header(f, dtype, self.rows)
+            for start in range(0, self.rows, BLOCK_ROWS):
+                stop = min(start + BLOCK_ROWS, self.rows)
+                block = np.empty(stop - start, dtype=dtype)
+                for name, column in zip(self.columns, columns):
+                    block[name] = column[start:stop]
+                block.tofile(f)
+
+    def _assemble_npz(self, tmp, dtypes):
+        with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as z:
+            for name, spool, dtype in zip(self.columns, self._spools, dtypes):
+                with z.open(f'{name}.npy', 'w', force_zip64=True) as out, open(spool, 'rb') as f:
+                    _write_npy_header(out, dtype, self.rows)
+                    shutil.copyfileobj(f, out, 1 << 20)
+
+    def _remove_spools(self):
+        for p in self._spools:
+            p.unlink(missing_ok=True)
+
+    def abort(self):
+        '''Close the writer without assembling the binary file.'''
+        if self.fmt == 'tsv':
+            self.close()
+            return
+        for f in self._f:
+            f.close()
+        self._remove_spools()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def write_table(path, columns: dict, fmt='tsv', header=True):
+    '''Write a whole table given as a dict column name -> values.'''
+    with TableWriter(path, columns.keys(), fmt=fmt, header=header) as w:
+        w.write(*columns.values())
+
+
+def detect_format(path) -> str:
+    '''Format of a table file from its first bytes (tsv unless it starts as an npy or zip file).'''
+    if str(path) == '-':
+        return 'tsv'
+    with open(path, 'rb') as f:
+        magic = f.read(len(_NPY_MAGIC))
+    if magic.startswith(_NPY_MAGIC):
+        return 'npy'
+    if magic.startswith(_ZIP_MAGIC):
+        return 'npz'
+    return 'tsv'
+
+
+def read_table(path, header=True, columns=None) -> dict:
+    '''Read a table written by TableWriter (or a tsv printed by the tools) as a dict column name -> array.
+
+    The columns of npy and npz files are memory-mapped. A tsv without a header
+    (header=False) has the columns '0', '1', ... columns selects the columns to read
+    (all by default); on a tsv, the other columns are not converted.
+    '''
+    match detect_format(path):
+        case 'npy':
+            array = np.load(path, mmap_mode='r')
+            if array.dtype.names is None:
+                msg = f"Error: {path} is not a table (the array has no fields)."
+                logger.error(msg)
+                raise ValueError(msg)
+            table = {name: array[name] for name in array.dtype.names}
+        case 'npz':
+            table = _read_npz(path)
+        case _:
+            return _read_tsv(path, header, columns)
+    return _select(table, columns)
+
+
+def _select(table, columns):
+    if columns is None:
+        return table
+    missing = [c for c in columns if c not in table]
+    if missing:
+        msg = f"Error: Columns {missing} are not in the table (columns: {list(table)})."
+        logger.error(msg)
+        raise KeyError(msg)
+    return {c: table[c] for c in columns}
+
+
+def _read_npz(path) -> dict:
+    columns = {}
+    with zipfile.ZipFile(path) as z, open(path, 'rb') as f:
+        for info in z.infolist():
+            name = info.filename.removesuffix('.npy')
+            if info.compress_type != zipfile.ZIP_STORED:
+                # 圧縮されたメンバーはメモリマップできないので読み込む
+                with z.open(info) as member:
+                    columns[name] = np.lib.format.read_array(member)
+                continue
+            # local file header (30 bytes + file name + extra field) の後ろが .npy の中身
+            f.seek(info.header_offset)
+            local = f.read(30)
+            name_len, extra_len = struct.unpack('<HH', local[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if np.prod(shape) == 0:
+                columns[name] = np.empty(shape, dtype=dtype)
+                continue
+            columns[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                      order='F' if fortran_order else 'C')
+    return columns
+
+
+def _is_int(token):
+    return token.lstrip('-').isdigit()
+
+
+def _is_float(token):
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def _read_tsv(path, header, columns) -> dict:
+    if str(path) == '-':
+        source = io.StringIO(sys.stdin.read())
+        head = source.readline(), source.readline()
+        source.seek(0)
+    else:
+        source = path
+        with open(path, 'r') as f:
+            head = f.readline(), f.readline()
+
+    first = head[1] if header else head[0]
+    first = first.rstrip('\r\n').split('\t') if first.strip() else []
+    if header:
+        names = head[0].rstrip('\r\n').split('\t')
+    else:
+        names = [str(i) for i in range(len(first))]
+    if columns is None:
+        columns = names
+    _select(dict.fromkeys(names), columns)
+    usecols = [names.index(c) for c in columns]
+    if not first:
+        return {c: np.empty(0) for c in columns}
+
+    # 1行目から列の型を決める (最初の列は整数なら int64, それ以外の列は float64)
+    if len(first) == len(names) and all(_is_float(first[i]) for i in usecols):
+        dtype = np.dtype([(c, np.int64 if i == 0 and _is_int(first[0]) else np.float64) for c, i in zip(columns, usecols)])
+        try:
+            array = np.loadtxt(source, delimiter='\t', skiprows=int(header), usecols=usecols, dtype=dtype, ndmin=1)
+            return {c: array[c] for c in columns}
+        except ValueError:
+            if isinstance(source, io.StringIO):
+                source.seek(0)
+
+    # 文字列の列がある (または型が行によって違う) ときは1行ずつ分割する
+    with (open(source, 'r') if isinstance(source, (str, os.PathLike)) else source) as f:
+        if header:
+            f.readline()
+        rows = [line.rstrip('\r\n').split('\t') for line in f if line.strip()]
+    if any(len(row) != len(names) for row in rows):
+        msg = "Error: The rows of the table have different numbers of columns."
+        logger.error(msg)
+        raise ValueError(msg)
+    table = {}
+    for c, i in zip(columns, usecols):
+        values = [row[i] for row in rows]
+        for dtype in (np.int64, np.float64):
+            try:
+                table[c] = np.array(values, dtype=dtype)
+                break
+            except ValueError:
+                pass
+        else:
+            table[c] = np.array(values)
+    return table
+
+
+def add_arguments(parser, output=True):
+    '''Add --output-format (and --output, the file of the per-node table) to an argparse parser.'''
+    parser.add_argument('--output-format', choices=FORMATS, default='tsv',
+                        help='format of the written tables: tsv, or npy/npz (memory-mapped by hypergcc.results.read_table; needs a file)')
+    if output:
+        parser.add_argument('-o', '--output', help='write the per-node table to this file instead of stdout')
@@ -0,0 +1,176 @@
+'''
+Sampling estimates of the mean clustering coefficients.
+
+The mean of the local clustering coefficients over a set of nodes (all nodes
+by default, as calc_cc averages them) is estimated by drawing nodes uniformly
+at random and, for each drawn node v, one random variable X in [0, 1] with
+E[X] = c(v) (X = 0 if the coefficient of v is 0 by definition):
+
+- opsahl: a uniform (e1, e2, v1, v2) tuple of the denominator; X = 1 if it is closed.
+- zhou: a uniform pair of hyperedges of v; X = its contribution to the numerator.
+- proposed: neighbors v1 != v2 drawn with probability proportional to W(v, v1) W(v, v2);
+  X = W(v1, v2).
+- simple: two distinct neighbors in the projected graph; X = 1 if they are adjacent.
+
+By Hoeffding's inequality, the mean of m = ln(2 / delta) / (2 eps^2) samples is
+within eps of the exact mean with probability at least 1 - delta. Each sample
+costs O(log deg) (zhou: O(|e1| |e2|)) after the tables of hypergcc.clustering
+are built, independently of the size of the largest hub.
+'''
+from typing import NamedTuple
+
+import numpy as np
+
+from hypergcc import clustering
+from hypergcc.core import CSRCore
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Estimate(NamedTuple):
+    mean: float
+    low: float  # confidence interval with level 1 - delta
+    high: float
+    samples: int
+
+
+def sample_size(eps, delta) -> int:
+    '''Number of samples of [0, 1] variables whose mean is within eps of the expectation with probability 1 - delta.'''
+    if not (0 < eps < 1 and 0 < delta < 1):
+        msg = "Error: eps and delta must be in (0, 1)."
+        logger.error(msg)
+        raise ValueError(msg)
+    return int(np.ceil(np.log(2 / delta) / (2 * eps * eps)))
+
+
+def _segment_pairs(ptr, w, seg, rng):
+    '''Draw ordered pairs of distinct positions (i, j) within rows seg of a CSR structure with probability proportional to w_i w_j.
+
+    ptr are the row offsets and w the positive weights of the positions. Every row in seg
+    needs at least two positions.
+    '''
+    # 1つ目は w_i (S - w_i) に比例、2つ目は i を除いて w_j に比例して選ぶ
+    owner = np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+    cw = np.zeros(len(w) + 1)
+    np.cumsum(w, out=cw[1:])
+    S = cw[ptr[1:]] - cw[ptr[:-1]]
+    cq = np.zeros(len(w) + 1)
+    np.cumsum(w * (S[owner] - w), out=cq[1:])
+
+    lo, hi = ptr[seg], ptr[seg + 1] - 1
+    i = np.empty(len(seg), dtype=np.int64)
+    j = np.empty(len(seg), dtype=np.int64)
+    todo = np.arange(len(seg))
+    while len(todo) > 0:
+        s, l, h = seg[todo], lo[todo], hi[todo]
+        u = cq[l] + rng.random(len(todo)) * (cq[h + 1] - cq[l])
+        a = np.clip(np.searchsorted(cq, u, side='right') - 1, l, h)
+        u = cw[l] + rng.random(len(todo)) * (S[s] - w[a])
+        u = np.where(u >= cw[a], u + w[a], u)
+        b = np.clip(np.searchsorted(cw, u, side='right') - 1, l, h)
+        i[todo], j[todo] = a, b
+        todo = todo[a == b]  # only by rounding
+    return i, j
+
+
+def _other_member(core: CSRCore, e, v, rng):
+    '''A uniform member of each hyperedge e other than v (v must be a member of e).'''
+    start = core.indptr[e]
+    size = core.indptr[e + 1] - start
+    pos = start + (rng.random(len(e)) * (size - 1)).astype(np.int64)
+    member = core.indices[pos]
+    # v の代わりに最後の要素を使う
+    return np.where(member == v, core.indices[start + size - 1], member)
+
+
+def _opsahl_samples(core: CSRCore, v, rng):
+    n = core.num_nodes
+    index = clustering.pair_index(core)
+    inc = clustering.incidence_keys(core)
+    eligible = clustering.opsahl_denominators(core, index) > 0
+
+    x = np.zeros(len(v))
+    todo = np.flatnonzero(eligible[v])
+    w = (core.hyperedge_sizes() - 1)[core.node_indices].astype(np.float64)
+    e1 = np.empty(len(v), dtype=np.int64)
+    e2 = np.empty(len(v), dtype=np.int64)
+    v1 = np.empty(len(v), dtype=np.int64)
+    v2 = np.empty(len(v), dtype=np.int64)
+    while len(todo) > 0:
+        # (e1, v1, e2, v2) is uniform among the ordered tuples with e1 != e2; v1 = v2 is redrawn
+        i, j = _segment_pairs(core.node_indptr, w, v[todo], rng)
+        e1[todo], e2[todo] = core.node_indices[i], core.node_indices[j]
+        v1[todo] = _other_member(core, e1[todo], v[todo], rng)
+        v2[todo] = _other_member(core, e2[todo], v[todo], rng)
+        todo = todo[v1[todo] == v2[todo]]
+
+    sel = eligible[v]
+    a, b, f, g = v1[sel], v2[sel], e1[sel], e2[sel]
+    shared = index.get(a * n + b)
+    shared = shared - inc.contains(f * n + b) - inc.contains(g * n + a)
+    x[sel] = shared > 0
+    return x
+
+
+def _zhou_samples(core: CSRCore, v, rng):
+    x = np.zeros(len(v))
+    sel = np.flatnonzero(core.node_degrees()[v] >= 2)
+    if len(sel) == 0:
+        return x
+
+    i, j = _segment_pairs(core.node_indptr, np.ones(core.num_pins), v[sel], rng)
+    x[sel] = clustering.zhou_contributions(core, core.node_indices[i], core.node_indices[j])
+    return x
+
+
+def _projected_samples(core: CSRCore, v, rng, weighted):
+    n = core.num_nodes
+    index = clustering.pair_index(core)
+    weights = 1.0 / (index.min_size - 1) if weighted else np.ones(len(index))
+
+    x = np.zeros(len(v))
+    sel = np.flatnonzero(np.diff(index.indptr)[v] >= 2)
+    if len(sel) == 0:
+        return x
+    i, j = _segment_pairs(index.indptr, weights, v[sel], rng)
+    pos = index.find(index.indices[i].astype(np.int64) * n + index.indices[j])
+    x[sel] = np.where(pos >= 0, weights[pos], 0.0)
+    return x
+
+
+def estimate_mean(core: CSRCore, method, eps=0.01, delta=0.05, seed=None, nodes=None) -> Estimate:
+    '''Estimate the mean clustering coefficient of method over nodes (remapped ids; all nodes if None).
+
+    The estimate is within eps of the exact mean with probability at least 1 - delta.
+    opsahl and zhou assume that no hyperedge contains the same node twice.
+    '''
+    m = sample_size(eps, delta)
+    rng = np.random.default_rng(seed)
+    if nodes is None:
+        if core.num_nodes == 0:
+            return Estimate(0.0, 0.0, 0.0, 0)
+        v = rng.integers(core.num_nodes, size=m)
+    else:
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if len(nodes) == 0:
+            return Estimate(0.0, 0.0, 0.0, 0)
+        v = nodes[rng.integers(len(nodes), size=m)]
+
+    match method:
+        case 'opsahl':
+            x = _opsahl_samples(core, v, rng)
+        case 'zhou':
+            x = _zhou_samples(core, v, rng)
+        case 'proposed':
+            x = _projected_samples(core, v, rng, weighted=True)
+        case 'simple':
+            x = _projected_samples(core, v, rng, weighted=False)
+        case _:
+            msg = f"Error: Unknown method {method}."
+            logger.error(msg)
+            raise ValueError(msg)
+
+    mean = float(x.mean())
+    half = float(np.sqrt(np.log(2 / delta) / (2 * m)))
+    return Estimate(mean, max(mean - half, 0.0), min(mean + half, 1.0), m)
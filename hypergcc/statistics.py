@@ -0,0 +1,312 @@
+'''
+Vectorized statistics of hypergraphs on the arrays of a CSRCore.
+
+joint_degree_matrix counts, for each pair of node degrees (k, k'), the pairs of
+members of the same hyperedge with these degrees. With C the |E| x K matrix whose
+entry (e, c) is the number of members of e in the degree class c, the counts of
+the ordered pairs of distinct positions are C^T C - diag(sum_e C[e]), so the pairs
+are never enumerated.
+
+node_features computes per-node columns (degree, number of neighbors, sizes of the
+incident hyperedges, ...) from the incidence arrays and the cached
+hypergcc.clustering.PairIndex, with a few array operations per column.
+
+dataset_statistics reads the ScHoLP files (nverts and hyperedges) in chunks without
+building the hypergraph: it counts the occurrences of the nodes (memory proportional
+to |V|), the histogram of the hyperedge sizes and a 64-bit hash of each hyperedge
+(8 bytes per hyperedge) from which the duplicate hyperedges are counted.
+'''
+import warnings
+
+import numpy as np
+import scipy.sparse as sp
+
+from hypergcc import clustering, profiling
+from hypergcc.core import CSRCore
+
+import logging
+logger = logging.getLogger(__name__)
+
+# calc_degrees の列
+NODE_FEATURES = ['degree', 'neighbors', 'avg_size']
+# 追加で計算できる列 (neighbors_by_size は size_buckets に応じて複数の列になる)
+OPTIONAL_NODE_FEATURES = ['min_size', 'max_size', 'neighbors_by_size']
+
+
+def degree_classes(core: CSRCore):
+    '''The distinct node degrees (sorted) and the class of each node (index into them).'''
+    degrees, classes = np.unique(core.node_degrees(), return_inverse=True)
+    return degrees, classes.reshape(-1)
+
+
+@profiling.timed('compute')
+def joint_degree_matrix(core: CSRCore, sparse=False):
+    '''Joint degree matrix of the nodes sharing hyperedges, as (degrees, M).
+
+    M[a, b] is the number of pairs of members of the same hyperedge whose degrees are
+    degrees[a] and degrees[b], counted in both orders (so M is symmetric and a pair of
+    members with the same degree adds 2 to the diagonal), the same as the dict of dicts of
+    HyperGraph.num_jnt_node_deg. M is a dense int64 array, or scipy.sparse CSR if sparse.
+    '''
+    degrees, classes = degree_classes(core)
+    K = len(degrees)
+    C = sp.csr_matrix((np.ones(core.num_pins, dtype=np.int64), classes[core.indices], core.indptr),
+                      shape=(core.num_hyperedges, K))
+    C.sum_duplicates()
+    M = (C.T @ C).tocsr() - sp.diags(np.asarray(C.sum(axis=0)).reshape(-1), format='csr', shape=(K, K), dtype=np.int64)
+    M.eliminate_zeros()
+    M.sort_indices()
+    if sparse:
+        return degrees, M
+    return degrees, M.toarray()
+
+
+def _reduce_rows(ufunc, values, indptr, empty):
+    '''ufunc.reduceat of each row of a CSR structure over values (empty for the empty rows).'''
+    counts = np.diff(indptr)
+    out = np.full(len(counts), empty, dtype=values.dtype)
+    nonempty = counts > 0
+    if np.any(nonempty):
+        out[nonempty] = ufunc.reduceat(values, indptr[:-1][nonempty])
+    return out
+
+
+def neighbors_by_size(core: CSRCore, size_buckets=5, index=None):
+    '''Number of neighbors of each node by the smallest size of a hyperedge they share, as a dictionary column -> array.
+
+    The columns neighbors_size2, ..., neighbors_size{size_buckets - 1} and
+    neighbors_size{size_buckets}+ partition the neighbors, so they sum to the number of neighbors.'''
+    if size_buckets < 2:
+        msg = f"Error: size_buckets must be at least 2 (given {size_buckets})."
+        logger.error(msg)
+        raise ValueError(msg)
+    if index is None:
+        index = clustering.pair_index(core)
+    n = core.num_nodes
+    buckets = size_buckets - 1
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(index.indptr))
+    bucket = np.clip(index.min_size, 2, size_buckets) - 2
+    counts = np.bincount(rows * buckets + bucket, minlength=n * buckets).reshape(n, buckets)
+    names = [f'neighbors_size{s}' for s in range(2, size_buckets)] + [f'neighbors_size{size_buckets}+']
+    return {name: counts[:, i] for i, name in enumerate(names)}
+
+
+@profiling.timed('compute')
+def node_features(core: CSRCore, features=NODE_FEATURES, size_buckets=5, index=None):
+    '''Per-node features as a dictionary column -> array aligned with core.node_ids.
+
+    - degree: number of hyperedges of the node (with multiplicity, as len(elist[v]))
+    - neighbors: number of distinct nodes sharing a hyperedge with the node
+    - avg_size, min_size, max_size: mean, smallest and largest size of the incident hyperedges
+      (nan, 0 and 0 for a node without hyperedges)
+    - neighbors_by_size: the columns of neighbors_by_size
+    '''
+    unknown = [f for f in features if f not in NODE_FEATURES + OPTIONAL_NODE_FEATURES]
+    if unknown:
+        msg = f"Error: Unknown node features {unknown}."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    deg = core.node_degrees()
+    # 各ノードが属するハイパーエッジのサイズ (ノードごとに並んだ pin の順)
+    pin_sizes = core.hyperedge_sizes()[core.node_indices]
+    out = {}
+    for f in features:
+        match f:
+            case 'degree':
+                out[f] = deg
+            case 'neighbors':
+                if index is None:
+                    index = clustering.pair_index(core)
+                out[f] = np.diff(index.indptr)
+            case 'avg_size':
+                owner = np.repeat(np.arange(core.num_nodes), deg)
+                total = np.bincount(owner, weights=pin_sizes, minlength=core.num_nodes)
+                out[f] = np.divide(total, deg, out=np.full(core.num_nodes, np.nan), where=deg > 0)
+            case 'min_size':
+                out[f] = _reduce_rows(np.minimum, pin_sizes, core.node_indptr, 0)
+            case 'max_size':
+                out[f] = _reduce_rows(np.maximum, pin_sizes, core.node_indptr, 0)
+            case 'neighbors_by_size':
+                if index is None:
+                    index = clustering.pair_index(core)
+                out.update(neighbors_by_size(core, size_buckets, index))
+    return out
+
+
+# ノード id がこれ以下なら出現回数を id で直接数える (それ以外は整列した id と回数を併合する)
+DENSE_ID_LIMIT = 1 << 26
+CHUNK_BYTES = 1 << 24
+
+
+def _read_int_chunks(path, chunk_bytes=CHUNK_BYTES):
+    '''Integers of a text file with one integer per line, as int64 arrays of chunks of about chunk_bytes.'''
+    rest = b''
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = rest + block
+            cut = block.rfind(b'\n') + 1
+            block, rest = block[:cut], block[cut:]
+            if block:
+                yield _parse_ints(block, path)
+    if rest.strip():
+        yield _parse_ints(rest, path)
+
+
+def _parse_ints(block, path):
+    with warnings.catch_warnings():
+        # np.fromstring は読めない文字があると警告を出してそこで止まる
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            return np.fromstring(block, dtype=np.int64, sep=' ')
+        except DeprecationWarning:
+            msg = f"Error: {path} contains a line that is not an integer."
+            logger.error(msg)
+            raise ValueError(msg)
+
+
+class _IntStream():
+    '''Take the integers of a file n at a time, across the chunks.'''
+    def __init__(self, path, chunk_bytes=CHUNK_BYTES):
+        self._chunks = _read_int_chunks(path, chunk_bytes)
+        self._buffer = np.empty(0, dtype=np.int64)
+
+    def take(self, n):
+        parts = [self._buffer]
+        have = len(self._buffer)
+        while have < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            parts.append(chunk)
+            have += len(chunk)
+        buffer = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        self._buffer = buffer[n:]
+        return buffer[:n]
+
+
+class _NodeCounter():
+    '''Number of occurrences of each node id, dense while the ids are in [0, dense_limit).'''
+    def __init__(self, dense_limit=DENSE_ID_LIMIT):
+        self.dense_limit = dense_limit
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.ids = None  # 疎なときの整列した id
+
+    def add(self, pins):
+        if len(pins) == 0:
+            return
+        if self.ids is None and (pins.min() < 0 or pins.max() >= self.dense_limit):
+            self.ids = np.flatnonzero(self.counts)
+            self.counts = self.counts[self.ids]
+        if self.ids is None:
+            counts = np.bincount(pins, minlength=len(self.counts))
+            counts[:len(self.counts)] += self.counts
+            self.counts = counts
+        else:
+            ids, counts = np.unique(pins, return_counts=True)
+            merged = np.union1d(self.ids, ids)
+            total = np.zeros(len(merged), dtype=np.int64)
+            total[np.searchsorted(merged, self.ids)] += self.counts
+            total[np.searchsorted(merged, ids)] += counts
+            self.ids, self.counts = merged, total
+
+    def degrees(self):
+        '''Degree of each node that occurs at least once.'''
+        if self.ids is None:
+            return self.counts[self.counts > 0]
+        return self.counts
+
+
+def _splitmix64(x):
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def hyperedge_hashes(sizes, pins):
+    '''64-bit hash of the members of each hyperedge, independent of their order (equal hyperedges have equal hashes).'''
+    sizes = np.asarray(sizes, dtype=np.int64)
+    owner = np.repeat(np.arange(len(sizes)), sizes)
+    order = np.lexsort((pins, owner))
+    starts = np.zeros(len(sizes), dtype=np.int64)
+    np.cumsum(sizes[:-1], out=starts[1:])
+    position = np.arange(len(pins), dtype=np.int64) - starts[owner]
+    with np.errstate(over='ignore'):
+        mixed = _splitmix64(pins[order].astype(np.uint64) ^ _splitmix64(position.astype(np.uint64)))
+        h = np.zeros(len(sizes), dtype=np.uint64)
+        nonempty = sizes > 0
+        if np.any(nonempty):
+            h[nonempty] = np.add.reduceat(mixed, starts[nonempty])
+        return _splitmix64(h ^ sizes.astype(np.uint64))
+
+
+class DatasetStatistics():
+    '''Statistics of a dataset gathered by dataset_statistics.'''
+    def __init__(self, num_nodes, num_hyperedges, num_pins, size_histogram, degree_histogram, num_duplicates):
+        self.num_nodes = num_nodes
+        self.num_hyperedges = num_hyperedges
+        self.num_pins = num_pins
+        self.size_histogram = size_histogram  # size_histogram[s]: ハイパーエッジのサイズが s の数
+        self.degree_histogram = degree_histogram  # degree_histogram[k]: 次数が k のノードの数
+        self.num_duplicates = num_duplicates
+
+    @property
+    def avg_degree(self) -> float:
+        return self.num_pins / self.num_nodes if self.num_nodes > 0 else float('nan')
+
+    @property
+    def avg_size(self) -> float:
+        return self.num_pins / self.num_hyperedges if self.num_hyperedges > 0 else float('nan')
+
+    @property
+    def duplicate_rate(self) -> float:
+        '''Fraction of the hyperedges whose members are the same as those of an earlier hyperedge.'''
+        return self.num_duplicates / self.num_hyperedges if self.num_hyperedges > 0 else float('nan')
+
+
+@profiling.timed('compute')
+def dataset_statistics(f_nverts_path, f_hyperedges_path, chunk_bytes=CHUNK_BYTES, duplicates=True) -> DatasetStatistics:
+    '''Statistics of a dataset in the ScHoLP format, read in chunks without building the hypergraph.
+
+    The numbers agree with those of the HyperGraph read by read_hypergraph (the sizes and the
+    degrees count a node repeated in a hyperedge each time). The duplicates are counted
+    from 64-bit hashes of the hyperedges (see hyperedge_hashes) unless duplicates=False.
+    '''
+    nodes = _NodeCounter()
+    pins = _IntStream(f_hyperedges_path, chunk_bytes)
+    size_histogram = np.zeros(0, dtype=np.int64)
+    hashes = []
+    num_hyperedges = 0
+    num_pins = 0
+
+    for sizes in _read_int_chunks(f_nverts_path, chunk_bytes):
+        if np.any(sizes < 0):
+            msg = "Error: The nverts file contains a negative size."
+            logger.error(msg)
+            raise ValueError(msg)
+        total = int(sizes.sum())
+        chunk = pins.take(total)
+        if len(chunk) < total:
+            msg = "Error: The number of nodes in the hyperedges file is smaller than the sum of nverts."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        nodes.add(chunk)
+        histogram = np.bincount(sizes, minlength=len(size_histogram))
+        histogram[:len(size_histogram)] += size_histogram
+        size_histogram = histogram
+        if duplicates:
+            hashes.append(hyperedge_hashes(sizes, chunk))
+        num_hyperedges += len(sizes)
+        num_pins += total
+
+    num_duplicates = None
+    if duplicates:
+        hashes = np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)
+        num_duplicates = len(hashes) - len(np.unique(hashes))
+    degrees = nodes.degrees()
+    return DatasetStatistics(len(degrees), num_hyperedges, num_pins, size_histogram, np.bincount(degrees), num_duplicates)
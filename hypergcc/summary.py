@@ -0,0 +1,135 @@
+'''
+Running summaries of per-node clustering coefficients.
+
+RunningSummary accumulates chunks of per-node values (and optionally their
+numerators, denominators and weights) without keeping them:
+
+- mean and weighted mean of the values,
+- ratio of sums, sum(numer) / sum(denom) (the global, transitivity-style coefficient),
+- minimum, maximum and a histogram with fixed bins on [0, 1],
+- quantiles read from a fine histogram (error at most 1 / QUANTILE_BINS; the
+  values 0 and 1, which are common, are counted exactly).
+
+Summaries of disjoint chunks can be merged, so they also work on node ranges
+processed separately.
+'''
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+QUANTILE_BINS = 4096
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+class RunningSummary():
+    def __init__(self, bins=10):
+        self.bins = bins
+        self.count = 0
+        self.total = 0.0
+        self.weight = 0.0
+        self.weighted_total = 0.0
+        self.numer = 0.0
+        self.denom = 0.0
+        self.has_ratio = True
+        self.min = np.inf
+        self.max = -np.inf
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self._fine = np.zeros(QUANTILE_BINS, dtype=np.int64)
+        self._zeros = 0
+        self._ones = 0
+
+    def update(self, values, numer=None, denom=None, weights=None):
+        '''Add a chunk of per-node values (values outside [0, 1] are clipped in the histograms).'''
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            self.weight += float(weights.sum())
+            self.weighted_total += float(weights @ values)
+
+        if numer is None or denom is None:
+            self.has_ratio = False
+        else:
+            self.numer += float(np.sum(numer, dtype=np.float64))
+            self.denom += float(np.sum(denom, dtype=np.float64))
+
+        self.histogram += self._bin_counts(values, self.bins)
+        zeros = values <= 0
+        ones = values >= 1
+        self._zeros += int(zeros.sum())
+        self._ones += int(ones.sum())
+        self._fine += self._bin_counts(values[~(zeros | ones)], QUANTILE_BINS)
+
+    @staticmethod
+    def _bin_counts(values, bins):
+        # 1.0 は最後のビンに入れる
+        idx = np.clip((values * bins).astype(np.int64), 0, bins - 1)
+        return np.bincount(idx, minlength=bins)
+
+    def merge(self, other: 'RunningSummary'):
+        '''Add the chunks accumulated by another summary with the same bins.'''
+        if other.bins != self.bins:
+            msg = "Error: Summaries with different bins cannot be merged."
+            logger.error(msg)
+            raise ValueError(msg)
+        self.count += other.count
+        self.total += other.total
+        self.weight += other.weight
+        self.weighted_total += other.weighted_total
+        self.numer += other.numer
+        self.denom += other.denom
+        self.has_ratio = self.has_ratio and other.has_ratio
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram += other.histogram
+        self._fine += other._fine
+        self._zeros += other._zeros
+        self._ones += other._ones
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else float('nan')
+
+    @property
+    def weighted_mean(self) -> float:
+        return self.weighted_total / self.weight if self.weight > 0 else float('nan')
+
+    @property
+    def ratio(self) -> float:
+        return self.numer / self.denom if self.has_ratio and self.denom > 0 else float('nan')
+
+    def quantile(self, q) -> float:
+        '''Approximate q-quantile (the midpoint of the fine bin that contains it, within [min, max]).'''
+        if self.count == 0:
+            return float('nan')
+        rank = q * self.count
+        if rank <= self._zeros:
+            return float(min(max(0.0, self.min), self.max))
+        if rank > self.count - self._ones:
+            return float(min(max(1.0, self.min), self.max))
+        cum = np.cumsum(self._fine) + self._zeros
+        i = min(int(np.searchsorted(cum, rank, side='left')), QUANTILE_BINS - 1)
+        value = (i + 0.5) / QUANTILE_BINS
+        return float(min(max(value, self.min), self.max))
+
+    def row(self) -> dict:
+        '''Summary values as a dictionary (in the column order of the summary tables).'''
+        out = {
+            'nodes': self.count,
+            'mean': self.mean,
+            'weighted_mean': self.weighted_mean,
+            'ratio': self.ratio,
+            'min': self.min if self.count > 0 else float('nan'),
+        }
+        for q in QUANTILES:
+            out[f'q{round(q * 100)}'] = self.quantile(q)
+        out['max'] = self.max if self.count > 0 else float('nan')
+        out['histogram'] = ','.join(map(str, self.histogram.tolist()))
+        return out
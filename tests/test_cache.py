@@ -0,0 +1,106 @@
+'''
+Invalidation of the hypergraph cache (hypergcc.cache).
+'''
+import os
+import json
+
+import pytest
+
+from hypergcc import cache
+from hypergcc.hypergraph import HyperGraph
+
+
+def write_scholp(datadir, name, E):
+    (datadir / f'{name}_nverts.txt').write_text(''.join(f'{len(e)}\n' for e in E))
+    (datadir / f'{name}_hyperedges.txt').write_text(''.join(f'{v}\n' for e in E for v in e))
+    return datadir / f'{name}_nverts.txt', datadir / f'{name}_hyperedges.txt'
+
+
+@pytest.fixture
+def reads(tmp_path, monkeypatch):
+    '''Cache directory under tmp_path; the list of the text files parsed so far.'''
+    monkeypatch.setenv('HYPERGCC_CACHE_DIR', str(tmp_path / 'cache'))
+    parsed = []
+
+    def read_arrays(f_nverts_path, f_hyperedges_path):
+        parsed.append(f_hyperedges_path)
+        return read_hypergraph_arrays(f_nverts_path, f_hyperedges_path)
+
+    read_hypergraph_arrays = cache.read_hypergraph_arrays
+    monkeypatch.setattr(cache, 'read_hypergraph_arrays', read_arrays)
+    return parsed
+
+
+def entry_of(paths):
+    return cache._entry_dir(cache.cache_dir(), list(paths))
+
+
+def test_hit(tmp_path, reads):
+    E = [[1, 2, 3], [3, 4], [5, 1, 4, 2]]
+    paths = write_scholp(tmp_path, 'h', E)
+    assert cache.read_hypergraph_cached(*paths).to_lists()[1] == E
+    assert cache.read_hypergraph_cached(*paths).to_lists()[1] == E
+    assert len(reads) == 1
+    assert entry_of(paths).parent.parent == tmp_path / 'cache'
+
+
+def test_touched_with_same_content(tmp_path, reads):
+    E = [[1, 2, 3], [3, 4]]
+    paths = write_scholp(tmp_path, 'h', E)
+    cache.read_hypergraph_cached(*paths)
+    st = os.stat(paths[1])
+    os.utime(paths[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    assert cache.read_hypergraph_cached(*paths).to_lists()[1] == E
+    assert len(reads) == 1
+    # 新しい更新時刻は manifest に記録される
+    manifest = json.loads((entry_of(paths) / 'manifest.json').read_text())
+    assert manifest['sources'][1]['mtime_ns'] == st.st_mtime_ns + 10 ** 9
+
+
+@pytest.mark.parametrize('same_size', [True, False])
+def test_changed_content(tmp_path, reads, same_size):
+    paths = write_scholp(tmp_path, 'h', [[1, 2, 3], [3, 4]])
+    cache.read_hypergraph_cached(*paths)
+    st = os.stat(paths[1])
+
+    E = [[1, 2, 5], [5, 4]] if same_size else [[1, 2, 3], [3, 40]]
+    write_scholp(tmp_path, 'h', E)
+    # 大きさが変われば更新時刻が同じでも, 内容が変われば大きさが同じでも読み直す
+    os.utime(paths[1], ns=(st.st_atime_ns, st.st_mtime_ns + (10 ** 9 if same_size else 0)))
+    assert cache.read_hypergraph_cached(*paths).to_lists()[1] == E
+    assert cache.read_hypergraph_cached(*paths).to_lists()[1] == E
+    assert len(reads) == 2
+
+
+@pytest.mark.parametrize('damage', ['truncated', 'missing', 'manifest'])
+def test_broken_entry(tmp_path, reads, damage):
+    E = [[1, 2, 3], [3, 4], [5, 1, 4, 2]]
+    paths = write_scholp(tmp_path, 'h', E)
+    cache.read_hypergraph_cached(*paths)
+    entry = entry_of(paths)
+    match damage:
+        case 'truncated':
+            data = (entry / 'indices.npy').read_bytes()
+            (entry / 'indices.npy').write_bytes(data[:len(data) - 4])
+        case 'missing':
+            (entry / 'node_indptr.npy').unlink()
+        case 'manifest':
+            (entry / 'manifest.json').write_text('{')
+
+    assert cache.read_hypergraph_cached(*paths).to_lists()[1] == E
+    assert len(reads) == 2
+    # 壊れたエントリは書き直される
+    assert cache.read_hypergraph_cached(*paths).to_lists()[1] == E
+    assert len(reads) == 2
+
+
+def test_hypergraph_uses_cache_dir(tmp_path, reads):
+    E = [[1, 2, 3], [3, 4]]
+    write_scholp(tmp_path, 'h', E)
+    for compact in (False, True):
+        G = HyperGraph(tmp_path, compact=compact)
+        G.read_hypergraph('h')
+        assert [list(e) for e in G.E] == E
+    assert len(reads) == 1
+    assert any((tmp_path / 'cache' / 'hypergraphs').iterdir())
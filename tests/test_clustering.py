@@ -0,0 +1,168 @@
+'''
+Vectorized clustering kernels (hypergcc.clustering) against the python loops of HyperGraph.
+'''
+import numpy as np
+import pytest
+
+from hypergcc import clustering
+from hypergcc.hypergraph import HyperGraph
+from hypergcc.main import calc_ncc
+
+SEEDS = range(4)
+SMALL_BUDGET = 3
+
+
+def random_hypergraph(seed, n=30, m=40, max_size=6):
+    '''Nodes and hyperedges without repeated nodes, with duplicate hyperedges, nodes of degree 1 and isolated nodes.'''
+    rng = np.random.default_rng(seed)
+    V = [int(v) for v in rng.permutation(np.arange(5, 5 + 2 * (n + 10), 2))]
+    core_nodes, single, isolated = V[:n], V[n:n + 8], V[n + 8:]
+    E = [[int(v) for v in rng.choice(core_nodes, size=rng.integers(2, max_size + 1), replace=False)] for _ in range(m)]
+    E += [list(E[i]) for i in rng.choice(m, size=m // 5)]
+    E += [list(E[i][::-1]) for i in rng.choice(m, size=3)]
+    # 次数 1 のノード
+    E += [[v, int(rng.choice(core_nodes))] for v in single[:4]]
+    E += [[*single[4:], int(rng.choice(core_nodes))]]
+    order = rng.permutation(len(E))
+    return V, [E[i] for i in order]
+
+
+def hypergraph(tmp_path, seed):
+    G = HyperGraph(tmp_path, cache=False)
+    G.construct_hypergraph(*random_hypergraph(seed))
+    return G
+
+
+def as_array(G, d):
+    return np.array([d[v] for v in G.core.node_ids.tolist()])
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('budget', [clustering.DEFAULT_BUDGET, SMALL_BUDGET])
+@pytest.mark.parametrize('kernel', [clustering.opsahl_sparse, clustering.opsahl_pairs])
+def test_opsahl(tmp_path, seed, budget, kernel):
+    G = hypergraph(tmp_path, seed)
+    _, numer, denom = G.node_clustering_coefficient_opsahl_by_fraction(engine='python')
+
+    got_numer, got_denom = kernel(G.core, budget=budget)
+    assert got_numer.tolist() == as_array(G, numer).tolist()
+    assert got_denom.tolist() == as_array(G, denom).tolist()
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('engine', ['sparse', 'pairs'])
+def test_opsahl_engine(tmp_path, seed, engine):
+    G = hypergraph(tmp_path, seed)
+    assert G.node_clustering_coefficient_opsahl(engine=engine) == G.node_clustering_coefficient_opsahl(engine='python')
+
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('budget', [clustering.DEFAULT_BUDGET, SMALL_BUDGET])
+def test_zhou(tmp_path, seed, budget):
+    # 寄与をペアの順に足すので, python のループとビット単位で一致する
+    G = hypergraph(tmp_path, seed)
+    expected = G.node_clustering_coefficient_zhou(engine='python')
+
+    numer, denom = clustering.zhou_pairs(G.core, budget=budget)
+    cc = np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0)
+    assert G._node_dict(cc) == expected
+    assert G.node_clustering_coefficient_zhou(engine='pairs') == expected
+
+
+def min_sizes(V, E):
+    '''Smallest size of a hyperedge shared by each pair of nodes (u, w), u < w, with a python loop.'''
+    out = {}
+    for e in E:
+        for u in e:
+            for w in e:
+                if u < w:
+                    out[u, w] = min(out.get((u, w), len(e)), len(e))
+    return out
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('budget', [clustering.DEFAULT_BUDGET, SMALL_BUDGET])
+def test_proposed(tmp_path, monkeypatch, seed, budget):
+    merges = []
+    merge_first = clustering._merge_first
+    monkeypatch.setattr(clustering, '_merge_first', lambda *args: merges.append(1) or merge_first(*args))
+    G = hypergraph(tmp_path, seed)
+    core = G.core
+
+    P = clustering.min_size_projection(core, budget=budget).tocoo()
+    ids = core.node_ids
+    got = {(int(ids[i]), int(ids[j])): int(x) for i, j, x in zip(P.row, P.col, P.data) if ids[i] < ids[j]}
+    assert got == min_sizes(G.V, G.E)
+    if budget == SMALL_BUDGET:
+        # 何度も倍々に併合される
+        assert len(merges) >= 4
+
+    index = clustering.PairIndex(core, budget=budget)
+    numer, denom = clustering.proposed_sparse(core, budget=budget, index=index)
+    cc = np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0)
+    expected = as_array(G, G.node_clustering_coefficient_proposed(engine='python'))
+    assert np.allclose(cc, expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('engine', ['sparse', 'pairs'])
+def test_all_methods(tmp_path, seed, engine):
+    G = hypergraph(tmp_path, seed)
+    single = {
+        'opsahl': G.node_clustering_coefficient_opsahl(engine=engine),
+        'zhou': G.node_clustering_coefficient_zhou(engine='pairs'),
+        'proposed': G.node_clustering_coefficient_proposed(engine='sparse'),
+        'simple': G.node_clustering_coefficient_on_projected_graph(),
+    }
+    assert G.node_clustering_coefficients(clustering.METHODS, engine=engine) == single
+
+    # calc_ncc --methods の表の各列
+    calc_ncc.write_table(G, clustering.METHODS, engine, output=tmp_path / 'all.tsv')
+    header, *rows = [line.split('\t') for line in (tmp_path / 'all.tsv').read_text().splitlines()]
+    assert header == ['node', *clustering.METHODS]
+    for j, m in enumerate(clustering.METHODS, 1):
+        assert {int(r[0]): float(r[j]) for r in rows} == single[m]
+
+
+def shared_sizes(core):
+    '''Sizes of the hyperedges shared by each adjacent pair (packed key v1 * n + v2, both orders), with a python loop.'''
+    n = core.num_nodes
+    out = {}
+    for e in range(core.num_hyperedges):
+        members = core.indices[core.indptr[e]:core.indptr[e + 1]].tolist()
+        for u in members:
+            for w in members:
+                if u != w:
+                    out.setdefault(u * n + w, []).append(len(members))
+    return out
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('budget', [clustering.DEFAULT_BUDGET, SMALL_BUDGET])
+@pytest.mark.parametrize('dense_limit', [clustering.DENSE_LIMIT, 0])
+def test_pair_index(tmp_path, seed, budget, dense_limit):
+    core = hypergraph(tmp_path, seed).core
+    shared = shared_sizes(core)
+    count = {k: len(s) for k, s in shared.items()}
+    size = {k: min(s) for k, s in shared.items()}
+    # dense_limit=0 では密な表を作らずに二分探索で答える
+    index = clustering.PairIndex(core, budget=budget, dense_limit=dense_limit)
+    assert index.keys.tolist() == sorted(count)
+    assert index.count.tolist() == [count[k] for k in sorted(count)]
+    assert index.min_size.tolist() == [size[k] for k in sorted(size)]
+    # 大きさの違う複数のハイパーエッジを共有するペアがある
+    assert any(len(set(s)) > 1 for s in shared.values())
+
+    # 隣接しないペアと自分自身とのペアを含むすべてのキーを逆順に問い合わせる
+    n = core.num_nodes
+    keys = np.arange(n * n, dtype=np.int64)[::-1]
+    pos = index.find(keys)
+    assert [int(k) in count for k in keys] == (pos >= 0).tolist() == index.contains(keys).tolist()
+    assert index.keys[pos[pos >= 0]].tolist() == keys[pos >= 0].tolist()
+    assert index.get(keys).tolist() == [count.get(int(k), 0) for k in keys]
+    assert index.get(keys, default=-1).tolist() == [count.get(int(k), -1) for k in keys]
+    assert index.min_sizes(keys).tolist() == [size.get(int(k), 0) for k in keys]
+    assert index.min_sizes(keys, default=-1).tolist() == [size.get(int(k), -1) for k in keys]
+    for v in range(n):
+        assert index.neighbors(v).tolist() == sorted(k - v * n for k in count if k // n == v)
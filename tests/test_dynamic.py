@@ -0,0 +1,83 @@
+'''
+Incremental clustering coefficients (hypergcc.dynamic.DynamicClustering) against a recomputation from scratch.
+'''
+import random
+
+import pytest
+
+from hypergcc import clustering
+from hypergcc.dynamic import DynamicClustering
+from hypergcc.hypergraph import HyperGraph
+
+
+def random_hypergraph(rng, n=30, m=40, max_size=5):
+    V = rng.sample(range(100, 1000), n)
+    E = [rng.sample(V, rng.randint(2, max_size)) for _ in range(m)]
+    return V, E
+
+
+def random_edit(rng, D, step):
+    '''Apply one random edit of the four kinds to D.'''
+    r = rng.random()
+    if r < 0.35:
+        e_i = rng.randrange(len(D.E))
+        v = rng.choice(D.V)
+        if v not in D.E[e_i]:
+            D.add_node_to_hyperedge(v, e_i)
+    elif r < 0.7:
+        e_i = rng.randrange(len(D.E))
+        if len(D.E[e_i]) > 1:
+            D.remove_node_from_hyperedge(rng.choice(sorted(D.E[e_i])), e_i)
+    elif r < 0.85:
+        # 新しいノードを含むこともある
+        D.add_hyperedge(rng.sample(D.V, rng.randint(2, 4)) + ([10 ** 6 + step] if rng.random() < 0.2 else []))
+    elif len(D.E) > 1:
+        D.remove_hyperedge(rng.randrange(len(D.E)))
+
+
+def assert_recomputed(tmp_path, D):
+    G = HyperGraph(tmp_path, cache=False)
+    G.construct_hypergraph(D.V, [sorted(e) for e in D.E])
+    expected = G.node_clustering_coefficients(clustering.METHODS, engine='python')
+    for m in clustering.METHODS:
+        assert D.clustering_coefficients(m) == pytest.approx(expected[m], abs=1e-9), m
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_edits(tmp_path, seed):
+    rng = random.Random(seed)
+    V, E = random_hypergraph(rng)
+    D = DynamicClustering(V, E)
+    assert_recomputed(tmp_path, D)
+    for step in range(480):
+        random_edit(rng, D, step)
+        if step % 60 == 59:
+            assert_recomputed(tmp_path, D)
+
+
+def test_methods_subset(tmp_path):
+    rng = random.Random(0)
+    V, E = random_hypergraph(rng)
+    D = DynamicClustering(V, E, methods=['zhou', 'simple'])
+    full = DynamicClustering(V, E)
+    for step in range(120):
+        state = rng.getstate()
+        random_edit(rng, D, step)
+        rng.setstate(state)
+        random_edit(rng, full, step)
+    for m in D.methods:
+        assert D.clustering_coefficients(m) == pytest.approx(full.clustering_coefficients(m), abs=1e-12)
+    with pytest.raises(ValueError):
+        D.clustering_coefficients('opsahl')
+
+
+def test_invalid_edits():
+    D = DynamicClustering([1, 2, 3], [[1, 2]])
+    with pytest.raises(ValueError):
+        D.add_node_to_hyperedge(1, 0)
+    with pytest.raises(ValueError):
+        D.remove_node_from_hyperedge(3, 0)
+    with pytest.raises(ValueError):
+        D.remove_hyperedge(1)
+    with pytest.raises(ValueError):
+        DynamicClustering([1, 2], [[1, 1, 2]])
@@ -0,0 +1,37 @@
+'''
+Motif tables (hypergcc.motifs.classify.motif_table) read from a broken cache.
+'''
+import numpy as np
+import pytest
+
+from hypergcc.motifs import classify
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('HYPERGCC_CACHE_DIR', str(tmp_path))
+    classify.motif_table.cache_clear()
+    yield tmp_path / 'motifs' / f'motifs4-v{classify.TABLE_VERSION}.npz'
+    classify.motif_table.cache_clear()
+
+
+@pytest.mark.parametrize('damage', ['truncated', 'empty', 'garbage', 'missing_array'])
+def test_broken_table_is_rebuilt(cache, damage):
+    motifs, classes = classify.motif_table(4)
+    data = cache.read_bytes()
+    match damage:
+        case 'truncated':
+            cache.write_bytes(data[:len(data) // 2])
+        case 'empty':
+            cache.write_bytes(b'')
+        case 'garbage':
+            cache.write_bytes(b'PK\x03\x04' + b'\0' * 64)
+        case 'missing_array':
+            np.savez(cache, representatives=np.arange(3))
+
+    classify.motif_table.cache_clear()
+    rebuilt, rebuilt_classes = classify.motif_table(4)
+    assert rebuilt == motifs
+    assert np.array_equal(rebuilt_classes, classes)
+    with np.load(cache) as f:
+        assert np.array_equal(f['classes'], classes)
@@ -0,0 +1,125 @@
+'''
+Motif counts of the engine (hypergcc.motifs.engine) against enumeration.
+'''
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from hypergcc.motifs import utils
+from hypergcc.motifs.classify import MotifCounter
+from hypergcc.motifs.engine import GRAPHLETS, graphlet_counts
+from hypergcc.motifs.esu import count_connected
+from hypergcc.motifs.motifs import count_motifs
+from hypergcc.motifs.motifs2 import motifs_order_3, motifs_order_4
+
+
+def random_pairs(rng, n, m):
+    '''Edges among n nodes, with self-loops and repeated edges in both directions.'''
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(m)]
+    pairs += [(b, a) for a, b in rng.sample(pairs, m // 5)]
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2) * 7 + 3
+
+
+def brute_force_graphlets(pairs, N):
+    '''Numbers of the connected induced subgraphs of N nodes by GRAPHLETS[N], from every N-subset of the nodes.'''
+    adj = {}
+    for a, b in pairs.tolist():
+        if a != b:
+            adj.setdefault(a, set()).add(b)
+            adj.setdefault(b, set()).add(a)
+
+    def canon(edges):
+        # 次数の多重集合と辺の数で 3, 4 ノードの連結グラフは区別できる
+        return len(edges), tuple(sorted(np.bincount(np.array(edges).reshape(-1), minlength=N).tolist()))
+
+    kinds = {canon(edges): i for i, edges in enumerate(GRAPHLETS[N].values())}
+    counts = np.zeros(len(kinds), dtype=np.int64)
+    for nodes in itertools.combinations(sorted(adj), N):
+        edges = [(i, j) for i, j in itertools.combinations(range(N), 2) if nodes[j] in adj[nodes[i]]]
+        reach = {0}
+        for _ in range(N):
+            reach |= {j for i, j in edges if i in reach} | {i for i, j in edges if j in reach}
+        if len(reach) == N:
+            counts[kinds[canon(edges)]] += 1
+    return counts
+
+
+@pytest.mark.parametrize('N', [3, 4])
+@pytest.mark.parametrize('seed', range(8))
+def test_graphlet_counts(N, seed):
+    rng = random.Random(seed)
+    n = rng.randint(4, 14)
+    pairs = random_pairs(rng, n, rng.randint(0, n * (n - 1)))
+    assert graphlet_counts(pairs, N).tolist() == brute_force_graphlets(pairs, N).tolist()
+
+
+def test_graphlet_counts_complete():
+    pairs = np.array(list(itertools.combinations(range(6), 2)))
+    assert graphlet_counts(pairs, 3).tolist() == [0, 20]
+    assert graphlet_counts(pairs, 4).tolist() == [0, 0, 0, 0, 0, 15]
+    assert graphlet_counts(np.empty((0, 2), dtype=np.int64), 4).tolist() == [0] * 6
+
+
+def random_hyperedges(rng, N, n=25, m=90):
+    '''Hyperedges of 2..N nodes in random order, with repeated nodes and duplicate hyperedges (some permuted).'''
+    edges = []
+    for _ in range(m):
+        k = rng.randint(2, N)
+        if rng.random() < 0.15:
+            e = [rng.randrange(n) for _ in range(k)]
+        else:
+            e = rng.sample(range(n), k)
+        edges.append(tuple(v * 3 + 1 for v in e))
+    for e in rng.sample(edges, m // 6):
+        edges.append(e if rng.random() < 0.5 else tuple(rng.sample(e, len(e))))
+    rng.shuffle(edges)
+    return edges
+
+
+def reference_motifs(edges, N, workers=1):
+    '''The phases of motifs_order_3/4 with the per-phase functions of utils (ESU for standard).'''
+    full, visited = utils.motifs_ho_full(edges, N, -1)
+    phases = [full]
+    if N == 4:
+        not_full, visited = utils.motifs_ho_not_full(edges, N, -1, visited)
+        phases.append(not_full)
+    phases.append(utils.motifs_standard(edges, N, -1, visited, workers=workers))
+    return [(motif, max(p[i][1] for p in phases)) for i, (motif, _) in enumerate(full)]
+
+
+@pytest.mark.parametrize('N', [3, 4])
+@pytest.mark.parametrize('seed', range(6))
+def test_motifs_order(N, seed):
+    edges = random_hyperedges(random.Random(seed), N)
+    count = motifs_order_3 if N == 3 else motifs_order_4
+    assert count(edges, -1) == reference_motifs(edges, N)
+
+
+def test_motifs_order_sparse():
+    # 2 ノードのハイパーエッジだけ, またはそれを含まないハイパーグラフ
+    rng = random.Random(0)
+    pairs = [tuple(rng.sample(range(30), 2)) for _ in range(60)]
+    assert motifs_order_4(pairs, -1) == reference_motifs(pairs, 4)
+    triples = [tuple(rng.sample(range(30), 3)) for _ in range(40)]
+    assert motifs_order_4(triples, -1) == reference_motifs(triples, 4)
+    assert motifs_order_3([], -1) == reference_motifs([], 3)
+
+
+@pytest.mark.parametrize('N', [3, 4])
+def test_esu_workers(N):
+    edges = random_hyperedges(random.Random(1), N, n=40, m=150)
+    assert reference_motifs(edges, N, workers=3) == reference_motifs(edges, N)
+    assert count_motifs(edges, N, -1, workers=2) == count_motifs(edges, N, -1)
+
+
+def test_esu_batches():
+    edges = random_hyperedges(random.Random(2), 4, n=40, m=150)
+    graph = {}
+    for e in edges:
+        for a, b in itertools.combinations(e, 2):
+            graph.setdefault(a, set()).add(b)
+            graph.setdefault(b, set()).add(a)
+    counts = [count_connected(graph, 4, MotifCounter(4, edges, batch=batch)).result() for batch in (1 << 16, 5)]
+    assert counts[0] == counts[1]
@@ -0,0 +1,60 @@
+'''
+Out-of-core coefficients (hypergcc.partition) against hypergcc.clustering.coefficients on the whole hypergraph.
+'''
+import sys
+
+import numpy as np
+import pytest
+
+from hypergcc import clustering, partition
+from hypergcc.hypergraph import HyperGraph
+from hypergcc.main import calc_ncc
+
+SEEDS = range(3)
+
+
+def random_core(tmp_path, seed, n=200, m=800):
+    # 最小のメモリ上限でも複数の範囲に分かれる大きさ
+    rng = np.random.default_rng(seed)
+    V = [int(v) for v in rng.permutation(n)]
+    E = [[int(v) for v in rng.choice(n, size=rng.integers(2, 6), replace=False)] for _ in range(m)]
+    E += [list(E[i]) for i in rng.choice(m, size=m // 10)]
+    G = HyperGraph(tmp_path, cache=False)
+    G.construct_hypergraph(V, E)
+    return G.core
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_min_memory_budget(tmp_path, seed):
+    core = random_core(tmp_path, seed)
+    expected = clustering.coefficients(core, clustering.METHODS)
+
+    parts = list(partition.partitioned_coefficients(core, clustering.METHODS, memory_budget=partition.MIN_MEMORY_BUDGET))
+    assert len(parts) >= 3
+    assert [lo for lo, _, _ in parts] == [0, *[hi for _, hi, _ in parts[:-1]]]
+    assert parts[-1][1] == core.num_nodes
+    for m in clustering.METHODS:
+        numer = np.concatenate([arrays[m][0] for _, _, arrays in parts])
+        denom = np.concatenate([arrays[m][1] for _, _, arrays in parts])
+        assert np.allclose(numer, expected[m][0], rtol=1e-12, atol=1e-12)
+        assert np.array_equal(denom, expected[m][1])
+
+
+def test_memory_budget_too_small(tmp_path):
+    core = random_core(tmp_path, 0, n=20, m=30)
+    with pytest.raises(ValueError):
+        next(partition.partitioned_coefficients(core, memory_budget=partition.MIN_MEMORY_BUDGET - 1))
+
+
+@pytest.mark.parametrize('budget, ok', [('10K', False), (str(partition.MIN_MEMORY_BUDGET - 1), False), ('16M', True), ('4G', True)])
+def test_cli_memory_budget(monkeypatch, capsys, budget, ok):
+    argv = ['calc_ncc', '.', 'x', '--methods', 'opsahl,zhou', '--summary', '--memory-budget', budget]
+    monkeypatch.setattr(sys, 'argv', argv)
+    if ok:
+        assert calc_ncc.parse_args().memory_budget == partition.parse_memory(budget)
+        return
+    # 計算を始める前に使い方の誤りとして終わる
+    with pytest.raises(SystemExit) as e:
+        calc_ncc.parse_args()
+    assert e.value.code == 2
+    assert 'memory size too small' in capsys.readouterr().err
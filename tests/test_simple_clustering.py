@@ -0,0 +1,70 @@
+'''
+Clustering coefficients on the projected graph (hypergcc.clustering.simple_sparse) against networkx.
+'''
+import itertools
+
+import networkx as nx
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from hypergcc import clustering
+from hypergcc.core import CSRCore
+from hypergcc.hypergraph import HyperGraph
+
+
+def random_hypergraph(seed, n=40, m=60, max_size=6, isolated=5):
+    '''Nodes (with isolated of them in no hyperedge) and hyperedges, some of which repeat a node.'''
+    rng = np.random.default_rng(seed)
+    V = [int(v) for v in rng.permutation(np.arange(10, 10 + 3 * (n + isolated), 3))]
+    used = V[:n]
+    E = [[int(v) for v in rng.choice(used, size=rng.integers(1, max_size + 1))] for _ in range(m)]
+    E.append([used[0], used[0]])
+    E.append([used[1], used[2], used[1]])
+    return V, E
+
+
+def reference(V, E):
+    '''Projected graph as built by the original networkx path (self-loops are ignored by nx.clustering).'''
+    G = nx.Graph()
+    G.add_nodes_from(V)
+    for e in E:
+        G.add_edges_from(itertools.combinations(e, 2))
+    return G
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('budget', [clustering.DEFAULT_BUDGET, 7])
+def test_simple_sparse(seed, budget):
+    V, E = random_hypergraph(seed)
+    core = CSRCore.from_lists(V, E)
+    numer, denom = clustering.simple_sparse(core, budget=budget)
+    cc = np.divide(numer, denom, out=np.zeros(len(numer)), where=denom != 0)
+
+    expected = nx.clustering(reference(V, E))
+    assert dict(zip(core.node_ids.tolist(), cc.tolist())) == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_triangles(seed):
+    V, E = random_hypergraph(seed)
+    core = CSRCore.from_lists(V, E)
+    index = clustering.pair_index(core)
+    n = core.num_nodes
+    A = sp.csr_matrix((np.ones(len(index), dtype=np.int64), index.indices, index.indptr), shape=(n, n))
+    tri, deg = clustering.triangles(A, budget=5)
+
+    G = reference(V, E)
+    assert dict(zip(core.node_ids.tolist(), tri.tolist())) == nx.triangles(G)
+    assert dict(zip(core.node_ids.tolist(), deg.tolist())) == {v: len(set(G[v]) - {v}) for v in G}
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_on_projected_graph(tmp_path, compact):
+    V, E = random_hypergraph(0)
+    G = HyperGraph(tmp_path, compact=compact, cache=False)
+    G.construct_hypergraph(V, E)
+
+    cc = G.node_clustering_coefficient_on_projected_graph()
+    assert cc == pytest.approx(nx.clustering(reference(V, E)), abs=1e-12)
+    assert G.node_clustering_coefficients(['simple'], engine='python')['simple'] == cc
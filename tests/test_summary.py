@@ -0,0 +1,95 @@
+'''
+Running summaries (hypergcc.summary.RunningSummary) against single numpy passes over all values.
+'''
+import numpy as np
+import pytest
+
+from hypergcc import summary
+from hypergcc.summary import RunningSummary
+from hypergcc.hypergraph import HyperGraph
+
+SEEDS = range(4)
+
+
+def random_values(seed, n=1000):
+    '''Values in [0, 1] with many exact 0 and 1, their fractions and integer degrees as weights.'''
+    rng = np.random.default_rng(seed)
+    denom = rng.integers(0, 20, size=n)
+    numer = rng.integers(0, denom + 1)
+    values = np.divide(numer, denom, out=np.zeros(n), where=denom != 0)
+    degrees = rng.integers(1, 50, size=n)
+    return values, numer, denom, degrees
+
+
+def random_chunks(seed, n):
+    rng = np.random.default_rng(seed + 100)
+    cuts = np.sort(rng.choice(np.arange(1, n), size=12, replace=False))
+    # 空のチャンクも混ぜる
+    return list(zip([0, *cuts, n], [*cuts, n, n]))
+
+
+def binned(values, bins):
+    '''Histogram of all values at once, with the bins [i / bins, (i + 1) / bins) and 1.0 in the last bin.'''
+    return np.bincount(np.minimum(np.floor(values * bins).astype(np.int64), bins - 1), minlength=bins).tolist()
+
+
+def assert_single_pass(s, values, numer, denom, degrees, bins):
+    assert s.count == len(values)
+    assert s.mean == pytest.approx(np.mean(values), rel=1e-12)
+    assert s.weighted_mean == pytest.approx(np.average(values, weights=degrees), rel=1e-12)
+    assert s.ratio == pytest.approx(numer.sum() / denom.sum(), rel=1e-12)
+    assert s.min == values.min()
+    assert s.max == values.max()
+    assert s.histogram.tolist() == binned(values, bins)
+    for q in summary.QUANTILES:
+        assert s.quantile(q) == pytest.approx(np.quantile(values, q, method='inverted_cdf'), abs=1 / summary.QUANTILE_BINS)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('bins', [10, 7])
+def test_chunks(seed, bins):
+    values, numer, denom, degrees = random_values(seed)
+    s = RunningSummary(bins)
+    for lo, hi in random_chunks(seed, len(values)):
+        s.update(values[lo:hi], numer[lo:hi], denom[lo:hi], weights=degrees[lo:hi])
+    assert_single_pass(s, values, numer, denom, degrees, bins)
+
+    # 範囲ごとの要約を併合しても同じ
+    merged = RunningSummary(bins)
+    for lo, hi in random_chunks(seed, len(values)):
+        part = RunningSummary(bins)
+        part.update(values[lo:hi], numer[lo:hi], denom[lo:hi], weights=degrees[lo:hi])
+        merged.merge(part)
+    assert_single_pass(merged, values, numer, denom, degrees, bins)
+    assert merged.row() == s.row()
+
+
+def test_without_fractions():
+    s = RunningSummary()
+    s.update([0.5, 1.0], [1, 2], [2, 2])
+    s.update([0.0])
+    assert s.count == 3
+    assert np.isnan(s.ratio)
+    assert np.isnan(s.weighted_mean)
+    assert np.isnan(RunningSummary().mean)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_clustering_summaries(tmp_path, seed):
+    rng = np.random.default_rng(seed)
+    V = list(range(200))
+    E = [[int(v) for v in rng.choice(V, size=rng.integers(2, 6), replace=False)] for _ in range(300)]
+    G = HyperGraph(tmp_path, cache=False)
+    G.construct_hypergraph(V, E)
+    degrees = G.core.node_degrees()
+
+    whole = G.clustering_summaries(['opsahl', 'proposed'], engine='pairs', chunk=len(V))
+    chunked = G.clustering_summaries(['opsahl', 'proposed'], engine='pairs', chunk=17)
+    for m in ['opsahl', 'proposed']:
+        values = np.array(list(G.node_clustering_coefficients([m])[m].values()))
+        s = chunked[m]
+        assert s.count == whole[m].count == len(V)
+        assert s.mean == pytest.approx(np.mean(values), rel=1e-12)
+        assert s.weighted_mean == pytest.approx(np.average(values, weights=degrees), rel=1e-12)
+        assert s.ratio == pytest.approx(whole[m].ratio, rel=1e-12)
+        assert s.histogram.tolist() == binned(values, 10)